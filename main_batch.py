@@ -0,0 +1,122 @@
+import argparse
+import logging as _logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import yaml
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.workload.WorkloadParser import WorkloadParser
+from residse.experiment import get_parser, check_args, run_experiment
+
+_logging_level = _logging.INFO
+_logging_format = (
+    "%(asctime)s - %(name)s.%(funcName)s +%(lineno)s - %(levelname)s - %(message)s"
+)
+_logging.basicConfig(level=_logging_level, format=_logging_format)
+logger = _logging.getLogger(__name__)
+
+# hardware variants (mac_unroll / bandwidth lists in the hardware json) run as hw <hw>@<variant name>,
+# a separator that can be part of a directory name
+VARIANT_SEPARATOR = "@"
+
+# parsed {hw: Dla} and {nn: [Stack]}, inherited by forked workers (copy-on-write)
+_parsed = {}
+
+
+class RunParser(argparse.ArgumentParser):
+    """options of one run, an unsupported combination raises ValueError instead of exiting"""
+    def error(self, message):
+        raise ValueError(message)
+
+
+def _init_worker(parsed: dict):
+    _parsed.update(parsed)
+
+
+def get_argv(hw: str, nn: str, merge: bool, rda: bool, size: tuple, options: dict) -> list:
+    """main_dse.py command line of one run"""
+    argv = ["--hw", hw, "--nn", nn] + (["--merge"] if merge else []) + (["--rda"] if rda else [])
+    if size is not None:
+        name, value = size
+        argv += [f"--{name}"] + [str(v) for v in (value if isinstance(value, list) else [value])]
+    for name, value in options.items():
+        if value is None or value is False:
+            continue
+        if value is True:
+            argv.append(f"--{name}")
+        elif isinstance(value, list) and value and isinstance(value[0], list):
+            for v in value:     # append options, e.g. tile_grid
+                argv += [f"--{name}"] + [str(x) for x in v]
+        else:
+            argv += [f"--{name}"] + [str(v) for v in (value if isinstance(value, list) else [value])]
+    return argv
+
+
+def build_runs(spec: dict) -> list:
+    """expand the matrix spec into a list of run dicts (hw, nn, main_dse.py args), skipping the combinations main_dse.py rejects"""
+    runs = []
+    parser = get_parser(RunParser)
+    strategies = [tuple(strategy) for strategy in spec.get("strategy", [[True, True]])]
+    # 没有 tile_size / mem_size 时 (如 options 里的 per_stack_tile, target) 每个组合只跑一次
+    sizes = [("tile_size", list(t)) for t in spec.get("tile_size") or []] + [("mem_size", m) for m in spec.get("mem_size") or []] or [None]
+    options = spec.get("options") or {}
+    for hw, nn, (merge, rda), size in product(spec["hw"], spec["nn"], strategies, sizes):
+        argv = get_argv(hw, nn, merge, rda, size, options)
+        try:
+            args = parser.parse_args(argv)
+            check_args(parser, args)
+        except ValueError as error:
+            logger.warning(f"skip {' '.join(argv)}: {error}")
+            continue
+        runs.append({"hw": hw, "nn": nn, "argv": argv})
+    return runs
+
+
+def run_batch_experiment(run: dict) -> str:
+    args = get_parser().parse_args(run["argv"])
+    return run_experiment(args, dla=_parsed["hw"][run["hw"]], stacks=_parsed["nn"][run["nn"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a hw x network x strategy x tile size matrix of residse experiments")
+    parser.add_argument( "--spec", metavar="Batch spec", required=True, help="yaml matrix spec, e.g. residse/inputs/batch/srgan_compare.yml")
+    parser.add_argument( "--jobs", metavar="Number of Processes", type=int, default=1, help="number of experiments running at the same time")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = yaml.safe_load(f)
+    runs = build_runs(spec)
+    if not runs:
+        parser.error(f"no experiment to run in {args.spec}")
+
+    # parse every hardware / workload only once
+    _parsed["hw"] = {}
+    variant_runs = []
+    for run in runs:
+        variants = HardwareGenerator(json_hw=f"residse/inputs/HW/{run['hw']}.json").get_dla_variants()
+        if len(variants) == 1:
+            _parsed["hw"][run["hw"]] = variants[0][1]
+            variant_runs.append(run)
+            continue
+        for name, dla in variants:
+            hw = f"{run['hw']}{VARIANT_SEPARATOR}{name}"
+            _parsed["hw"][hw] = dla
+            argv = list(run["argv"])
+            argv[argv.index("--hw") + 1] = hw
+            variant_runs.append(dict(run, hw=hw, argv=argv))
+    runs = variant_runs
+    _parsed["nn"] = {nn: WorkloadParser(yaml_path=f"residse/inputs/WL/{nn}.yml").get_stacks() for nn in {run["nn"] for run in runs}}
+    logger.info(f"Running {len(runs)} experiments with {args.jobs} processes")
+
+    if args.jobs <= 1:
+        done = [run_batch_experiment(run) for run in runs]
+    else:
+        # fork: workers share the parsed objects copy-on-write, other start methods pickle them once per worker
+        mp_context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=mp_context, initializer=_init_worker, initargs=(_parsed,)) as pool:
+            done = list(pool.map(run_batch_experiment, runs))
+    logger.info(f"Finished experiments: {done}")
+
+
+if __name__ == '__main__':
+    main()
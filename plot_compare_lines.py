@@ -27,9 +27,9 @@ def main():
     # print(string_merge_rda)
     # print(string_nomerge_rda)
     # print(string_nomerge_norda)
-    pkl_path_1 = f'outputs/{string_merge_rda}/all_cmes.pickle'
-    pkl_path_2 = f'outputs/{string_nomerge_rda}/all_cmes.pickle'
-    pkl_path_3 = f'outputs/{string_nomerge_norda}/all_cmes.pickle'
+    pkl_path_1 = f'outputs/{string_merge_rda}'
+    pkl_path_2 = f'outputs/{string_nomerge_rda}'
+    pkl_path_3 = f'outputs/{string_nomerge_norda}'
     save_path_edp = f'outputs/{string_merge_rda}/two_lines_edp.png'
 
     # plot merge and not-merge
@@ -54,8 +54,8 @@ if __name__ == "__main__":
 
 #     # extract path
 #     other_experiment_id = experiment_id.replace("True", "False")
-#     pkl_path_1 = f'outputs/{experiment_id}/all_cmes.pickle'
-#     pkl_path_2 = f'outputs/{other_experiment_id}/all_cmes.pickle'
+#     pkl_path_1 = f'outputs/{experiment_id}'
+#     pkl_path_2 = f'outputs/{other_experiment_id}'
 #     save_path_ema = f'outputs/{experiment_id}/two_lines_ema.png'
 #     save_path_edp = f'outputs/{experiment_id}/two_lines_edp.png'
 
@@ -76,8 +76,8 @@ if __name__ == "__main__":
 
 #     # extract path
 #     other_experiment_id = experiment_id.replace("--fix_tsize4x2", "")   #! 注意在这里改 nxn
-#     pkl_path_1 = f'outputs/{experiment_id}/all_cmes.pickle'
-#     pkl_path_2 = f'outputs/{other_experiment_id}/all_cmes.pickle'
+#     pkl_path_1 = f'outputs/{experiment_id}'
+#     pkl_path_2 = f'outputs/{other_experiment_id}'
 #     save_path_ema = f'outputs/{experiment_id}/two_lines_tsize_ema.png'
 #     save_path_edp = f'outputs/{experiment_id}/two_lines_tsize_edp.png'
 
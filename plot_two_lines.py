@@ -11,8 +11,8 @@ def plot_2_merge():
 
     # extract path
     other_experiment_id = experiment_id.replace("True", "False")
-    pkl_path_1 = f'outputs/{experiment_id}/all_cmes.pickle'
-    pkl_path_2 = f'outputs/{other_experiment_id}/all_cmes.pickle'
+    pkl_path_1 = f'outputs/{experiment_id}'
+    pkl_path_2 = f'outputs/{other_experiment_id}'
     save_path_ema = f'outputs/{experiment_id}/two_lines_ema.png'
     save_path_edp = f'outputs/{experiment_id}/two_lines_edp.png'
 
@@ -33,8 +33,8 @@ def plot_2_tsize():
 
     # extract path
     other_experiment_id = experiment_id.replace("--fix_tsize4x2", "")   #! 注意在这里改 nxn
-    pkl_path_1 = f'outputs/{experiment_id}/all_cmes.pickle'
-    pkl_path_2 = f'outputs/{other_experiment_id}/all_cmes.pickle'
+    pkl_path_1 = f'outputs/{experiment_id}'
+    pkl_path_2 = f'outputs/{other_experiment_id}'
     save_path_ema = f'outputs/{experiment_id}/two_lines_tsize_ema.png'
     save_path_edp = f'outputs/{experiment_id}/two_lines_tsize_edp.png'
 
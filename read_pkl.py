@@ -1,31 +1,25 @@
-import pickle
-from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.visualization.plot_cme import load_points
+from residse.classes.cost_model.pareto import ParetoFront
 
-# pkl_path = 'outputs/res18_1--resnet18--True--fix_tsize4x2/all_cmes.pickle'
-# pkl_path = 'outputs/sesr_1--sesr--True--fix_tsize32x4/all_cmes.pickle'
-pkl_path = 'outputs/srgan_1--srgan--True--fix_tsize32x4/all_cmes.pickle'
+# 实验输出目录 outputs/<experiment_id> (columns 按列存储), 旧的 all_cmes.pickle 路径也可以
+# exp_path = 'outputs/res18_1--resnet18--merge_True--rda_True--fix_tile_size4x2'
+# exp_path = 'outputs/sesr_1--sesr--merge_True--rda_True--fix_tile_size32x4'
+exp_path = 'outputs/srgan_1--srgan--merge_True--rda_True--fix_tile_size32x4'
 
-with open(pkl_path, 'rb') as f:
-    cmes = pickle.load(f)
+buf_list, edps = load_points(exp_path, 'edp')
 
-cmes: list[CostModelEvaluation]
+# (buf size, edp) pareto 前沿, 比 buf * edp 更完整的折中
+front = ParetoFront(2)
+for buf, edp in zip(buf_list, edps):
+    front.insert((buf, edp))
+print('pareto front of (buf size, edp): ', [values for values, _ in front])
 
-buf_times_edp = []
-buf_list = []
-edps = []
-
-for cme in cmes:
-    if cme is None:
-        continue
-    # print(cme.a_buf_size/1024, cme.edp, cme.tile_size)
-    buf_times_edp.append((cme.a_buf_size/1024) * cme.edp)
-    buf_list.append(cme.a_buf_size)
-    edps.append(cme.edp)
+buf_times_edp = [buf * edp for buf, edp in zip(buf_list, edps)]
 
 # print(buf_times_edp)
 mini = min(buf_times_edp)
 id = buf_times_edp.index(mini)
-# mini_buf_size = buf_list[id]/1024   # 固定的 buffer size
+# mini_buf_size = buf_list[id]   # 固定的 buffer size
 mini_buf_size = 150   # 固定的 buffer size
 print(mini)
 print('minimal buf index is: ', id)
@@ -34,22 +28,14 @@ print('edp of mini is: ', edps[id])
 
 
 # find edp in not merge
-not_merge_pkl = pkl_path.replace('True', 'False')
-with open(not_merge_pkl, 'rb') as ff:
-    n_cmes: list[CostModelEvaluation] = pickle.load(ff)
-for n_cme in n_cmes:
-    if n_cme is None:
-        continue
-    if n_cme.a_buf_size/1024 == mini_buf_size:
-        print('in not merge, edp of mini buf size is: ', n_cme.edp)
-
-
-# find edp in free tile size
-free_pkl = pkl_path.replace('--fix_tsize32x4', '')   #! 注意这里的 ?x? 要和上面的pkl_path匹配
-with open(free_pkl, 'rb') as fff:
-    f_cmes: list[CostModelEvaluation] = pickle.load(fff)
-for f_cme in f_cmes:
-    if f_cme is None:
-        continue
-    if f_cme.a_buf_size/1024 == mini_buf_size:
-        print('in free tsize, edp of mini buf size is: ', f_cme.edp)
+not_merge_path = exp_path.replace('merge_True', 'merge_False')
+for n_buf, n_edp in zip(*load_points(not_merge_path, 'edp')):
+    if n_buf == mini_buf_size:
+        print('in not merge, edp of mini buf size is: ', n_edp)
+
+
+# find edp in free tile size: 每个 stack 自己选 tile size 的 mem size sweep (--per_stack_tile)
+free_path = exp_path.replace('--fix_tile_size32x4', '--per_stack_tile_size')   #! 注意这里的 ?x? 要和上面的exp_path匹配
+for f_buf, f_edp in zip(*load_points(free_path, 'edp')):
+    if f_buf == mini_buf_size:
+        print('in free tsize, edp of mini buf size is: ', f_edp)
@@ -0,0 +1,123 @@
+import logging
+from typing import List, Tuple, Any
+logger = logging.getLogger(__name__)
+
+
+class CostModelSummary:
+    """
+    sum of several CostModelEvaluation (tile types of a stack, stacks of a network ...),
+    only keeps the addable results, built once by CostModelAccumulator.summary()
+    """
+    def __init__(self, *, ema, en, en_of_macs, en_of_datas, la, edp, tile_type: List[str], stack: List[int], tile_size, a_buf_size):
+        self.ema = ema
+        self.en = en
+        self.en_of_macs = en_of_macs
+        self.en_of_datas = en_of_datas
+        self.la = la
+        self.edp = edp
+        self.tile_type = tile_type
+        self.stack = stack
+        self.tile_size = tile_size
+        self.a_buf_size = a_buf_size
+
+    def __str__(self):
+        return f"cme(stack={self.stack}, tsize={self.tile_size}, ttype={self.tile_type}, edp={self.edp}, en={self.en}, la={self.la}, ema={self.ema})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __add__(self, other):
+        acc = CostModelAccumulator()
+        acc.add(self)
+        acc.add(other)
+        return acc.summary()
+
+    def __jsonrepr__(self):
+        """
+        JSON representation used for saving this object to a complete json file.
+        """
+        return {
+            "EDP": self.edp,
+            "energy": {
+                "total_en": self.en,
+                "macs_en": self.en_of_macs,
+                "data_move_en": self.en_of_datas,
+            },
+            "latency": self.la,
+            "EMA": self.ema,
+        }
+
+
+class CostModelAccumulator:
+    """
+    fold CostModelEvaluation / CostModelSummary in place, with the same rules as the old CostModelEvaluation.__add__:
+    - en, en_of_macs, en_of_datas, la and ema are summed, ema is None if any ema is None
+    - edp is not addable, edp = sum(en) * sum(la)
+    - stack ids are appended when they differ from the current stack list, tile types are concatenated
+    - tile_size becomes (-1, -1) when the tile sizes differ
+    - all a_buf_size must be the same
+    any None input (infeasible point) makes the summary None.
+    """
+    def __init__(self):
+        self.count = 0
+        self.has_none = False
+        self.ema = 0
+        self.en = 0
+        self.en_of_macs = 0
+        self.en_of_datas = 0
+        self.la = 0
+        self.edp = None
+        self.stack = []
+        self.tile_type = []
+        self.tile_size = None
+        self.a_buf_size = None
+
+    def add(self, cme):
+        if cme is None:
+            self.has_none = True
+            return
+        if self.count == 0:
+            self.tile_size = cme.tile_size
+            self.a_buf_size = cme.a_buf_size
+            self.edp = cme.edp
+        else:
+            if self.a_buf_size != cme.a_buf_size:
+                raise TypeError(f'cmes with different a_buf_size cannot add !!!')
+            if self.tile_size != cme.tile_size:
+                self.tile_size = (-1, -1)
+            self.edp = (self.en + cme.en) * (self.la + cme.la)   # edp 不可以直接累加
+
+        # EMA
+        if (self.ema is None) or (cme.ema is None):
+            self.ema = None
+        else:
+            self.ema += cme.ema
+
+        # EN, LA
+        self.en_of_macs += cme.en_of_macs
+        self.en_of_datas += cme.en_of_datas
+        self.en += cme.en
+        self.la += cme.la
+
+        # Stack, Tile type
+        stack = cme.stack if type(cme.stack) == list else [cme.stack.id]
+        if self.count == 0 or self.stack != stack:
+            self.stack += stack
+        self.tile_type += cme.tile_type if type(cme.tile_type) == list else [cme.tile_type]
+        self.count += 1
+
+    def summary(self) -> CostModelSummary:
+        if self.has_none or self.count == 0:
+            return None
+        return CostModelSummary(
+            ema=self.ema,
+            en=self.en,
+            en_of_macs=self.en_of_macs,
+            en_of_datas=self.en_of_datas,
+            la=self.la,
+            edp=self.edp,
+            tile_type=list(self.tile_type),
+            stack=list(self.stack),
+            tile_size=self.tile_size,
+            a_buf_size=self.a_buf_size,
+        )
@@ -0,0 +1,171 @@
+"""
+columnar result store of one experiment, one row per design point (a_buf_size / tile size), saved as
+<dir>/meta.json + one <dir>/<column>.npy per column, so every column can be memory-mapped and read on its own.
+infeasible values are NaN.
+    a_buf_size (Bytes), tile_h, tile_w, feasible              shape (rows,)
+    min_a_buf_size (Bytes, FeasibilityOracle threshold)       shape (rows,)
+    stack_min_a_buf_size (Bytes)                              shape (rows, stacks)
+    stack_tile_h, stack_tile_w (-1 if infeasible)             shape (rows, stacks)
+    ema, en, en_of_macs, en_of_datas, la, edp                 shape (rows,)
+    stack_<ema|en|la|edp>                                     shape (rows, stacks)
+    type_<ema|en|la|edp>                                      shape (rows, stacks, len(TILE_TYPES))
+    type_<mac_cycles|tile_ema|tile_number> (raw counts)       shape (rows, stacks, len(TILE_TYPES))
+meta.json also keeps the hardware constants (e_mac, e_ema, number_of_mac, bw), en / la / edp can be recomputed from
+the raw counts with other constants by reweight.reweight(), without running the cost model again.
+"""
+import json
+import logging
+import os
+import shutil
+from typing import List
+import numpy as np
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.tile_gen import TILE_TYPES
+from residse.classes.cost_model.cost_model import CostModelEvaluation, COST_MODEL_VERSION
+logger = logging.getLogger(__name__)
+
+RESULT_NAMES = ['ema', 'en', 'en_of_macs', 'en_of_datas', 'la', 'edp']
+BREAKDOWN_NAMES = ['ema', 'en', 'la', 'edp']
+# raw counts of every tile type: column name -> CostModelEvaluation attribute
+COUNT_NAMES = {'mac_cycles': 'tmp_unroll_of_stack', 'tile_ema': 'ema_per_tile', 'tile_number': 'tile_number_of_current_type'}
+
+
+def _value(cme, name):
+    if cme is None or getattr(cme, name, None) is None:
+        return np.nan
+    return getattr(cme, name)
+
+
+def type_breakdown(cme_of_types: list) -> np.ndarray:
+    """
+    compact per-tile-type results and raw counts of one stack, shape (len(TILE_TYPES), len(BREAKDOWN_NAMES) + len(COUNT_NAMES)),
+    NaN for the tile types the stack does not have or that are infeasible
+    """
+    names = BREAKDOWN_NAMES + list(COUNT_NAMES.values())
+    breakdown = np.full((len(TILE_TYPES), len(names)), np.nan)
+    for cme in cme_of_types:
+        if cme is not None:
+            breakdown[TILE_TYPES.index(cme.tile_type)] = [_value(cme, name) for name in names]
+    return breakdown
+
+
+class ColumnarResultWriter:
+    """
+    append (cme, extra_info) of IterateMemOrTileStage / AnalyticMemSweepStage row by row, every row goes to disk
+    at once (raw <column>.npy.part files), so memory does not grow with the number of rows.
+    close() turns the part files into .npy files and writes meta.json.
+    """
+    def __init__(self, stacks: List[Stack], path: str, dla=None):
+        self.path = path
+        self.stack_ids = [stack.id for stack in stacks]
+        self.dla = dla
+        self.rows = 0
+        stack_shape = (len(self.stack_ids),)
+        type_shape = (len(self.stack_ids), len(TILE_TYPES))
+        # column name: (dtype, shape of one row)
+        self.columns = {'a_buf_size': (np.float64, ()), 'tile_h': (np.int64, ()), 'tile_w': (np.int64, ()), 'feasible': (bool, ())}
+        self.columns.update({'min_a_buf_size': (np.float64, ()), 'stack_min_a_buf_size': (np.float64, stack_shape)})
+        self.columns.update({'stack_tile_h': (np.int64, stack_shape), 'stack_tile_w': (np.int64, stack_shape)})
+        self.columns.update({name: (np.float64, ()) for name in RESULT_NAMES})
+        self.columns.update({f'stack_{name}': (np.float64, stack_shape) for name in BREAKDOWN_NAMES})
+        self.columns.update({f'type_{name}': (np.float64, type_shape) for name in BREAKDOWN_NAMES + list(COUNT_NAMES)})
+
+        os.makedirs(path, exist_ok=True)
+        self.part_files = {name: open(self.get_file_name(name) + '.part', 'wb') for name in self.columns}
+
+    def get_file_name(self, name: str) -> str:
+        return os.path.join(self.path, f'{name}.npy')
+
+    def append(self, cme, extra_info):
+        """
+        extra_info = (cme_of_stacks, a_buf_size, tile_size, _, types_of_stacks, stack_thresholds),
+        types_of_stacks holds the cme_of_types, or already the type_breakdown(), of every stack
+        """
+        cme_of_stacks, a_buf_size, tile_size, _, types_of_stacks, stack_thresholds = extra_info
+        row = {
+            'a_buf_size': a_buf_size * 1024,
+            'tile_h': tile_size[0],
+            'tile_w': tile_size[1],
+            'feasible': cme is not None,
+            'min_a_buf_size': max(stack_thresholds),
+            'stack_min_a_buf_size': stack_thresholds,
+            'stack_tile_h': [-1 if stack_cme is None else stack_cme.tile_size[0] for stack_cme in cme_of_stacks],
+            'stack_tile_w': [-1 if stack_cme is None else stack_cme.tile_size[1] for stack_cme in cme_of_stacks],
+        }
+        row.update({name: _value(cme, name) for name in RESULT_NAMES})
+        breakdowns = np.stack([
+            types if isinstance(types, np.ndarray) else type_breakdown(types) for types in types_of_stacks
+        ])
+        for k, name in enumerate(BREAKDOWN_NAMES):
+            row[f'stack_{name}'] = [_value(stack_cme, name) for stack_cme in cme_of_stacks]
+            row[f'type_{name}'] = breakdowns[:, :, k]
+        for k, name in enumerate(COUNT_NAMES, start=len(BREAKDOWN_NAMES)):
+            row[f'type_{name}'] = breakdowns[:, :, k]
+
+        for name, (dtype, shape) in self.columns.items():
+            self.part_files[name].write(np.asarray(row[name], dtype=dtype).reshape(shape).tobytes())
+        self.rows += 1
+
+    def __len__(self):
+        return self.rows
+
+    def close(self):
+        for name, (dtype, shape) in self.columns.items():
+            part_file = self.part_files[name]
+            part_file.close()
+            header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (self.rows,) + shape}
+            with open(self.get_file_name(name), 'wb') as fp, open(part_file.name, 'rb') as src:
+                np.lib.format.write_array_header_1_0(fp, header)
+                shutil.copyfileobj(src, fp)
+            os.remove(part_file.name)
+
+        meta = {
+            'rows': self.rows,
+            'stacks': self.stack_ids,
+            'tile_types': TILE_TYPES,
+            'columns': list(self.columns),
+            'version': COST_MODEL_VERSION,
+        }
+        if self.dla is not None:
+            meta['hardware'] = {
+                'e_mac': CostModelEvaluation.e_mac,
+                'e_ema': CostModelEvaluation.e_ema,
+                'number_of_mac': self.dla.number_of_mac,
+                'bw': self.dla.dram.bw,
+            }
+        with open(os.path.join(self.path, 'meta.json'), 'w') as fp:
+            json.dump(meta, fp, indent=4)
+
+
+class ColumnarResults:
+    """
+    read side of the columnar store, columns are memory-mapped on first access, e.g.
+        res = load_columns('outputs/<experiment_id>/columns')
+        x, y = res['a_buf_size'][res['feasible']] / 1024, res['edp'][res['feasible']]
+    """
+    def __init__(self, path: str, mmap_mode='r'):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, 'meta.json')) as fp:
+            self.meta = json.load(fp)
+        self.stacks = self.meta['stacks']
+        self.tile_types = self.meta['tile_types']
+        self.columns = self.meta['columns']
+        self._loaded = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._loaded:
+            if name not in self.columns:
+                raise KeyError(f'no column {name} in {self.path}, columns: {self.columns}')
+            self._loaded[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode=self.mmap_mode)
+        return self._loaded[name]
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __repr__(self) -> str:
+        return f"ColumnarResults(path={self.path}, rows={len(self)}, stacks={len(self.stacks)})"
+
+
+def load_columns(path: str, mmap_mode='r') -> ColumnarResults:
+    return ColumnarResults(path, mmap_mode=mmap_mode)
@@ -1,13 +1,22 @@
 import logging
 import sys
-from typing import Generator, Callable, List, Tuple, Any
+from typing import Generator, Callable, List, Tuple, Any, TYPE_CHECKING
 from residse.classes.hardware.dla import Dla
 from residse.classes.hardware.memory import Memory
 from residse.classes.workload.stack import Stack
-from utils import generate_tile_sequence, find_first_true_index, cumulative_sum, find_lzc, pickle_deepcopy
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.mac_cycles import get_mac_cycle_table
+from utils import generate_tile_sequence, find_first_true_index, cumulative_sum, find_lzc
 from math import prod, ceil, floor
+from functools import cached_property
+if TYPE_CHECKING:
+    from residse.classes.cost_model.footprint_cache import FootprintCache
 logger = logging.getLogger(__name__)
 
+# bump when the cost model changes its results (or the attributes it keeps, or the layout of the objects ResultCache
+# pickles: CostModelRecord, CostModelSummary, Stack), invalidates the persistent ResultCache
+COST_MODEL_VERSION = 3
+
 class CostModelEvaluation:
     """
     calculate EMA, Priority of data storage in a_buffer:
@@ -41,14 +50,28 @@ x merge/residual   | 同上                                          |   X
 yolp               | 需要考虑一组tile的yolp总量和buffer容量,求一个比例  |   X      |   X      |   X      |   X      |以一整行的yolp数据为一组 和总容量对比 超出部分均摊给每一个tile的数据 即用一个比例乘上每个tile的数据量                                                |
 y merge/residual   | 同上                                          |   X      |   X      |   X      |   X      |以一整行的yolp数据为一组 和总容量对比 超出部分均摊给每一个tile的数据 即用一个比例乘上每个tile的数据量                                                |
     """
-    def __init__(self, *, dla: Dla, a_buf_size: int, stack: Stack, tile_size: Tuple[int], tile_type: str, is_feature_merging: bool, is_rda: bool):
+    e_mac = 0.05    # pJ ?  energy unit of single mac
+    e_ema = 500     # pJ ?  energy unit of single ema
+
+    # attributes of the a_buf_size-independent steps, in the order they are computed
+    TILE_GEOMETRY_ATTRS = [     # calc_tile_geometry, only depends on (stack, true tile size)
+        'out_tile_h_lst', 'out_tile_w_lst', 'in_tile_h_lst', 'in_tile_w_lst', 'out_tile_area_lst', 'in_tile_area_lst',
+        'out_tile_data_amount_lst', 'in_tile_data_amount_lst', 'in_out_tile_data_amount_lst',
+    ]
+    TILE_NUMBER_ATTRS = ['tile_area', 'number_of_tile_in_row', 'number_of_tile_in_col', 'tile_number_of_current_type', 'minimal_abuf_for_stack_under_tsize']
+    DATA_AMOUNT_ATTRS = [
+        'next_tile_data_amount', 'x_olp_data_amount', 'y_olp_data_amount', 'current_tile_y_olp_data_amount',
+        'residual_tile_data_amount', 'x_merging_or_resi_data_amount', 'y_merging_or_resi_data_amount',
+        'current_tile_y_merging_or_resi_data_amount', 'merging_length_or_resi_shift', 'resi_shift_distance',
+    ]
+    def __init__(self, *, dla: Dla, a_buf_size: int, stack: Stack, tile_size: Tuple[int], tile_type: str, is_feature_merging: bool, is_rda: bool, footprint_cache: 'FootprintCache' = None, lazy=False):
         self.a_buf_size = a_buf_size * 1024     # Byte
         self.dla = dla
         self.stack = stack
         self.tile_type = tile_type
         self.tile_size = tile_size
         # 这里只是给出一个固定的ifm划分的tile size，具体边缘tile尺寸以及每层的tile size需要另行计算。re-calculating each layer's tile size according tile_type
-        #TODO: 所有stack使用同一tile size，进行tile size iteration
+        # tile_size 是当前 stack 的, 每个 stack 可以用不同的 tile size, 见 PerStackTileSizeStage (--per_stack_tile)
         if tile_size[0] > stack.ofm_h:
             self.tile_h = stack.ofm_h
         else:
@@ -64,15 +87,104 @@ y merge/residual   | 同上                                          |   X
         # self.y_olp_data_amount_each_index = []
         # self.y_merging_or_resi_data_amount_each_index = []
         # self.ema_each_index = []
-        self.calc_data_amount()
-        self.calc_edp()
+        if lazy:
+            # lazy=True: nothing is computed here, call calc_results() or read minimal_abuf_for_stack_under_tsize /
+            # data_increase_line, which only run the steps they need. e.g. is_feasible() only needs the tile geometry
+            self.footprint_cache = footprint_cache
+            return
+        self.calc_footprint(footprint_cache)
+        self.calc_edp(footprint_cache)
+
+
+    @cached_property
+    def minimal_abuf_for_stack_under_tsize(self) -> int:
+        """lazy mode, the eager steps set it directly"""
+        self.calc_lazy_minimal_abuf()
+        return self.__dict__['minimal_abuf_for_stack_under_tsize']
+
+
+    @cached_property
+    def data_increase_line(self) -> List[int]:
+        """lazy mode, the data amounts and the cut at a_buf_size, e.g. the saturation of FeasibilityOracle"""
+        self.calc_lazy_footprint()
+        self.calc_cut()
+        return self.__dict__['data_increase_line']
+
+
+    def is_feasible(self) -> bool:
+        """same as ema is not None (lzc != 0), but only needs minimal_abuf_for_stack_under_tsize"""
+        return self.minimal_abuf_for_stack_under_tsize <= self.a_buf_size
+
+
+    def calc_lazy_minimal_abuf(self):
+        """lazy mode: the whole footprint if footprint_cache has it already, else only the tile geometry and tile number"""
+        if 'minimal_abuf_for_stack_under_tsize' in self.__dict__:
+            return
+        if self.footprint_cache is None:
+            self.calc_minimal_abuf_for_stack_under_tsize()
+            return
+        key = self.get_footprint_key(self.footprint_cache)
+        if key in self.footprint_cache:
+            self.calc_footprint(self.footprint_cache)
+            return
+        minimal = self.footprint_cache.get_minimal(key)
+        if minimal is None:
+            attrs_before = set(self.__dict__) - set(self.TILE_GEOMETRY_ATTRS + self.TILE_NUMBER_ATTRS)
+            self.calc_minimal_abuf_for_stack_under_tsize(self.footprint_cache)
+            minimal = {attr: value for attr, value in self.__dict__.items() if attr not in attrs_before}
+            self.footprint_cache.put_minimal(key, minimal)
+        self.__dict__.update(minimal)
+
+
+    def calc_lazy_footprint(self):
+        """lazy mode: calc_footprint, unless calc_lazy_minimal_abuf got the whole footprint from footprint_cache"""
+        self.calc_lazy_minimal_abuf()
+        if 'tmp_unroll_of_stack' not in self.__dict__:
+            self.calc_footprint(self.footprint_cache)
+
+
+    def calc_results(self):
+        """lazy mode: ema / en / la / edp, an infeasible point skips the data amounts and the cut"""
+        if self.is_feasible():
+            self.calc_lazy_footprint()
+            self.calc_edp(self.footprint_cache)
+        else:
+            self.ema = None
+            self.calc_tmp_unroll_of_stack()
+            self.calc_edp_under_ema()
+
+
+    def get_footprint_key(self, footprint_cache: 'FootprintCache'):
+        if 'footprint_key' not in self.__dict__:
+            self.footprint_key = footprint_cache.make_key(self.stack, self.tile_size, self.tile_type, self.is_feature_merging, self.is_rda)
+        return self.footprint_key
 
 
-    def calc_data_amount(self):
+    def calc_footprint(self, footprint_cache: 'FootprintCache' = None):
+        """
+        a_buf_size 无关的部分: 各类数据量 (与硬件无关, 有 footprint_cache 时直接复用) 和 tmp_unroll (随 mac unroll 变化, 查 MacCycleTable)
+        """
+        if footprint_cache is None:
+            self.calc_data_amount()
+        else:
+            key = self.get_footprint_key(footprint_cache)
+            footprint = footprint_cache.get(key)
+            if footprint is None:
+                # lazy mode may have computed a part of the footprint already
+                attrs_before = set(self.__dict__) - set(self.TILE_GEOMETRY_ATTRS + self.TILE_NUMBER_ATTRS + self.DATA_AMOUNT_ATTRS)
+                self.calc_data_amount(footprint_cache)
+                footprint = {attr: value for attr, value in self.__dict__.items() if attr not in attrs_before}
+                footprint_cache.put(key, footprint)
+            self.__dict__.update(footprint)
+        self.calc_tmp_unroll_of_stack()
+
+
+    def calc_data_amount(self, footprint_cache: 'FootprintCache' = None):
         """
         计算对于某一固定tile, 其运算过程中每种数据类型所需SRAM空间
         """
-        self.calc_minimal_abuf_for_stack_under_tsize() # calculate the minimal capacity for abuf under the input tile_size, only consider the tile_size change due to stride
+        if 'minimal_abuf_for_stack_under_tsize' not in self.__dict__:  # lazy mode 可能已经算过
+            self.calc_minimal_abuf_for_stack_under_tsize(footprint_cache) # calculate the minimal capacity for abuf under the input tile_size, only consider the tile_size change due to stride
         self.calc_next_tile_data_amount()
         # if self.tile_type in ['U', 'D']:
         #     self.generate_tile_index_list()
@@ -90,23 +202,43 @@ y merge/residual   | 同上                                          |   X
             self.calc_merging_or_residual_data_amount()
 
 
-    def calc_edp(self):
-        self.calc_ema()
+    def calc_edp(self, footprint_cache: 'FootprintCache' = None):
+        if footprint_cache is None:
+            self.calc_ema()
+        else:
+            # EMA 与硬件无关, 不同硬件变体之间复用
+            key = self.get_footprint_key(footprint_cache)
+            cached = footprint_cache.get_ema(key, self.a_buf_size)
+            if cached is None:
+                self.calc_ema()
+                footprint_cache.put_ema(key, self.a_buf_size, self.ratio, self.ema)
+            else:
+                self.every_data_amount = self.get_every_data_amount()
+                self.data_increase_line = cumulative_sum(self.every_data_amount)
+                self.ratio, self.ema = cached
+        self.calc_edp_under_ema()
+
+
+    def calc_edp_under_ema(self):
+        """
+        energy, latency and edp of the current per-tile self.ema, then times tile number
+        """
         if self.stack.has_outer_add() and (self.ema is not None):
             self.ema += self.tile_w * self.tile_h * self.stack.och_per_layer[-1]  # outer_add is big residual feature map
+        self.ema_per_tile = self.ema    # raw count, en / la can be re-weighted from it (see reweight.py)
         self.calc_en()
         self.calc_la()
         self.edp = self.en * self.la
         self.times_tile_number()
 
 
-    def calc_minimal_abuf_for_stack_under_tsize(self):
-        self.backpropagation_tile_data_amount()
+    def calc_minimal_abuf_for_stack_under_tsize(self, footprint_cache: 'FootprintCache' = None):
+        self.backpropagation_tile_data_amount(footprint_cache)
         self.number_of_tile()
         self.minimal_abuf_for_stack_under_tsize = max(self.in_out_tile_data_amount_lst)    # element or byte
         # logger.info(f'lower limit of abuf for stack_{self.stack.id} of tile_size {self.tile_size} is {self.minimal_abuf_for_stack_under_tsize}')
 
-    def backpropagation_tile_data_amount(self):
+    def backpropagation_tile_data_amount(self, footprint_cache: 'FootprintCache' = None):
         
         if (self.stack.ofm_w % self.tile_w == 0):
             boundary_tile_w = self.tile_w
@@ -131,6 +263,21 @@ y merge/residual   | 同上                                          |   X
         # self.tile_area = prod(self.tile_size) #计算的是当前tile自己的area，还不支持预测功能
         self.tile_area = true_tile_w * true_tile_h #计算的是当前tile自己的area，还不支持预测功能
 
+        if footprint_cache is None:
+            self.calc_tile_geometry(true_tile_h, true_tile_w)
+            return
+        # 逐层 tile 尺寸只由 (stack, true tile) 决定, 不同 tile type / tile size 共用
+        key = footprint_cache.make_geometry_key(self.stack, true_tile_h, true_tile_w)
+        geometry = footprint_cache.get_geometry(key)
+        if geometry is None:
+            self.calc_tile_geometry(true_tile_h, true_tile_w)
+            # tuples, the cached lists are shared by every cme of this (stack, true tile)
+            geometry = {attr: tuple(getattr(self, attr)) for attr in self.TILE_GEOMETRY_ATTRS}
+            footprint_cache.put_geometry(key, geometry)
+        self.__dict__.update(geometry)
+
+    def calc_tile_geometry(self, true_tile_h: int, true_tile_w: int):
+        """per-layer in / out tile size and data amount of the true (boundary-clipped) tile"""
         tile_h_per_layer = generate_tile_sequence(out_len=true_tile_h, stride=self.stack.stride_per_layer, power=1) #目前的generate_tile_sequence只是根据stride生成tile尺寸，并没有根据tile type逐层的尺寸变化
         tile_w_per_layer = generate_tile_sequence(out_len=true_tile_w, stride=self.stack.stride_per_layer, power=1)
         tile_h_all_layer = [tile_h_per_layer[0] * prod(self.stack.stride_per_layer)] + tile_h_per_layer        # from ifm to ofm of a stack, number = stack_len + 1
@@ -339,15 +486,31 @@ y merge/residual   | 同上                                          |   X
     #         else:
     #             sys.exit("error: Wrong Tile Type YOU MOTHERFUCKER.")
 
+    def calc_cut(self):
+        self.every_data_amount = self.get_every_data_amount()
+        self.data_increase_line = cumulative_sum(self.every_data_amount)
+        self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
+
     def calc_ema(self):
-        x_olp_ratio = self.x_olp_ema_ratio(ttype=self.tile_type) 
-        y_olp_ratio = self.y_olp_ema_ratio(ttype=self.tile_type) 
-        residual_ratio = 1 if self.first_true_id == 0 else 2
-        tile_io_ema = self.get_tile_io_ema()
-        # if self.tile_type in ['U', 'D']:
-        #     for yolp_amount, y_mergresi_amount in zip(self.y_olp_data_amount_each_index, self.y_merging_or_resi_data_amount_each_index):
+        self.calc_cut()
+        lzc = find_lzc(self.ratio)
+        if lzc is None:
+            ''' the a_buf is big enough to store all data on chip '''
+            ema = self.get_tile_io_ema()
+        elif lzc == 0:
+            ''' the a_buf size is too small to process layer fusion '''
+            ema = None
+        else :
+            part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
+            ema = self.ema_at_cut(lzc, part_of_data_block)
+        self.ema = ema
+
+    def get_every_data_amount(self):
+        """
+        按照SRAM存储优先级排列的各类数据量, 与 a_buf_size 无关
+        """
         if self.is_feature_merging and self.is_rda:
-            self.every_data_amount = [
+            return [
                 self.minimal_abuf_for_stack_under_tsize ,
                 self.residual_tile_data_amount          ,
                 self.x_merging_or_resi_data_amount      ,
@@ -356,98 +519,8 @@ y merge/residual   | 同上                                          |   X
                 self.y_merging_or_resi_data_amount      ,
                 self.y_olp_data_amount
                 ]
-            self.data_increase_line = cumulative_sum(self.every_data_amount)
-            self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
-            lzc = find_lzc(self.ratio)
-            if lzc is None:
-                ''' the a_buf is big enough to store all data on chip '''
-                ema = tile_io_ema
-            elif lzc == 0:
-                ''' the a_buf size is too small to process layer fusion '''
-                ema = None
-            else :
-                part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
-                if lzc == 1:
-                    ''' cut at residual_tile_data_amount '''
-                    ema = part_of_data_block * residual_ratio \
-                        + (self.x_merging_or_resi_data_amount + self.x_olp_data_amount) * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 2:
-                    ''' cut at x_merging_or_resi_data_amount '''
-                    ema = (part_of_data_block + self.x_olp_data_amount) * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 3:
-                    ''' cut at x_olp_data_amount '''
-                    ema = part_of_data_block * x_olp_ratio + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 4:
-                    ''' cut at next_tile_data_amount '''
-                    ema = (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 5:
-                    ''' cut at y_merging_or_resi_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
-                    ema = (self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio + self.current_tile_y_olp_data_amount) * y_olp_ratio + tile_io_ema
-                else :
-                    ''' cut at y_olp_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
-                    ema = self.current_tile_y_olp_data_amount * oversize_y_part_ratio * y_olp_ratio + tile_io_ema
-            self.ema = ema
-
         elif not self.is_feature_merging and self.is_rda:
-            # self.every_data_amount = [
-            #     self.minimal_abuf_for_stack_under_tsize ,
-            #     self.residual_tile_data_amount          ,
-            #     self.x_olp_data_amount                  ,
-            #     self.next_tile_data_amount              ,
-            #     self.x_merging_or_resi_data_amount      ,
-            #     self.y_olp_data_amount                  ,
-            #     self.y_merging_or_resi_data_amount
-            #     ]
-            # self.data_increase_line = cumulative_sum(self.every_data_amount)
-            # self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
-            # lzc = find_lzc(self.ratio)
-            # if lzc is None:
-            #     ''' the a_buf is big enough to store all data on chip '''
-            #     ema = tile_io_ema
-            # elif lzc == 0:
-            #     ''' the a_buf size is too small to process layer fusion '''
-            #     ema = None
-            # else :
-            #     part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
-            #     if lzc == 1:
-            #         ''' cut at residual_tile_data_amount '''
-            #         ema = part_of_data_block * residual_ratio \
-            #             + (self.x_merging_or_resi_data_amount + self.x_olp_data_amount) * x_olp_ratio \
-            #             + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-            #             + tile_io_ema
-            #     elif lzc == 2:
-            #         ''' cut at x_olp_data_amount '''
-            #         ema = (part_of_data_block + self.x_merging_or_resi_data_amount) * x_olp_ratio \
-            #             + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-            #             + tile_io_ema
-            #     elif lzc == 3:
-            #         ''' cut at next_tile_data_amount '''
-            #         ema = self.x_merging_or_resi_data_amount * x_olp_ratio \
-            #             + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-            #             + tile_io_ema
-            #     elif lzc == 4:
-            #         ''' cut at x_merging_or_resi_data_amount '''
-            #         ema = part_of_data_block * x_olp_ratio \
-            #             + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-            #             + tile_io_ema
-            #     elif lzc == 5:
-            #         ''' cut at y_olp_data_amount '''
-            #         oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
-            #         ema = (self.current_tile_y_olp_data_amount * oversize_y_part_ratio + self.current_tile_y_merging_or_resi_data_amount) * y_olp_ratio + tile_io_ema
-            #     else :
-            #         ''' cut at y_merging_or_resi_data_amount '''
-            #         oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
-            #         ema = self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio * y_olp_ratio + tile_io_ema
-            # self.ema = ema
-            self.every_data_amount = [
+            return [
                 self.minimal_abuf_for_stack_under_tsize ,
                 self.residual_tile_data_amount          ,
                 self.x_merging_or_resi_data_amount      ,
@@ -456,48 +529,8 @@ y merge/residual   | 同上                                          |   X
                 self.y_merging_or_resi_data_amount      ,
                 self.y_olp_data_amount
                 ]
-            self.data_increase_line = cumulative_sum(self.every_data_amount)
-            self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
-            lzc = find_lzc(self.ratio)
-            if lzc is None:
-                ''' the a_buf is big enough to store all data on chip '''
-                ema = tile_io_ema
-            elif lzc == 0:
-                ''' the a_buf size is too small to process layer fusion '''
-                ema = None
-            else :
-                part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
-                if lzc == 1:
-                    ''' cut at residual_tile_data_amount '''
-                    ema = part_of_data_block * residual_ratio \
-                        + (self.x_merging_or_resi_data_amount + self.x_olp_data_amount) * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 2:
-                    ''' cut at x_merging_or_resi_data_amount '''
-                    ema = (part_of_data_block + self.x_olp_data_amount) * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 3:
-                    ''' cut at x_olp_data_amount '''
-                    ema = part_of_data_block * x_olp_ratio + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 4:
-                    ''' cut at next_tile_data_amount '''
-                    ema = (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 5:
-                    ''' cut at y_merging_or_resi_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
-                    ema = (self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio + self.current_tile_y_olp_data_amount) * y_olp_ratio + tile_io_ema
-                else :
-                    ''' cut at y_olp_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
-                    ema = self.current_tile_y_olp_data_amount * oversize_y_part_ratio * y_olp_ratio + tile_io_ema
-            self.ema = ema
-
         elif not self.is_feature_merging and not self.is_rda:
-            self.every_data_amount = [
+            return [
                 self.minimal_abuf_for_stack_under_tsize ,
                 self.x_olp_data_amount                  ,
                 self.next_tile_data_amount              ,
@@ -506,98 +539,85 @@ y merge/residual   | 同上                                          |   X
                 self.x_merging_or_resi_data_amount      ,
                 self.y_merging_or_resi_data_amount
                 ]
-            self.data_increase_line = cumulative_sum(self.every_data_amount)
-            self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
-            lzc = find_lzc(self.ratio)
-            if lzc is None:
-                ''' the a_buf is big enough to store all data on chip '''
-                ema = tile_io_ema
-            elif lzc == 0:
-                ''' the a_buf size is too small to process layer fusion '''
-                ema = None
-            else :
-                part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
-                if lzc == 1:
-                    ''' cut at x_olp_data_amount '''
-                    ema = self.residual_tile_data_amount * residual_ratio \
-                        + (self.x_merging_or_resi_data_amount + part_of_data_block) * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 2:
-                    ''' cut at next_tile_data_amount '''
-                    ema = self.residual_tile_data_amount * residual_ratio \
-                        + self.x_merging_or_resi_data_amount * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 3:
-                    ''' cut at y_olp_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
-                    ema = self.residual_tile_data_amount * residual_ratio \
-                        + self.x_merging_or_resi_data_amount * x_olp_ratio \
-                        + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount * oversize_y_part_ratio) * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 4:
-                    ''' cut at residual_tile_data_amount '''
-                    ema = part_of_data_block * residual_ratio \
-                        + self.x_merging_or_resi_data_amount * x_olp_ratio \
-                        + self.current_tile_y_merging_or_resi_data_amount * y_olp_ratio \
-                        + tile_io_ema
-                elif lzc == 5:
-                    ''' cut at x_merging_or_resi_data_amount '''
-                    ema = part_of_data_block * x_olp_ratio \
-                        + self.current_tile_y_merging_or_resi_data_amount * y_olp_ratio \
-                        + tile_io_ema
-                else :
-                    ''' cut at y_merging_or_resi_data_amount '''
-                    oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
-                    ema = self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio * y_olp_ratio \
-                        + tile_io_ema
-            self.ema = ema
-       
         else:
             sys.exit("error: Merging But No RDA.")
-        # self.data_increase_line = cumulative_sum(self.every_data_amount)
-        # self.ratio = [0 if dt <= self.a_buf_size else 1 for dt in self.data_increase_line]
-        # lzc = find_lzc(self.ratio)
-        
-        # if lzc is None:
-        #     ''' the a_buf is big enough to store all data on chip '''
-        #     ema = self.get_tile_io_ema()
-        # elif lzc == 0:
-        #     ''' the a_buf size is too small to process layer fusion '''
-        #     ema = None
-        # else :
-        #     part_of_data_block = self.data_increase_line[lzc] - self.a_buf_size
-        #     x_olp_ratio = self.x_olp_ema_ratio(ttype=self.tile_type)
-        #     y_olp_ratio = self.y_olp_ema_ratio(ttype=self.tile_type)
-        #     residual_ratio = 1 if self.first_true_id == 0 else 2
-        #     if lzc == 1:
-        #         ''' cut at residual_tile_data_amount '''
-        #         ema = part_of_data_block * residual_ratio \
-        #             + (self.x_merging_or_resi_data_amount + self.x_olp_data_amount) * x_olp_ratio \
-        #             + (self.y_merging_or_resi_data_amount + self.y_olp_data_amount) * y_olp_ratio \
-        #             + self.get_tile_io_ema()
-        #     elif lzc == 2:
-        #         ''' cut at x_merging_or_resi_data_amount '''
-        #         ema = (part_of_data_block + x_olp_ratio) * x_olp_ratio \
-        #             + (self.y_merging_or_resi_data_amount + self.y_olp_data_amount) * y_olp_ratio \
-        #             + self.get_tile_io_ema()
-        #     elif lzc == 3:
-        #         ''' cut at next_tile_data_amount '''
-        #         ema = self.x_olp_data_amount * x_olp_ratio + (self.y_merging_or_resi_data_amount + self.y_olp_data_amount) * y_olp_ratio \
-        #             + self.get_tile_io_ema()
-        #     elif lzc == 4:
-        #         ''' cut at x_olp_data_amount '''
-        #         ema = part_of_data_block * x_olp_ratio + (self.y_merging_or_resi_data_amount + self.y_olp_data_amount) * y_olp_ratio \
-        #             + self.get_tile_io_ema()
-        #     elif lzc == 5:
-        #         ''' cut at y_merging_or_resi_data_amount '''
-        #         ema = (part_of_data_block + self.y_olp_data_amount) * y_olp_ratio + self.get_tile_io_ema()
-        #     else :
-        #         ''' cut at y_olp_data_amount '''
-        #         ema = part_of_data_block * y_olp_ratio + self.get_tile_io_ema()
-
-        # self.ema = ema
+
+    def ema_at_cut(self, lzc, part_of_data_block):
+        """
+        EMA of a single tile when data_increase_line is cut at index lzc (1 <= lzc <= 6),
+        part_of_data_block is the overflow of the cut data block, i.e. data_increase_line[lzc] - a_buf_size.
+        The result is affine in part_of_data_block, so EMA is piecewise linear in a_buf_size.
+        """
+        x_olp_ratio = self.x_olp_ema_ratio(ttype=self.tile_type)
+        y_olp_ratio = self.y_olp_ema_ratio(ttype=self.tile_type)
+        residual_ratio = 1 if self.first_true_id == 0 else 2
+        tile_io_ema = self.get_tile_io_ema()
+        if self.is_rda:
+            if lzc == 1:
+                ''' cut at residual_tile_data_amount '''
+                ema = part_of_data_block * residual_ratio \
+                    + (self.x_merging_or_resi_data_amount + self.x_olp_data_amount) * x_olp_ratio \
+                    + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 2:
+                ''' cut at x_merging_or_resi_data_amount '''
+                ema = (part_of_data_block + self.x_olp_data_amount) * x_olp_ratio \
+                    + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 3:
+                ''' cut at x_olp_data_amount '''
+                ema = part_of_data_block * x_olp_ratio + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 4:
+                ''' cut at next_tile_data_amount '''
+                ema = (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 5:
+                ''' cut at y_merging_or_resi_data_amount '''
+                oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
+                ema = (self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio + self.current_tile_y_olp_data_amount) * y_olp_ratio + tile_io_ema
+            else :
+                ''' cut at y_olp_data_amount '''
+                oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
+                ema = self.current_tile_y_olp_data_amount * oversize_y_part_ratio * y_olp_ratio + tile_io_ema
+        else:
+            if lzc == 1:
+                ''' cut at x_olp_data_amount '''
+                ema = self.residual_tile_data_amount * residual_ratio \
+                    + (self.x_merging_or_resi_data_amount + part_of_data_block) * x_olp_ratio \
+                    + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 2:
+                ''' cut at next_tile_data_amount '''
+                ema = self.residual_tile_data_amount * residual_ratio \
+                    + self.x_merging_or_resi_data_amount * x_olp_ratio \
+                    + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 3:
+                ''' cut at y_olp_data_amount '''
+                oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 2)
+                ema = self.residual_tile_data_amount * residual_ratio \
+                    + self.x_merging_or_resi_data_amount * x_olp_ratio \
+                    + (self.current_tile_y_merging_or_resi_data_amount + self.current_tile_y_olp_data_amount * oversize_y_part_ratio) * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 4:
+                ''' cut at residual_tile_data_amount '''
+                ema = part_of_data_block * residual_ratio \
+                    + self.x_merging_or_resi_data_amount * x_olp_ratio \
+                    + self.current_tile_y_merging_or_resi_data_amount * y_olp_ratio \
+                    + tile_io_ema
+            elif lzc == 5:
+                ''' cut at x_merging_or_resi_data_amount '''
+                ema = part_of_data_block * x_olp_ratio \
+                    + self.current_tile_y_merging_or_resi_data_amount * y_olp_ratio \
+                    + tile_io_ema
+            else :
+                ''' cut at y_merging_or_resi_data_amount '''
+                oversize_y_part_ratio = self.get_oversize_y_part_ratio(part_of_data_block, 1)
+                ema = self.current_tile_y_merging_or_resi_data_amount * oversize_y_part_ratio * y_olp_ratio \
+                    + tile_io_ema
+        return ema
+
     def get_oversize_y_part_ratio(self, part_of_data_block, data_type):
         if data_type == 1: # type_1 for y_merging_or_resi
             return part_of_data_block / self.y_merging_or_resi_data_amount
@@ -628,21 +648,14 @@ y merge/residual   | 同上                                          |   X
             return 0
 
 
-    def multiply_tmp_unroll(self, i) -> int:
-        ''' i is layer_id in current stack '''
-        tmp_unroll  = ceil(self.out_tile_h_lst[i] / self.dla.u_h) \
-                    * ceil(self.out_tile_w_lst[i] / self.dla.u_w) \
-                    * ceil(self.stack.och_per_layer[i] / self.dla.u_oc) \
-                    * ceil(self.stack.ich_per_layer[i] / self.dla.u_ic) \
-                    * ceil(self.stack.kernel_size[i] / self.dla.u_fx) \
-                    * ceil(self.stack.kernel_size[i] / self.dla.u_fy)
-        return tmp_unroll
+    def calc_tmp_unroll_of_stack(self):
+        # 查表, 见 MacCycleTable, 最后一层的 out tile 就是 true tile size
+        self.tmp_unroll_of_stack = get_mac_cycle_table(self.dla, self.stack)[self.out_tile_h_lst[-1], self.out_tile_w_lst[-1]]
 
 
     def calc_en(self):
-        e_mac = 0.05    # pJ ?  energy unit of single mac
-        e_ema = 500     # pJ ?  energy unit of single ema
-        self.tmp_unroll_of_stack = sum([self.multiply_tmp_unroll(i) for i in range(self.stack.stack_len)])
+        e_mac = self.e_mac
+        e_ema = self.e_ema
         if self.ema is not None:
             en_of_macs = self.tmp_unroll_of_stack * self.dla.number_of_mac * e_mac #number_of_mac用ceil有冗余
             en_of_datas = self.ema * e_ema
@@ -683,94 +696,10 @@ y merge/residual   | 同上                                          |   X
     
     
     def __add__(self, other):
-        sum = pickle_deepcopy(self)
-
-        # EDP
-        sum.edp = (sum.en + other.en) * (sum.la + other.la)   # edp 不可以直接累加
-
-        # EMA
-        if (sum.ema is None) or (other.ema is None):
-            sum.ema = None
-        else:
-            sum.ema += other.ema
-
-        # EN
-        sum.en_of_macs += other.en_of_macs
-        sum.en_of_datas += other.en_of_datas
-        sum.en += other.en
-
-        # LA
-        sum.la += other.la
-
-        # Stack
-        if type(sum.stack) != list:
-            sum.stack = [sum.stack.id]
-        if type(other.stack) != list:
-            other_stack = [other.stack.id]
-        else:
-            other_stack = other.stack
-        if sum.stack != other_stack:
-            sum.stack += other_stack
-
-        # Tile type
-        if type(sum.tile_type) != list:
-            sum.tile_type = [sum.tile_type]
-        if type(other.tile_type) != list:
-            other_tile_type = [other.tile_type]
-        else:
-            other_tile_type = other.tile_type
-        sum.tile_type += other_tile_type
-
-        # Tile size
-        if sum.tile_size != other.tile_size:
-            sum.tile_size = (-1, -1)
-
-        # a_buf_size
-        if sum.a_buf_size != other.a_buf_size:
-            raise TypeError(f'cmes with different a_buf_size cannot add !!!')
-        
-        # Not Addable
-        func = [
-            "calc_data_amount",
-            "calc_minimal_abuf_for_stack_under_tsize",
-            "backpropagation_tile_data_amount",
-            "number_of_tile",
-            "calc_residual_tile_data_amount",
-            "calc_merging_length_or_resi_shift",
-            "calc_merging_or_residual_data_amount",
-            "residual_shift",
-            "calc_next_tile_data_amount",
-            "calc_olp_data_amount",
-            "calc_edp",
-            "calc_ema",
-            "x_olp_ema_ratio",
-            "y_olp_ema_ratio",
-            "multiply_tmp_unroll",
-            "calc_en",
-            "calc_la",
-            "times_tile_number",
-            "get_oversize_y_part_ratio",
-            "get_tile_io_ema",
-            "current_tile_y_merging_or_resi_data_amount",
-        ]
-        add_attr = [
-            "ema",
-            "en",
-            "en_of_macs",
-            "en_of_datas",
-            "la",
-            "edp",
-            "tile_type",
-            "stack",
-            "tile_size",
-            "a_buf_size",
-        ]
-
-        for attr in dir(sum):
-            if attr not in (func + add_attr) and attr[0] != "_":
-                delattr(sum, attr)
-
-        return sum
+        acc = CostModelAccumulator()
+        acc.add(self)
+        acc.add(other)
+        return acc.summary()
 
 
     def __jsonrepr__(self):
@@ -0,0 +1,113 @@
+import logging
+from bisect import bisect_right
+from copy import copy
+from typing import List, Tuple
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from utils import find_lzc
+logger = logging.getLogger(__name__)
+
+
+class EmaCurve:
+    """
+    closed-form EMA(a_buf_size) of one (stack, tile size, tile type, strategy).
+
+    CostModelEvaluation.calc_data_amount 得到的各类数据量以及 data_increase_line 都与 a_buf_size 无关,
+    只有切点 lzc 和溢出量 part_of_data_block 随 a_buf_size 变化. 因此这里只构建一次 CostModelEvaluation,
+    把 data_increase_line 的取值排序后作为分段点, 每一段内 lzc 固定, EMA 是 a_buf_size 的一次函数.
+    之后任意 a_buf_size 的 EMA / EDP 都只需一次二分查找.
+
+    region i covers a_buf_size (Byte) in [self.bounds[i], self.bounds[i+1]), region -1 is a_buf_size < self.bounds[0]
+    """
+    def __init__(self, *, dla: Dla, stack: Stack, tile_size: Tuple[int], tile_type: str, is_feature_merging: bool, is_rda: bool):
+        self.cme = CostModelEvaluation(
+            dla=dla,
+            a_buf_size=0,
+            stack=stack,
+            tile_size=tile_size,
+            tile_type=tile_type,
+            is_feature_merging=is_feature_merging,
+            is_rda=is_rda,
+        )
+        self.breakpoints = self.cme.data_increase_line    # Byte
+        self.min_a_buf_size = self.cme.minimal_abuf_for_stack_under_tsize  # Byte, == self.breakpoints[0]
+        self.bounds = sorted(set(self.breakpoints))
+        self.calc_regions()
+
+
+    def calc_regions(self):
+        """
+        the ratio list (and so lzc) is constant between two adjacent distinct breakpoints,
+        so it is evaluated once at the left bound of every region
+        """
+        self.infeasible_region = ([1] * len(self.breakpoints), 0)
+        self.regions = []
+        for bound in self.bounds:
+            ratio = [0 if dt <= bound else 1 for dt in self.breakpoints]
+            self.regions.append((ratio, find_lzc(ratio)))
+
+
+    def get_region(self, a_buf_size_byte):
+        idx = bisect_right(self.bounds, a_buf_size_byte) - 1
+        if idx < 0:
+            return self.infeasible_region
+        return self.regions[idx]
+
+
+    def tile_ema(self, a_buf_size_byte):
+        """ EMA of a single tile (before outer_add and tile number), None if layer fusion is not possible """
+        _, lzc = self.get_region(a_buf_size_byte)
+        if lzc is None:
+            return self.cme.get_tile_io_ema()
+        elif lzc == 0:
+            return None
+        return self.cme.ema_at_cut(lzc, self.breakpoints[lzc] - a_buf_size_byte)
+
+
+    def cme_at(self, a_buf_size) -> CostModelEvaluation:
+        """
+        CostModelEvaluation at a_buf_size (KB), without re-running calc_data_amount.
+        the returned object is a shallow copy of the base cme, footprint attributes are shared.
+        """
+        cme = copy(self.cme)
+        cme.a_buf_size = a_buf_size * 1024
+        cme.ratio, _ = self.get_region(cme.a_buf_size)
+        cme.ema = self.tile_ema(cme.a_buf_size)
+        cme.calc_edp_under_ema()
+        return cme
+
+
+    def ema(self, a_buf_size):
+        return self.cme_at(a_buf_size).ema
+
+
+    def edp(self, a_buf_size):
+        return self.cme_at(a_buf_size).edp
+
+
+    def segments(self) -> List[dict]:
+        """
+        piecewise-linear form of the (per tile) EMA, a_buf_size in Byte:
+            ema = intercept + slope * a_buf_size, for lower <= a_buf_size < upper
+        infeasible regions (lzc == 0) are left out.
+        """
+        segments = []
+        uppers = self.bounds[1:] + [float('inf')]
+        for lower, upper, (_, lzc) in zip(self.bounds, uppers, self.regions):
+            if lzc == 0:
+                continue
+            if lzc is None:
+                intercept, slope = self.cme.get_tile_io_ema(), 0
+            else:
+                line = self.breakpoints[lzc]
+                ema_0 = self.cme.ema_at_cut(lzc, 0)
+                ema_1 = self.cme.ema_at_cut(lzc, 1)
+                slope = ema_0 - ema_1
+                intercept = ema_0 - slope * line
+            segments.append({"lower": lower, "upper": upper, "lzc": lzc, "intercept": intercept, "slope": slope})
+        return segments
+
+
+    def __repr__(self) -> str:
+        return f"EmaCurve(stack={self.cme.stack}, tsize={self.cme.tile_size}, ttype={self.cme.tile_type}, breakpoints={self.bounds})"
@@ -0,0 +1,87 @@
+import logging
+from typing import List, Tuple
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.tile_gen import TileTypeGenerator
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.footprint_cache import FootprintCache
+logger = logging.getLogger(__name__)
+
+
+class FeasibilityOracle:
+    """
+    smallest a_buf_size (Byte) that can process layer fusion, and the a_buf_size from which EMA saturates,
+    both known before any sweep.
+
+    a (stack, tile type) is infeasible iff a_buf_size < minimal_abuf_for_stack_under_tsize (the first block of
+    data_increase_line, i.e. lzc == 0), so a stack needs the max of it over its tile types and the network needs
+    the max over its stacks.
+    once a_buf_size >= data_increase_line[-1] of every (stack, tile type), find_lzc gives None and EMA is only the
+    tile io EMA, i.e. every result stops changing with a_buf_size (saturation).
+    both only depend on the footprint, which goes into footprint_cache and is reused by the sweep afterwards.
+    the threshold only needs the tile geometry, so thresholds (e.g. the tile size pruning of TileSizeGenerator) are
+    found with lazy CostModelEvaluations that never compute the other data amounts.
+    """
+    def __init__(self, *, dla: Dla, stacks: List[Stack], is_feature_merging: bool, is_rda: bool, footprint_cache: FootprintCache = None):
+        self.dla = dla
+        self.stacks = stacks
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.footprint_cache = footprint_cache
+        self.thresholds = {}    # (stack, tile_size) -> threshold, Byte
+        self.saturations = {}   # (stack, tile_size) -> saturation, Byte
+        self.cmes = {}  # (stack, tile_size) -> lazy cmes whose saturation is not asked yet, shared with the threshold
+
+    def get_cmes(self, stack: Stack, tile_size: Tuple[int]) -> List[CostModelEvaluation]:
+        """lazy CostModelEvaluation of every tile type at a_buf_size 0, nothing is computed before the first access"""
+        key = (stack, tuple(tile_size))
+        if key not in self.cmes:
+            self.cmes[key] = [
+                CostModelEvaluation(
+                    dla=self.dla,
+                    a_buf_size=0,
+                    stack=stack,
+                    tile_size=tile_size,
+                    tile_type=ttype,
+                    is_feature_merging=self.is_feature_merging,
+                    is_rda=self.is_rda,
+                    footprint_cache=self.footprint_cache,
+                    lazy=True,
+                )
+                for ttype in TileTypeGenerator(tile_size, stack).run()
+            ]
+        return self.cmes[key]
+
+    def get_stack_bounds(self, stack: Stack, tile_size: Tuple[int]) -> Tuple[int, int]:
+        """(threshold, saturation) of a stack under tile_size, Byte"""
+        return self.get_stack_threshold(stack, tile_size), self.get_stack_saturation(stack, tile_size)
+
+    def get_stack_threshold(self, stack: Stack, tile_size: Tuple[int]) -> int:
+        key = (stack, tuple(tile_size))
+        if key not in self.thresholds:
+            self.thresholds[key] = max(cme.minimal_abuf_for_stack_under_tsize for cme in self.get_cmes(stack, tile_size))
+        return self.thresholds[key]
+
+    def get_stack_saturation(self, stack: Stack, tile_size: Tuple[int]) -> int:
+        key = (stack, tuple(tile_size))
+        if key not in self.saturations:
+            self.saturations[key] = max(cme.data_increase_line[-1] for cme in self.get_cmes(stack, tile_size))
+            del self.cmes[key]
+        return self.saturations[key]
+
+    def get_stack_thresholds(self, tile_size: Tuple[int]) -> List[int]:
+        return [self.get_stack_threshold(stack, tile_size) for stack in self.stacks]
+
+    def get_threshold(self, tile_size: Tuple[int]) -> int:
+        return max(self.get_stack_thresholds(tile_size))
+
+    def is_feasible(self, a_buf_size, tile_size: Tuple[int]) -> bool:
+        """:param a_buf_size: KB, as in IterateMemOrTileStage"""
+        return a_buf_size * 1024 >= self.get_threshold(tile_size)
+
+    def get_saturation(self, tile_size: Tuple[int]) -> int:
+        return max(self.get_stack_saturation(stack, tile_size) for stack in self.stacks)
+
+    def is_saturated(self, a_buf_size, tile_size: Tuple[int]) -> bool:
+        """:param a_buf_size: KB, results at any a_buf_size >= this one are the same"""
+        return a_buf_size * 1024 >= self.get_saturation(tile_size)
@@ -0,0 +1,125 @@
+import logging
+from collections import OrderedDict
+from typing import Tuple
+logger = logging.getLogger(__name__)
+
+
+class FootprintCache:
+    """
+    LRU cache of the a_buf_size-independent part of CostModelEvaluation,
+    i.e. every attribute set by calc_data_amount.
+
+    key: (stack, tile_size, tile_type, is_feature_merging, is_rda), the data amounts do not depend on the hardware,
+    so during a mem size sweep every buffer point only re-runs the cut/EMA step (calc_edp) and tmp_unroll.
+    tile_size is clamped to the ofm size of the stack first, like CostModelEvaluation does.
+    the per-layer tile geometry of backpropagation_tile_data_amount only depends on (stack, true_tile_h, true_tile_w),
+    it is kept under that canonical key and shared by every tile type, tile size and strategy with the same true tile.
+    with ema_max_size > 0 the cut/EMA step of every (key, a_buf_size) is kept as well, it does not depend on
+    the hardware either, so hardware variants (IterateHardwareStage) only recompute tmp_unroll, en and la.
+    lazy CostModelEvaluations of infeasible points only compute the tile geometry and tile number, kept under the
+    footprint key as well (get_minimal), so the next a_buf_size does not recompute them.
+    """
+    def __init__(self, max_size: int = 4096, ema_max_size: int = 0):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.geometry_entries = OrderedDict()
+        self.geometry_hits = 0
+        self.minimal_entries = OrderedDict()
+        self.minimal_hits = 0
+        self.ema_max_size = ema_max_size
+        self.ema_entries = OrderedDict()
+        self.ema_hits = 0
+
+    @staticmethod
+    def stack_key(stack):
+        # stack 按内容做 key, 每个硬件变体都会重新解析 workload, 得到新的 Stack 对象
+        return stack.content_hash
+
+    @classmethod
+    def make_key(cls, stack, tile_size: Tuple[int], tile_type: str, is_feature_merging: bool, is_rda: bool):
+        tile_size = (min(tile_size[0], stack.ofm_h), min(tile_size[1], stack.ofm_w))
+        return (cls.stack_key(stack), tile_size, tile_type, is_feature_merging, is_rda)
+
+    @classmethod
+    def make_geometry_key(cls, stack, true_tile_h: int, true_tile_w: int):
+        return (cls.stack_key(stack), true_tile_h, true_tile_w)
+
+    def get_geometry(self, key):
+        geometry = self.geometry_entries.get(key)
+        if geometry is not None:
+            self.geometry_hits += 1
+            self.geometry_entries.move_to_end(key)
+        return geometry
+
+    def put_geometry(self, key, geometry: dict):
+        self.geometry_entries[key] = geometry
+        if len(self.geometry_entries) > self.max_size:
+            self.geometry_entries.popitem(last=False)
+
+    def get_minimal(self, key):
+        """tile geometry and tile number of key, None if not kept"""
+        minimal = self.minimal_entries.get(key)
+        if minimal is not None:
+            self.minimal_hits += 1
+            self.minimal_entries.move_to_end(key)
+        return minimal
+
+    def put_minimal(self, key, minimal: dict):
+        self.minimal_entries[key] = minimal
+        if len(self.minimal_entries) > self.max_size:
+            self.minimal_entries.popitem(last=False)
+
+    def get_ema(self, key, a_buf_size):
+        """(ratio, ema) of key at a_buf_size (Byte), None if not kept"""
+        entry = self.ema_entries.get((key, a_buf_size))
+        if entry is not None:
+            self.ema_hits += 1
+            self.ema_entries.move_to_end((key, a_buf_size))
+        return entry
+
+    def put_ema(self, key, a_buf_size, ratio, ema):
+        if self.ema_max_size <= 0:
+            return
+        self.ema_entries[(key, a_buf_size)] = (ratio, ema)
+        if len(self.ema_entries) > self.ema_max_size:
+            self.ema_entries.popitem(last=False)
+
+    def __contains__(self, key):
+        """without touching the stats and the LRU order"""
+        return key in self.entries
+
+    def get(self, key):
+        footprint = self.entries.get(key)
+        if footprint is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return footprint
+
+    def put(self, key, footprint: dict):
+        self.entries[key] = footprint
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "geometry_hits": self.geometry_hits,
+            "geometry_size": len(self.geometry_entries),
+            "minimal_hits": self.minimal_hits,
+            "minimal_size": len(self.minimal_entries),
+            "ema_hits": self.ema_hits,
+            "ema_size": len(self.ema_entries),
+        }
+
+    def __repr__(self) -> str:
+        return f"FootprintCache(hits={self.hits}, misses={self.misses}, size={len(self.entries)}/{self.max_size})"
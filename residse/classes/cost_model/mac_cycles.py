@@ -0,0 +1,50 @@
+import logging
+from functools import lru_cache
+import numpy as np
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+logger = logging.getLogger(__name__)
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+class MacCycleTable:
+    """
+    compute cycles (tmp_unroll_of_stack) of a stack for every output tile size (out_tile_h, out_tile_w) of its last layer,
+    the sum over the layers of the unrolled loop counts of the per-layer out tile (out_tile_h_lst[i], out_tile_w_lst[i]):
+        cycles[h, w] = sum_i ceil(h * m_i / u_h) * ceil(w * m_i / u_w) * ceil(och_i / u_oc) * ceil(ich_i / u_ic) * ceil(k_i / u_fx) * ceil(k_i / u_fy)
+    m_i is the stride product after layer i. the h part (with the channel / kernel part) and the w part are built once
+    for every h in [0, ofm_h] and w in [0, ofm_w] with NumPy, a look up is a dot product over the layers,
+    so the table costs (ofm_h + ofm_w) x stack_len instead of ofm_h x ofm_w.
+    """
+    def __init__(self, mac_unroll: dict, stack: Stack):
+        u_h, u_w, u_oc, u_ic, u_fx, u_fy = (mac_unroll.get(dim, 1) for dim in ['h', 'w', 'oc', 'ic', 'fx', 'fy'])
+        out_mult = stack.out_mult
+        kernel_size = stack.dims[:, 5]
+        per_layer = (
+            _ceil_div(stack.dims[:, 2], u_oc)
+            * _ceil_div(stack.dims[:, 3], u_ic)
+            * _ceil_div(kernel_size, u_fx)
+            * _ceil_div(kernel_size, u_fy)
+        )
+        self.h_cycles = _ceil_div(np.arange(stack.ofm_h + 1, dtype=np.int64)[:, None] * out_mult, u_h) * per_layer
+        self.w_cycles = _ceil_div(np.arange(stack.ofm_w + 1, dtype=np.int64)[:, None] * out_mult, u_w)
+        self.looked_up = {}     # (h, w) -> cycles, scalar look ups of the CMEs
+
+    def __getitem__(self, tile):
+        """tile: (out_tile_h, out_tile_w), ints or broadcastable int arrays"""
+        h, w = tile
+        if np.isscalar(h) and np.isscalar(w):
+            cycles = self.looked_up.get(tile)
+            if cycles is None:
+                cycles = self.looked_up[tile] = int(self.h_cycles[h] @ self.w_cycles[w])
+            return cycles
+        return (self.h_cycles[h] * self.w_cycles[w]).sum(axis=-1)
+
+
+@lru_cache(maxsize=1024)
+def get_mac_cycle_table(dla: Dla, stack: Stack) -> MacCycleTable:
+    """table of stack under the mac unroll of dla, built once per (dla, stack)"""
+    return MacCycleTable(dla.mac_unroll, stack)
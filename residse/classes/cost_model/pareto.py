@@ -0,0 +1,93 @@
+import logging
+from bisect import bisect_left, bisect_right
+from typing import List
+import numpy as np
+logger = logging.getLogger(__name__)
+
+
+def pareto_front(en: np.ndarray, la: np.ndarray) -> np.ndarray:
+    """
+    indices of the non-dominated (en, la) points, both minimized, sorted by en.
+    of several points with the same (en, la) only the first one is kept.
+    """
+    order = np.lexsort((la, en))
+    la_sorted = la[order]
+    best_la_before = np.minimum.accumulate(np.concatenate(([np.inf], la_sorted[:-1])))
+    return order[la_sorted < best_la_before]
+
+
+def merge_fronts(en_of_stacks: List[np.ndarray], la_of_stacks: List[np.ndarray]):
+    """
+    choose one option per stack to minimize sum(en) * sum(la) (network EDP).
+
+    EDP is increasing in both sums, so the best choice lies on the Pareto front of (sum(en), sum(la)).
+    that front is built stack by stack: (front so far) + (front of the next stack), pruned to its Pareto front again,
+    instead of trying every combination of options.
+    :param en_of_stacks: en of every option of every stack, la_of_stacks likewise
+    :return: (option index of every stack, sum(en), sum(la)) of the minimal EDP
+    """
+    front_en, front_la = np.zeros(1), np.zeros(1)
+    choices = np.zeros((1, 0), dtype=int)
+    for en, la in zip(en_of_stacks, la_of_stacks):
+        keep = pareto_front(en, la)
+        sum_en = (front_en[:, None] + en[keep][None, :]).ravel()
+        sum_la = (front_la[:, None] + la[keep][None, :]).ravel()
+        sum_choices = np.hstack([np.repeat(choices, len(keep), axis=0), np.tile(keep, len(front_en))[:, None]])
+        front = pareto_front(sum_en, sum_la)
+        front_en, front_la, choices = sum_en[front], sum_la[front], sum_choices[front]
+    best = np.argmin(front_en * front_la)
+    return choices[best], front_en[best], front_la[best]
+
+
+class ParetoFront:
+    """
+    non-dominated set of points streamed in one by one, every objective minimized.
+    points are kept sorted by the first objective, so a new point is only compared with the points before it (can
+    they dominate it?) and after it (does it dominate them?), found by bisection. with 2 objectives the front is a
+    staircase (second objective strictly decreasing) and both checks are a single neighbour, i.e. O(log n) search per
+    insertion. a point equal to a kept one is dropped. memory is proportional to the front size, not to the stream.
+    """
+    def __init__(self, nb_of_objectives: int):
+        self.nb_of_objectives = nb_of_objectives
+        self.firsts = []    # first objective of every point, for bisect
+        self.values = []    # objective tuple of every point
+        self.items = []     # payload of every point
+        self.nb_of_seen = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(zip(self.values, self.items))
+
+    @staticmethod
+    def dominates(a, b) -> bool:
+        """a <= b in every objective (equal points count as dominated)"""
+        return all(x <= y for x, y in zip(a, b))
+
+    def insert(self, values, item=None) -> bool:
+        """:return: whether the point is on the front (so far)"""
+        values = tuple(values)
+        assert len(values) == self.nb_of_objectives
+        self.nb_of_seen += 1
+        lo = bisect_left(self.firsts, values[0])
+        hi = bisect_right(self.firsts, values[0])
+        if self.nb_of_objectives == 2:
+            # staircase: only values[lo-1] or values[lo] (same first) can dominate the new point
+            if (lo > 0 and self.values[lo - 1][1] <= values[1]) or (lo < hi and self.values[lo][1] <= values[1]):
+                return False
+            end = lo
+            while end < len(self.values) and self.values[end][1] >= values[1]:
+                end += 1
+            del self.firsts[lo:end], self.values[lo:end], self.items[lo:end]
+        else:
+            if any(self.dominates(kept, values) for kept in self.values[:hi]):
+                return False
+            keep = [i for i in range(lo, len(self.values)) if not self.dominates(values, self.values[i])]
+            self.firsts[lo:] = [self.firsts[i] for i in keep]
+            self.values[lo:] = [self.values[i] for i in keep]
+            self.items[lo:] = [self.items[i] for i in keep]
+        self.firsts.insert(lo, values[0])
+        self.values.insert(lo, values)
+        self.items.insert(lo, item)
+        return True
@@ -0,0 +1,66 @@
+import logging
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+logger = logging.getLogger(__name__)
+
+
+class CostModelRecord:
+    """
+    compact result of one CostModelEvaluation (stack, tile size, tile type, a_buf_size, strategy), what the stages,
+    savers and plotters downstream of ResidseCostModelStage use: the keys, the results and the raw counts.
+    the per-layer lists, every_data_amount, ratio ... are dropped, rebuild() runs the cost model again for them.
+    dla and stack are references to the shared objects of the experiment.
+    """
+    __slots__ = (
+        'dla', 'stack', 'a_buf_size', 'tile_size', 'tile_type', 'is_feature_merging', 'is_rda',
+        'ema', 'en', 'en_of_macs', 'en_of_datas', 'la', 'la_of_macs', 'la_of_datas', 'edp',
+        'ema_per_tile', 'tmp_unroll_of_stack', 'tile_number_of_current_type', 'minimal_abuf_for_stack_under_tsize',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_cme(cls, cme: CostModelEvaluation) -> 'CostModelRecord':
+        return cls(**{name: getattr(cme, name) for name in cls.__slots__})
+
+    def rebuild(self, footprint_cache=None) -> CostModelEvaluation:
+        """the full CostModelEvaluation of this point"""
+        return CostModelEvaluation(
+            dla=self.dla,
+            a_buf_size=self.a_buf_size / 1024,
+            stack=self.stack,
+            tile_size=self.tile_size,
+            tile_type=self.tile_type,
+            is_feature_merging=self.is_feature_merging,
+            is_rda=self.is_rda,
+            footprint_cache=footprint_cache,
+        )
+
+    def __str__(self):
+        return f"cme(stack={self.stack}, tsize={self.tile_size}, ttype={self.tile_type}, edp={self.edp}, en={self.en}, la={self.la}, ema={self.ema})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __add__(self, other):
+        acc = CostModelAccumulator()
+        acc.add(self)
+        acc.add(other)
+        return acc.summary()
+
+    def __jsonrepr__(self):
+        """
+        JSON representation used for saving this object to a complete json file.
+        """
+        return {
+            "EDP": self.edp,
+            "energy": {
+                "total_en": self.en,
+                "macs_en": self.en_of_macs,
+                "data_move_en": self.en_of_datas,
+            },
+            "latency": self.la,
+            "EMA": self.ema,
+        }
@@ -0,0 +1,100 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import pickle
+from typing import Tuple
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.cost_model import CostModelEvaluation, COST_MODEL_VERSION
+from residse.classes.cost_model.record import CostModelRecord
+from residse.classes.cost_model.accumulator import CostModelSummary
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    content-addressed on-disk cache of per-stack results, i.e. the (sum_cme, cme_of_types) of SumAllTileTypeStage.
+
+    key = sha256 of the stack content (layer dicts of Stack.stack_di, without layer names), the Dla fields used by the
+    cost model, tile size, a_buf_size, strategy, COST_MODEL_VERSION and the qualified names of the pickled classes
+    (PAYLOAD_TYPES). so a small edit to a workload or hardware file only re-evaluates the stacks / buffer points that
+    changed, identical stacks (in one network or across networks) share one entry, and an entry of another payload
+    type is never loaded.
+    """
+    PAYLOAD_TYPES = (CostModelSummary, CostModelRecord)   # (sum_cme, cme of every tile type)
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(dla: Dla, stack: Stack, tile_size: Tuple[int], a_buf_size, is_feature_merging: bool, is_rda: bool) -> str:
+        content = {
+            "stack": list(stack.stack_di.values()),
+            "mac_unroll": dla.mac_unroll,
+            "dram_bw": dla.dram.bw,
+            "e_mac": CostModelEvaluation.e_mac,
+            "e_ema": CostModelEvaluation.e_ema,
+            "tile_size": list(tile_size),
+            "a_buf_size": a_buf_size,
+            "is_feature_merging": is_feature_merging,
+            "is_rda": is_rda,
+            "version": COST_MODEL_VERSION,
+            "payload": [f"{cls.__module__}.{cls.__qualname__}" for cls in ResultCache.PAYLOAD_TYPES],
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pickle")
+
+    def load(self, key: str, dla: Dla, stack: Stack):
+        """
+        :return: (sum_cme, cme_of_types) re-bound to dla and stack, or None if not cached
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as handle:
+                sum_cme, cme_of_types = pickle.load(handle)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # AttributeError / ImportError: pickled with a class that no longer exists
+            self.misses += 1
+            return None
+        summary_type, cme_type = self.PAYLOAD_TYPES
+        if not isinstance(sum_cme, (summary_type, type(None))) or not all(isinstance(cme, (cme_type, type(None))) for cme in cme_of_types):
+            logger.warning(f'{path} holds {type(sum_cme).__name__} / {[type(cme).__name__ for cme in cme_of_types]}, not {self.PAYLOAD_TYPES}, evaluating again')
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        # the entry may come from an identical stack with another id / from another network
+        for cme in cme_of_types:
+            if cme is not None:
+                cme.dla = dla
+                cme.stack = stack
+        if sum_cme is not None:
+            sum_cme.stack = [stack.id]
+        return sum_cme, cme_of_types
+
+    def store(self, key: str, sum_cme, cme_of_types: list):
+        # dla / stack are given again by load(), keep them out of the entry
+        cme_of_types = [None if cme is None else copy.copy(cme) for cme in cme_of_types]
+        for cme in cme_of_types:
+            if cme is not None:
+                cme.dla = None
+                cme.stack = None
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename, so parallel workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            pickle.dump((sum_cme, cme_of_types), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cache_dir": self.cache_dir}
+
+    def __repr__(self) -> str:
+        return f"ResultCache(dir={self.cache_dir}, hits={self.hits}, misses={self.misses})"
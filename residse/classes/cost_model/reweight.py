@@ -0,0 +1,43 @@
+import logging
+import numpy as np
+from residse.classes.cost_model.columnar_store import ColumnarResults
+logger = logging.getLogger(__name__)
+
+
+def reweight(res: ColumnarResults, *, e_mac=None, e_ema=None, bw=None) -> dict:
+    """
+    en / la / edp of a columnar store for other hardware constants, from the raw counts of every (stack, tile type),
+    the same formulas as CostModelEvaluation.calc_en / calc_la / times_tile_number:
+        en = tile_number * (mac_cycles * number_of_mac * e_mac + tile_ema * e_ema)
+        la = tile_number * max(mac_cycles, ceil(tile_ema / bw))
+    summed over tile types (stack_en, stack_la) and stacks (en, la), edp = en * la. infeasible rows are NaN.
+    number_of_mac stays the one in meta.json, the mac_cycles were counted for its mac_unroll.
+    constants default to the ones in meta.json. any constant may be an array, e.g. bw=np.array([8, 16, 32]),
+    the (broadcast) shape of the constants is put in front of every result, en.shape == bw.shape + (rows,)
+    """
+    hardware = res.meta['hardware']
+    e_mac = np.asarray(hardware['e_mac'] if e_mac is None else e_mac, dtype=float)
+    e_ema = np.asarray(hardware['e_ema'] if e_ema is None else e_ema, dtype=float)
+    bw = np.asarray(hardware['bw'] if bw is None else bw, dtype=float)
+    number_of_mac = float(hardware['number_of_mac'])
+    shape = np.broadcast_shapes(e_mac.shape, e_ema.shape, bw.shape)
+    # 常数放在最前面, 后面是 (rows, stacks, tile types)
+    e_mac, e_ema, bw = (np.broadcast_to(c, shape)[(...,) + (None,) * 3] for c in (e_mac, e_ema, bw))
+
+    mac_cycles, tile_ema, tile_number = res['type_mac_cycles'], res['type_tile_ema'], res['type_tile_number']
+    type_en = tile_number * (mac_cycles * number_of_mac * e_mac + tile_ema * e_ema)
+    type_la = tile_number * np.maximum(mac_cycles, np.ceil(tile_ema / bw))
+    stack_en = np.nansum(type_en, axis=-1)
+    stack_la = np.nansum(type_la, axis=-1)
+    feasible = np.asarray(res['feasible'])
+    en = np.where(feasible, stack_en.sum(axis=-1), np.nan)
+    la = np.where(feasible, stack_la.sum(axis=-1), np.nan)
+    return {
+        "en": en,
+        "la": la,
+        "edp": en * la,
+        "stack_en": np.where(feasible[:, None], stack_en, np.nan),
+        "stack_la": np.where(feasible[:, None], stack_la, np.nan),
+        "type_en": type_en,
+        "type_la": type_la,
+    }
@@ -0,0 +1,273 @@
+import logging
+from typing import List
+import numpy as np
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.mac_cycles import get_mac_cycle_table
+from residse.classes.workload.tile_gen import TILE_TYPES
+from utils import find_first_true_index
+logger = logging.getLogger(__name__)
+
+
+"""
+NumPy version of CostModelEvaluation for a batch of design points of one stack.
+every design point is (a_buf_size, tile_h, tile_w, tile_type, is_feature_merging, is_rda), all inputs are broadcast
+against each other. the arithmetic follows CostModelEvaluation step by step (same operands, same order),
+so the results are identical to the reference class, infeasible points (ema is None) have ema = NaN.
+"""
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _in(tile_type, types):
+    return np.isin(tile_type, types)
+
+
+def evaluate_batch(*, dla: Dla, stack: Stack, a_buf_size, tile_h, tile_w, tile_type, is_feature_merging, is_rda) -> dict:
+    """
+    :param a_buf_size: KB, like CostModelEvaluation
+    :param tile_h, tile_w: the fixed tile size, clamped to ofm size like CostModelEvaluation
+    :return: dict of arrays, keys are the CostModelEvaluation attribute names
+    """
+    a_buf_size, tile_h, tile_w, tile_type, is_feature_merging, is_rda = np.broadcast_arrays(
+        np.asarray(a_buf_size, dtype=float),
+        np.asarray(tile_h, dtype=np.int64),
+        np.asarray(tile_w, dtype=np.int64),
+        np.asarray(tile_type, dtype=str),
+        np.asarray(is_feature_merging, dtype=bool),
+        np.asarray(is_rda, dtype=bool),
+    )
+    if np.any(is_feature_merging & ~is_rda):
+        raise ValueError("Feature merging must be used along with reuse-distance-aware caching strategy.")
+    unknown = ~_in(tile_type, TILE_TYPES)
+    if np.any(unknown):
+        raise ValueError(f'tile type ERROR: {set(tile_type[unknown])}')
+
+    a_buf_size = a_buf_size * 1024     # Byte
+    tile_h = np.minimum(tile_h, stack.ofm_h)
+    tile_w = np.minimum(tile_w, stack.ofm_w)
+
+    # stack constants, per layer on the last axis
+    och, ich = stack.dims[:, 2], stack.dims[:, 3]
+    ifm_h, ifm_w = stack.dims[:, 0] * stack.strides, stack.dims[:, 1] * stack.strides
+    olp_length = stack.dims[:, 5] - 1
+    first_true_id = find_first_true_index(stack.in_resb)
+
+    # backpropagation_tile_data_amount (generate_tile_sequence with power=1)
+    out_mult = stack.out_mult
+    in_mult = np.concatenate([[out_mult[0] * stack.strides.prod()], out_mult[:-1]])
+
+    boundary_tile_w = np.where(stack.ofm_w % tile_w == 0, tile_w, stack.ofm_w % tile_w)
+    boundary_tile_h = np.where(stack.ofm_h % tile_h == 0, tile_h, stack.ofm_h % tile_h)
+    true_tile_w = np.where(_in(tile_type, ['HR', 'RU', 'R', 'RD']), boundary_tile_w, tile_w)
+    true_tile_h = np.where(_in(tile_type, ['WD', 'LD', 'D', 'RD']), boundary_tile_h, tile_h)
+    tile_area = true_tile_w * true_tile_h
+
+    out_tile_h = true_tile_h[..., None] * out_mult
+    out_tile_w = true_tile_w[..., None] * out_mult
+    in_tile_h = np.minimum(true_tile_h[..., None] * in_mult, ifm_h)
+    in_tile_w = np.minimum(true_tile_w[..., None] * in_mult, ifm_w)
+    out_tile_data_amount = out_tile_h * out_tile_w * och
+    in_tile_area = in_tile_h * in_tile_w
+    in_tile_data_amount = in_tile_area * ich
+    minimal_abuf = (out_tile_data_amount + in_tile_data_amount).max(axis=-1)
+
+    # number_of_tile
+    number_of_tile_in_row = _ceil_div(stack.ofm_w, tile_w)
+    number_of_tile_in_col = _ceil_div(stack.ofm_h, tile_h)
+    tile_number = np.ones(tile_type.shape, dtype=np.int64)
+    tile_number = np.where(_in(tile_type, ['U', 'D', 'HM']), np.maximum(number_of_tile_in_row - 2, 0), tile_number)
+    tile_number = np.where(_in(tile_type, ['L', 'R', 'WM']), np.maximum(number_of_tile_in_col - 2, 0), tile_number)
+    tile_number = np.where(tile_type == 'M', np.maximum(number_of_tile_in_row - 2, 0) * np.maximum(number_of_tile_in_col - 2, 0), tile_number)
+
+    # calc_next_tile_data_amount
+    next_tile_data_amount = tile_area * ich[0]
+
+    # calc_olp_data_amount, the residual input layer is excluded when feature merging
+    keep_layer = np.ones(is_feature_merging.shape + (stack.stack_len,), dtype=bool)
+    if first_true_id is not None:
+        keep_layer[..., first_true_id] = ~is_feature_merging
+    no_x = _in(tile_type, ['F', 'WU', 'WM', 'WD'])
+    no_y = _in(tile_type, ['F', 'HL', 'HM', 'HR'])
+    x_olp_data_amount = np.where(no_x, 0, (in_tile_h * olp_length * ich * keep_layer).sum(axis=-1))
+    y_olp_data_amount = np.where(no_y, 0, (ifm_w * olp_length * ich * keep_layer).sum(axis=-1))
+    current_tile_y_olp_data_amount = np.where(no_y, 0, (in_tile_w * olp_length * ich * keep_layer).sum(axis=-1))
+
+    zeros = np.zeros(tile_type.shape)
+    if first_true_id is None:
+        residual_tile_data_amount = zeros
+        x_merging_or_resi_data_amount = zeros
+        y_merging_or_resi_data_amount = zeros
+        current_tile_y_merging_or_resi_data_amount = zeros
+    else:
+        fti = first_true_id
+        residual_shift = sum([(k - 1) / 2 for k, in_res_block in zip(stack.kernel_size, stack.in_resb) if in_res_block])
+        olp_to_merging = stack.kernel_size[fti] - 1
+        merging_length_or_resi_shift = np.where(is_feature_merging, max(residual_shift, olp_to_merging), residual_shift)
+
+        cu_tile_h = in_tile_h[..., fti]
+        cu_tile_w = in_tile_w[..., fti]
+        ch_per_area = in_tile_data_amount[..., fti] / in_tile_area[..., fti]
+        residual_tile_data_amount = np.select(
+            [
+                _in(tile_type, ['F', 'RD']),
+                _in(tile_type, ['HL', 'HM', 'HR', 'LD', 'D']),
+                _in(tile_type, ['WU', 'WM', 'WD', 'RU', 'R']),
+            ],
+            [
+                in_tile_data_amount[..., fti],
+                ch_per_area * cu_tile_h * (cu_tile_w - residual_shift),
+                ch_per_area * (cu_tile_h - residual_shift) * cu_tile_w,
+            ],
+            ch_per_area * (cu_tile_h - residual_shift) * (cu_tile_w - residual_shift),
+        )
+        x_merging_or_resi_data_amount = np.where(no_x, 0, merging_length_or_resi_shift * cu_tile_h * ich[fti])
+        y_merging_or_resi_data_amount = np.where(no_y, 0, merging_length_or_resi_shift * ifm_w[fti] * ich[fti])
+        current_tile_y_merging_or_resi_data_amount = np.where(no_y, 0, merging_length_or_resi_shift * cu_tile_w * ich[fti])
+
+    # calc_ema
+    every_data_amount = np.where(
+        is_rda[..., None],
+        np.stack([minimal_abuf, residual_tile_data_amount, x_merging_or_resi_data_amount, x_olp_data_amount,
+                  next_tile_data_amount, y_merging_or_resi_data_amount, y_olp_data_amount], axis=-1),
+        np.stack([minimal_abuf, x_olp_data_amount, next_tile_data_amount, y_olp_data_amount,
+                  residual_tile_data_amount, x_merging_or_resi_data_amount, y_merging_or_resi_data_amount], axis=-1),
+    ).astype(float)
+    data_increase_line = np.cumsum(every_data_amount, axis=-1)
+    ratio = data_increase_line > a_buf_size[..., None]
+    all_fit = ~ratio.any(axis=-1)
+    lzc = np.where(all_fit, -1, ratio.argmax(axis=-1))
+    part_of_data_block = np.take_along_axis(data_increase_line, np.maximum(lzc, 0)[..., None], axis=-1)[..., 0] - a_buf_size
+
+    x_olp_ratio = np.select([_in(tile_type, ['LU', 'L', 'LD', 'RU', 'R', 'RD', 'HL', 'HR']), _in(tile_type, ['U', 'M', 'D', 'HM'])], [1, 2], 0)
+    y_olp_ratio = np.select([_in(tile_type, ['LU', 'U', 'LD', 'RU', 'D', 'RD', 'WU', 'WD']), _in(tile_type, ['L', 'M', 'R', 'WM'])], [1, 2], 0)
+    residual_ratio = 1 if first_true_id == 0 else 2
+    tile_io_ema = in_tile_data_amount[..., 0] + out_tile_data_amount[..., -1]
+
+    x_mr, x_olp = x_merging_or_resi_data_amount, x_olp_data_amount
+    cu_y_mr, cu_y_olp = current_tile_y_merging_or_resi_data_amount, current_tile_y_olp_data_amount
+    resi, part = residual_tile_data_amount, part_of_data_block
+    with np.errstate(divide='ignore', invalid='ignore'):
+        oversize_y_mr = part / y_merging_or_resi_data_amount
+        oversize_y_olp = part / y_olp_data_amount
+        ema_rda = [
+            part * residual_ratio + (x_mr + x_olp) * x_olp_ratio + (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            (part + x_olp) * x_olp_ratio + (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            part * x_olp_ratio + (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            (cu_y_mr * oversize_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            cu_y_olp * oversize_y_olp * y_olp_ratio + tile_io_ema,
+        ]
+        ema_no_rda = [
+            resi * residual_ratio + (x_mr + part) * x_olp_ratio + (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            resi * residual_ratio + x_mr * x_olp_ratio + (cu_y_mr + cu_y_olp) * y_olp_ratio + tile_io_ema,
+            resi * residual_ratio + x_mr * x_olp_ratio + (cu_y_mr + cu_y_olp * oversize_y_olp) * y_olp_ratio + tile_io_ema,
+            part * residual_ratio + x_mr * x_olp_ratio + cu_y_mr * y_olp_ratio + tile_io_ema,
+            part * x_olp_ratio + cu_y_mr * y_olp_ratio + tile_io_ema,
+            cu_y_mr * oversize_y_mr * y_olp_ratio + tile_io_ema,
+        ]
+        ema_at_cut = np.select(
+            [lzc == cut for cut in range(1, 7)],
+            [np.where(is_rda, rda, no_rda) for rda, no_rda in zip(ema_rda, ema_no_rda)],
+            np.nan,
+        )
+    feasible = lzc != 0
+    ema = np.where(all_fit, tile_io_ema, np.where(feasible, ema_at_cut, np.nan))
+
+    # calc_edp_under_ema
+    if stack.has_outer_add():
+        ema = ema + tile_w * tile_h * och[-1]
+    tmp_unroll_of_stack = get_mac_cycle_table(dla, stack)[true_tile_h, true_tile_w]
+    en_of_macs = np.where(feasible, tmp_unroll_of_stack * dla.number_of_mac * CostModelEvaluation.e_mac, 0)
+    with np.errstate(invalid='ignore'):
+        en_of_datas = np.where(feasible, ema * CostModelEvaluation.e_ema, 0)
+        la_of_datas = np.where(feasible, np.ceil(ema / dla.dram.bw), 0)
+    la_of_macs = np.where(feasible, tmp_unroll_of_stack, 0)
+    en = en_of_macs + en_of_datas
+    la = np.maximum(la_of_macs, la_of_datas)
+
+    # times_tile_number
+    ema = ema * tile_number
+    en = en * tile_number
+    la = la * tile_number
+    return {
+        "ema": ema,
+        "en": en,
+        "la": la,
+        "edp": en * la,
+        "en_of_macs": en_of_macs,
+        "en_of_datas": en_of_datas,
+        "feasible": feasible,
+        "minimal_abuf_for_stack_under_tsize": minimal_abuf,
+        "data_increase_line": data_increase_line,
+        "tmp_unroll_of_stack": tmp_unroll_of_stack,
+        "tile_number_of_current_type": tile_number,
+    }
+
+
+def applicable_tile_types(stack: Stack, tile_h, tile_w) -> dict:
+    """ vectorized TileTypeGenerator: {tile_type: bool mask of the design points that contain this tile type} """
+    full_h = np.asarray(tile_h) >= stack.ofm_h
+    full_w = np.asarray(tile_w) >= stack.ofm_w
+    masks = {'F': full_h & full_w}
+    for ttype in ['HL', 'HM', 'HR']:
+        masks[ttype] = full_h & ~full_w
+    for ttype in ['WU', 'WM', 'WD']:
+        masks[ttype] = ~full_h & full_w
+    for ttype in ['LU', 'U', 'RU', 'L', 'M', 'R', 'LD', 'D', 'RD']:
+        masks[ttype] = ~full_h & ~full_w
+    return masks
+
+
+def evaluate_stack_batch(*, dla: Dla, stack: Stack, a_buf_size, tile_h, tile_w, is_feature_merging, is_rda) -> dict:
+    """
+    sum of all tile types of a stack, the same as SumAllTileTypeStage + utils.sum_cme:
+    a design point is infeasible (NaN) if any of its tile types is infeasible, and edp = sum(en) * sum(la)
+    """
+    a_buf_size, tile_h, tile_w, is_feature_merging, is_rda = np.broadcast_arrays(
+        np.asarray(a_buf_size, dtype=float), np.asarray(tile_h), np.asarray(tile_w),
+        np.asarray(is_feature_merging, dtype=bool), np.asarray(is_rda, dtype=bool),
+    )
+    masks = applicable_tile_types(stack, tile_h, tile_w)
+    ema, en, la = np.zeros(tile_h.shape), np.zeros(tile_h.shape), np.zeros(tile_h.shape)
+    minimal_abuf = np.zeros(tile_h.shape)
+    feasible = np.ones(tile_h.shape, dtype=bool)
+    for ttype in TILE_TYPES:
+        mask = masks[ttype]
+        if not mask.any():
+            continue
+        res = evaluate_batch(dla=dla, stack=stack, a_buf_size=a_buf_size, tile_h=tile_h, tile_w=tile_w, tile_type=ttype,
+                             is_feature_merging=is_feature_merging, is_rda=is_rda)
+        feasible &= ~mask | res["feasible"]
+        ema = np.where(mask, ema + res["ema"], ema)
+        en = np.where(mask, en + res["en"], en)
+        la = np.where(mask, la + res["la"], la)
+        minimal_abuf = np.where(mask, np.maximum(minimal_abuf, res["minimal_abuf_for_stack_under_tsize"]), minimal_abuf)
+    ema, en, la = (np.where(feasible, x, np.nan) for x in (ema, en, la))
+    return {"ema": ema, "en": en, "la": la, "edp": en * la, "feasible": feasible, "minimal_abuf_for_stack_under_tsize": minimal_abuf}
+
+
+def evaluate_network_batch(*, dla: Dla, stacks: List[Stack], a_buf_size, tile_h, tile_w, is_feature_merging, is_rda) -> dict:
+    """ sum of all stacks, the same as IterateMemOrTileStage + utils.sum_cme, infeasible design points are NaN """
+    ema = en = la = 0
+    feasible = True
+    for stack in stacks:
+        res = evaluate_stack_batch(dla=dla, stack=stack, a_buf_size=a_buf_size, tile_h=tile_h, tile_w=tile_w,
+                                   is_feature_merging=is_feature_merging, is_rda=is_rda)
+        feasible = feasible & res["feasible"]
+        ema, en, la = ema + res["ema"], en + res["en"], la + res["la"]
+    return {"ema": ema, "en": en, "la": la, "edp": en * la, "feasible": feasible}
+
+
+if __name__ == '__main__':
+    from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+    from residse.classes.workload.WorkloadParser import WorkloadParser
+    dla = HardwareGenerator(json_hw="residse/inputs/HW/srgan_1.json").get_dla()
+    stacks = WorkloadParser(yaml_path="residse/inputs/WL/srgan.yml").get_stacks()
+    tile_h, tile_w = np.meshgrid(np.arange(1, 271), np.arange(1, 481), indexing='ij')
+    res = evaluate_network_batch(dla=dla, stacks=stacks, a_buf_size=150, tile_h=tile_h, tile_w=tile_w, is_feature_merging=True, is_rda=True)
+    best = np.nanargmin(res["edp"])
+    print(f'best tile size {tile_h.flat[best]}x{tile_w.flat[best]} with edp {res["edp"].flat[best]}')
@@ -1,10 +1,15 @@
 import json
+from itertools import product
 from residse.classes.hardware.dla import Dla
 
 
 
 class HardwareGenerator:
-    '''use get_dla method to return a dla'''
+    '''
+    use get_dla method to return a dla.
+    every mac_unroll size and the dram bandwidth can also be a list, e.g. "mac_unroll": {"oc": [16, 32], "w": 4, "h": [2, 4]},
+    then get_dla_variants returns one dla per combination (get_dla returns the first one).
+    '''
     def __init__(self, json_hw: str):
         ''' json_hw: path to json format dla path'''
         self.parse_json_hw(json_hw)
@@ -13,6 +18,14 @@ class HardwareGenerator:
     def get_dla(self):
         return self.dla
 
+    def get_dla_variants(self):
+        """:return: [(name, dla), ...] of every mac_unroll / dram bandwidth combination, e.g. name 'oc32_w4_h4--bw3.2'"""
+        return self.dla_variants
+
+    @staticmethod
+    def as_list(value):
+        return value if isinstance(value, list) else [value]
+
     def parse_json_hw(self, json_hw: str):
         assert isinstance(json_hw, str), 'json_hw is the path to your json format dla input.'
         with open(json_hw) as f:
@@ -24,7 +37,17 @@ class HardwareGenerator:
         a_buf: dict = self.json_di["a_buf"]
         w_buf: dict = self.json_di["w_buf"]
         dram: dict = self.json_di["dram"]
-        self.dla = Dla(mac_unroll, a_buf, w_buf, dram)
+
+        # 每个 unroll 维度和 bandwidth 都可以给列表, 组合出所有硬件变体
+        dims = list(mac_unroll)
+        self.dla_variants = []
+        for sizes in product(*[self.as_list(mac_unroll[dim]) for dim in dims]):
+            for bw in self.as_list(dram.get("bandwidth")):
+                variant_unroll = dict(zip(dims, sizes))
+                variant_dram = {**dram, "bandwidth": bw}
+                name = '_'.join(f'{dim}{size}' for dim, size in variant_unroll.items()) + f'--bw{bw}'
+                self.dla_variants.append((name, Dla(variant_unroll, a_buf, w_buf, variant_dram)))
+        self.dla = self.dla_variants[0][1]
 
 
 if __name__ == '__main__':
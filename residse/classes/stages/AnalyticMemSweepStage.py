@@ -0,0 +1,76 @@
+from typing import Generator, Callable, List, Tuple, Any
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.tile_gen import TileTypeGenerator
+from residse.classes.cost_model.ema_curve import EmaCurve
+from residse.classes.cost_model.record import CostModelRecord
+from residse.classes.cost_model.columnar_store import type_breakdown
+from utils import sum_cme
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticMemSweepStage(Stage):
+    """
+    Leaf stage replacing IterateMemOrTileStage -> IterateStackStage -> SumAllTileTypeStage -> ResidseCostModelStage
+    when tile size is fixed and mem size is iterated.
+    The EmaCurve of every (stack, tile type) is built once, every a_buf_size is then a lookup on these curves.
+    Yields the same (cme, extra_info) tuples as IterateMemOrTileStage.
+    """
+    def __init__(self, list_of_callables, *, dla: Dla, stacks: List[Stack], fixed_tile_size, is_feature_merging, is_rda, stream=False, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        self.dla = dla
+        self.stacks = stacks
+        self.tile_size = fixed_tile_size
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.stream = stream
+        self.a_buf_size_list = dla.a_buf.get_size_list()
+
+    def build_curves(self):
+        self.curves_of_stacks = []
+        for stack in self.stacks:
+            curves = [
+                EmaCurve(
+                    dla=self.dla,
+                    stack=stack,
+                    tile_size=self.tile_size,
+                    tile_type=ttype,
+                    is_feature_merging=self.is_feature_merging,
+                    is_rda=self.is_rda,
+                )
+                for ttype in TileTypeGenerator(self.tile_size, stack).run()
+            ]
+            self.curves_of_stacks.append(curves)
+        # FeasibilityOracle threshold of every stack
+        self.stack_thresholds = [max(curve.min_a_buf_size for curve in curves) for curves in self.curves_of_stacks]
+        logger.info(f'Built {sum(len(curves) for curves in self.curves_of_stacks)} EMA curves for {len(self.stacks)} stacks')
+
+    def run(self):
+        self.build_curves()
+        logger.info(f'Running a buf size at: {self.a_buf_size_list}')
+        logger.info(f'layer fusion needs a buf size >= {max(self.stack_thresholds)/1024} KB at tile size {self.tile_size}')
+        for a_buf_size in self.a_buf_size_list:
+            if a_buf_size * 1024 < max(self.stack_thresholds):
+                logger.info(f"skip a buf size at {a_buf_size}")
+                yield None, ([None] * len(self.stacks), a_buf_size, self.tile_size, None, [[] for _ in self.stacks], self.stack_thresholds)
+                continue
+            cme_of_stacks = []
+            types_of_stacks = []
+            for curves in self.curves_of_stacks:
+                cme_of_types = []
+                for curve in curves:
+                    cme = curve.cme_at(a_buf_size)
+                    cme_of_types.append(None if cme.ema is None else CostModelRecord.from_cme(cme))
+                cme_of_stacks.append(sum_cme(cme_of_types))
+                if self.stream:
+                    cme_of_types = type_breakdown(cme_of_types)
+                types_of_stacks.append(cme_of_types)
+
+            network_cme = sum_cme(cme_of_stacks)
+            yield network_cme, (cme_of_stacks, a_buf_size, self.tile_size, cme_of_types, types_of_stacks, self.stack_thresholds)
+
+    def is_leaf(self) -> bool:
+        return True
@@ -0,0 +1,136 @@
+import os
+from typing import Generator, Callable, List, Tuple, Any
+import numpy as np
+import yaml
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.pareto import pareto_front
+from residse.classes.cost_model.tensor_cost_model import evaluate_stack_batch
+from residse.classes.stages.parallel import run_substages
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FusionSearchStage(Stage):
+    """
+    search the stack boundaries of a layer-by-layer workload (e.g. resnet18lbl.yml) at a fixed tile size and mem size.
+
+    every input stack is a unit (usually one layer), a fused stack is a contiguous range units[i:j] of at most
+    max_stack_len units. network en / la are sums over stacks, so dynamic programming goes over the end index j
+    and keeps the (en, la) Pareto front of all partitions of units[:j]:
+        front[j] = pareto(front[i] + cost(units[i:j]) for j - max_stack_len <= i < j)
+    the minimal network EDP is on front[len(units)]. cost() is memoized by the layer content of the range, so repeated
+    blocks are evaluated once. O(units x max_stack_len) sub-stacks instead of 2^(units-1) partitions.
+    the best partition is evaluated by the substages (SumAllTileTypeStage -> ResidseCostModelStage) and saved as
+    a workload yaml, one --- document per fused stack.
+    """
+    def __init__(self, list_of_callables, *, dla: Dla, stacks: List[Stack], fixed_tile_size, fixed_mem_size, is_feature_merging, is_rda, dump_filename_pattern, max_stack_len=8, footprint_cache_size=4096, footprint_cache: FootprintCache = None, jobs=1, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        self.dla = dla
+        self.units = stacks
+        self.tile_size = fixed_tile_size
+        self.a_buf_size = fixed_mem_size
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.dump_filename_pattern = dump_filename_pattern
+        self.fused_yaml_path = dump_filename_pattern.replace("?.json", "fused_stacks.yml")
+        self.max_stack_len = max_stack_len
+        self.jobs = jobs
+        self.footprint_cache = footprint_cache if footprint_cache is not None else FootprintCache(max_size=footprint_cache_size)
+        self.costs = {}     # layer content of a fused stack -> (en, la), NaN if infeasible
+
+    @staticmethod
+    def fuse(units: List[Stack], id: int) -> Stack:
+        return Stack(id, {layer: layer_di for unit in units for layer, layer_di in unit.stack_di.items()})
+
+    def get_cost(self, i: int, j: int) -> Tuple[float, float]:
+        """(en, la) of units[i:j] fused into one stack"""
+        key = tuple(unit.content_hash for unit in self.units[i:j])
+        if key not in self.costs:
+            res = evaluate_stack_batch(
+                dla=self.dla,
+                stack=self.fuse(self.units[i:j], id=0),
+                a_buf_size=self.a_buf_size,
+                tile_h=self.tile_size[0],
+                tile_w=self.tile_size[1],
+                is_feature_merging=self.is_feature_merging,
+                is_rda=self.is_rda,
+            )
+            self.costs[key] = (float(res["en"]), float(res["la"]))
+        return self.costs[key]
+
+    def search(self) -> List[Tuple[int, int]]:
+        """:return: [(i, j), ...] unit ranges of the fused stacks with the minimal network EDP, None if infeasible"""
+        n = len(self.units)
+        # front[j]: en, la and (i, index in front[i]) of every Pareto partition of units[:j]
+        fronts = [{"en": np.zeros(1), "la": np.zeros(1), "prev": [None]}] + [None] * n
+        for j in range(1, n + 1):
+            en, la, prev = [], [], []
+            for i in range(max(0, j - self.max_stack_len), j):
+                if fronts[i] is None:
+                    continue
+                cost_en, cost_la = self.get_cost(i, j)
+                if np.isnan(cost_en):
+                    continue
+                en.append(fronts[i]["en"] + cost_en)
+                la.append(fronts[i]["la"] + cost_la)
+                prev += [(i, k) for k in range(len(fronts[i]["en"]))]
+            if not en:
+                continue
+            en, la = np.concatenate(en), np.concatenate(la)
+            keep = pareto_front(en, la)
+            fronts[j] = {"en": en[keep], "la": la[keep], "prev": [prev[k] for k in keep]}
+        logger.info(f'Evaluated {len(self.costs)} distinct fused stacks of {n} units, '
+                    f'max Pareto front size {max(len(f["en"]) for f in fronts if f is not None)}')
+
+        if fronts[n] is None:
+            return None
+        ranges = []
+        j, k = n, int(np.argmin(fronts[n]["en"] * fronts[n]["la"]))
+        while j > 0:
+            i, prev_k = fronts[j]["prev"][k]
+            ranges.append((i, j))
+            j, k = i, prev_k
+        return ranges[::-1]
+
+    def save_fused_yaml(self, stacks: List[Stack]):
+        os.makedirs(os.path.dirname(self.fused_yaml_path), exist_ok=True)
+        with open(self.fused_yaml_path, "w") as f:
+            yaml.safe_dump_all([stack.stack_di for stack in stacks], f, sort_keys=False, default_flow_style=None)
+        logger.info(f'Saved fused stacks to {self.fused_yaml_path}')
+
+    def run(self):
+        ranges = self.search()
+        if ranges is None:
+            logger.warning(f'mem size {self.a_buf_size} KB is too small for some layer at tile size {self.tile_size}, no partition is feasible')
+            yield None, ([], self.a_buf_size, self.tile_size, None, [], [])
+            return
+        stacks = [self.fuse(self.units[i:j], id=id) for id, (i, j) in enumerate(ranges)]
+        logger.info(f'best fusion of {len(self.units)} units into {len(stacks)} stacks: {[list(stack.stack_di) for stack in stacks]}')
+        self.save_fused_yaml(stacks)
+
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs['dla'] = self.dla
+        shared_kwargs['stacks'] = stacks
+        shared_kwargs['tile_size'] = self.tile_size
+        shared_kwargs['a_buf_size'] = self.a_buf_size
+        shared_kwargs['is_feature_merging'] = self.is_feature_merging
+        shared_kwargs['is_rda'] = self.is_rda
+        shared_kwargs['dump_filename_pattern'] = self.dump_filename_pattern
+        shared_kwargs['footprint_cache'] = self.footprint_cache
+        cme_of_stacks = []  # all stack cmes in a list
+        types_of_stacks = []    # cme_of_types of every stack
+        acc = CostModelAccumulator()
+        for result in run_substages(self.list_of_callables, shared_kwargs, [{'stack': stack} for stack in stacks], self.jobs):
+            for cme, extra_info in result:
+                cme_of_stacks.append(cme)
+                types_of_stacks.append(extra_info)
+                acc.add(cme)
+        sum_cme = acc.summary()
+        logger.info(f'network EDP of the best fusion: {sum_cme.edp}')
+        stack_thresholds = [np.nan] * len(stacks)
+        yield sum_cme, (cme_of_stacks, self.a_buf_size, self.tile_size, extra_info, types_of_stacks, stack_thresholds)
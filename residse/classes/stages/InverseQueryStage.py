@@ -0,0 +1,115 @@
+import math
+from typing import Generator, Callable, List, Tuple, Any
+import numpy as np
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.tile_gen import TileSizeGenerator
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.feasibility import FeasibilityOracle
+from residse.classes.cost_model.tensor_cost_model import evaluate_network_batch
+from residse.classes.stages.parallel import run_substages
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InverseQueryStage(Stage):
+    """
+    smallest a_buf_size (integer KB) whose network target_metric (edp / en / la / ema) <= target, at the fixed tile size
+    or at every tile size candidate of TileSizeGenerator (then the tile size with the smallest a_buf_size wins).
+
+    for a fixed tile size EMA (and so en, la, edp) is non-increasing in a_buf_size, so the answer is found by bisection
+    in [threshold, saturation] of the FeasibilityOracle: below the threshold layer fusion is impossible, above the
+    saturation nothing changes anymore. all tile sizes are bisected in lockstep, one batch cost engine call per step,
+    i.e. log2(saturation - threshold) steps instead of a full sweep.
+    the answer is evaluated by the substages (SumAllTileTypeStage -> ResidseCostModelStage) for the full breakdown.
+    """
+    METRICS = ['edp', 'en', 'la', 'ema']
+
+    def __init__(self, list_of_callables, *, dla: Dla, stacks: List[Stack], target_metric, target, is_feature_merging, is_rda, fixed_tile_size=None,
+                 tile_gen='auto', tile_points=(10, 10), tile_grid=None, footprint_cache_size=4096, footprint_cache: FootprintCache = None, jobs=1, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        if target_metric not in self.METRICS:
+            raise ValueError(f"unknown target metric {target_metric}, choose from {self.METRICS}")
+        self.dla = dla
+        self.stacks = stacks
+        self.target_metric = target_metric
+        self.target = target
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.jobs = jobs
+        self.footprint_cache = footprint_cache if footprint_cache is not None else FootprintCache(max_size=footprint_cache_size)
+        self.oracle = FeasibilityOracle(dla=dla, stacks=stacks, is_feature_merging=is_feature_merging, is_rda=is_rda, footprint_cache=self.footprint_cache)
+        if fixed_tile_size:
+            self.tile_sizes = [tuple(fixed_tile_size)]
+        else:
+            self.tile_sizes = list(TileSizeGenerator(fixed_tile_size=None, stacks=stacks, strategy=tile_gen, dla=dla,
+                                                     tile_points=tile_points, tile_grid=tile_grid).run())
+        self.nb_of_evaluations = 0
+
+    def evaluate(self, a_buf_size: np.ndarray, tile_h: np.ndarray, tile_w: np.ndarray) -> np.ndarray:
+        """target metric of every (a_buf_size (KB), tile size), NaN if infeasible"""
+        self.nb_of_evaluations += len(a_buf_size)
+        return evaluate_network_batch(
+            dla=self.dla,
+            stacks=self.stacks,
+            a_buf_size=a_buf_size,
+            tile_h=tile_h,
+            tile_w=tile_w,
+            is_feature_merging=self.is_feature_merging,
+            is_rda=self.is_rda,
+        )[self.target_metric]
+
+    def search(self):
+        """:return: (a_buf_size (KB), tile_size) with the smallest a_buf_size meeting the target, None if unreachable"""
+        tile_h, tile_w = np.array(self.tile_sizes).T
+        lo = np.array([math.ceil(self.oracle.get_threshold(t) / 1024) for t in self.tile_sizes])
+        hi = np.maximum(lo, [math.ceil(self.oracle.get_saturation(t) / 1024) for t in self.tile_sizes])
+        # 饱和之后结果不再变化, 饱和点都达不到 target 的 tile size 不用再找
+        reachable = self.evaluate(hi, tile_h, tile_w) <= self.target
+        logger.info(f'{reachable.sum()} of {len(self.tile_sizes)} tile sizes can reach {self.target_metric} <= {self.target}')
+        if not reachable.any():
+            return None
+        tile_h, tile_w, lo, hi = tile_h[reachable], tile_w[reachable], lo[reachable], hi[reachable]
+        while (lo < hi).any():
+            active = lo < hi
+            mid = (lo[active] + hi[active]) // 2
+            ok = self.evaluate(mid, tile_h[active], tile_w[active]) <= self.target
+            hi[active] = np.where(ok, mid, hi[active])
+            lo[active] = np.where(ok, lo[active], mid + 1)
+        # 同样的 buffer size 下取 target metric 最小的 tile size
+        smallest = np.flatnonzero(lo == lo.min())
+        best = smallest[np.argmin(self.evaluate(lo[smallest], tile_h[smallest], tile_w[smallest]))]
+        return int(lo[best]), [int(tile_h[best]), int(tile_w[best])]
+
+    def run(self):
+        logger.info(f'Searching the smallest a buf size with {self.target_metric} <= {self.target} over {len(self.tile_sizes)} tile sizes')
+        answer = self.search()
+        if answer is None:
+            logger.warning(f'{self.target_metric} <= {self.target} can not be reached at any a buf size')
+            return
+        a_buf_size, tile_size = answer
+        logger.info(f'smallest a buf size is {a_buf_size} KB at tile size {tile_size}, found with {self.nb_of_evaluations} evaluations')
+
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs['dla'] = self.dla
+        shared_kwargs['stacks'] = self.stacks
+        shared_kwargs['is_feature_merging'] = self.is_feature_merging
+        shared_kwargs['is_rda'] = self.is_rda
+        shared_kwargs['footprint_cache'] = self.footprint_cache
+        tasks = [{'a_buf_size': a_buf_size, 'stack': stack, 'tile_size': tile_size} for stack in self.stacks]
+        cme_of_stacks = []  # all stack cmes in a list
+        types_of_stacks = []    # cme_of_types of every stack
+        acc = CostModelAccumulator()
+        for result in run_substages(self.list_of_callables, shared_kwargs, tasks, self.jobs):
+            for cme, extra_info in result:
+                cme_of_stacks.append(cme)
+                types_of_stacks.append(extra_info)
+                acc.add(cme)
+        sum_cme = acc.summary()
+        for stack, cme in zip(self.stacks, cme_of_stacks):
+            logger.info(f'stack {stack.id}: en {cme.en}, la {cme.la}, ema {cme.ema}')
+        logger.info(f'network: edp {sum_cme.edp}, en {sum_cme.en}, la {sum_cme.la}, ema {sum_cme.ema}')
+        yield sum_cme, (cme_of_stacks, a_buf_size, tile_size, extra_info, types_of_stacks, self.oracle.get_stack_thresholds(tile_size))
@@ -0,0 +1,53 @@
+import json
+import os
+from typing import Generator, Callable, List, Tuple, Any
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.cost_model.footprint_cache import FootprintCache
+import logging
+logger = logging.getLogger(__name__)
+
+
+class IterateHardwareStage(Stage):
+    """
+    replaces HardwareParserStage for a hardware json with mac_unroll / dram bandwidth grids:
+    the substages run once per dla variant, results of a variant go to <dump dir>/<variant name>/.
+    all variants share one FootprintCache with the EMA kept, the data amounts and the EMA at every a_buf_size do not
+    depend on the hardware, so only tmp_unroll (compute cycles), en and la are evaluated again per variant.
+    the best EDP of every variant is saved to <dump dir>/variants.json.
+    """
+    def __init__(self, list_of_callables: List[Callable], hw_path: str, *, dump_filename_pattern, footprint_cache_size=1 << 16, ema_cache_size=1 << 20, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        self.dla_variants = HardwareGenerator(json_hw=hw_path).get_dla_variants()
+        self.dump_filename_pattern = dump_filename_pattern
+        self.footprint_cache = FootprintCache(max_size=footprint_cache_size, ema_max_size=ema_cache_size)
+
+    def run(self):
+        logger.info(f'Running {len(self.dla_variants)} hardware variants: {[name for name, _ in self.dla_variants]}')
+        summary = []
+        for name, dla in self.dla_variants:
+            logger.info(f'Start running hardware variant {name} '+'==='*30)
+            dump_filename_pattern = self.dump_filename_pattern.replace("?.json", f"{name}/?.json")
+            sub_stage = self.list_of_callables[0](self.list_of_callables[1:], dla=dla, dump_filename_pattern=dump_filename_pattern,
+                                                  footprint_cache=self.footprint_cache, **self.kwargs)
+            best = None
+            for cme, extra_info in sub_stage.run():
+                if cme is not None and (best is None or cme.edp < best.edp):
+                    best = cme
+                yield cme, extra_info
+            summary.append({
+                'name': name,
+                'mac_unroll': dla.mac_unroll,
+                'bandwidth': dla.dram.bw,
+                'best_edp': None if best is None else best.edp,
+                'best_a_buf_size': None if best is None else best.a_buf_size / 1024,
+                'best_tile_size': None if best is None else list(best.tile_size),
+            })
+            logger.info(f'hardware variant {name}: best {best}')
+        logger.info(f'footprint cache over all variants: {self.footprint_cache.stats()}')
+
+        summary_path = self.dump_filename_pattern.replace("?.json", "variants.json")
+        os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+        with open(summary_path, "w") as fp:
+            json.dump(summary, fp, indent=4)
+        logger.info(f'Saved hardware variants summary to {summary_path}')
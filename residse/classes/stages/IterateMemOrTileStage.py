@@ -2,17 +2,35 @@ from typing import Generator, Callable, List, Tuple, Any
 from residse.classes.stages.Stage import Stage
 from residse.classes.hardware.HardwareGenerator import HardwareGenerator
 from residse.classes.hardware.dla import Dla
-from utils import sum_cme
+from residse.classes.cost_model.accumulator import CostModelAccumulator
 from residse.classes.cost_model.cost_model import CostModelEvaluation
 from residse.classes.workload.stack import Stack
 from residse.classes.workload.tile_gen import TileSizeGenerator
-import sys
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.feasibility import FeasibilityOracle
+from residse.classes.stages.parallel import run_substages
+from copy import copy
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def rebase_a_buf_size(result, a_buf_size):
+    """
+    copy of a saturated result (cme / summary, list of them, or a type_breakdown array) at another a_buf_size (KB)
+    """
+    if result is None or isinstance(result, np.ndarray):
+        return result
+    if isinstance(result, list):
+        return [rebase_a_buf_size(item, a_buf_size) for item in result]
+    result = copy(result)
+    result.a_buf_size = a_buf_size * 1024
+    return result
+
+
 class IterateMemOrTileStage(Stage):
-    def __init__(self, list_of_callables, dla: Dla, is_fixed_tsize, is_fixed_memsize, fixed_mem_size, fixed_tile_size, stacks: List[Stack], **kwargs):
+    def __init__(self, list_of_callables, dla: Dla, is_fixed_tsize, is_fixed_memsize, fixed_mem_size, fixed_tile_size, stacks: List[Stack], tile_gen='auto', tile_points=(10, 10), tile_grid=None, footprint_cache_size=4096, footprint_cache: FootprintCache = None, jobs=1, **kwargs):
         super().__init__(list_of_callables, **kwargs)
         self.dla = dla
         self.is_fixed_tsize = is_fixed_tsize
@@ -20,54 +38,121 @@ class IterateMemOrTileStage(Stage):
         self.fixed_mem_size = fixed_mem_size
         self.fixed_tile_size = fixed_tile_size
         self.stacks = stacks
+        self.tile_gen = tile_gen
+        self.tile_points = tile_points
+        self.tile_grid = tile_grid
+        self.jobs = jobs
+        # buffer size 无关的 footprint 在整个 sweep 中共享
+        # 由外层 stage (如 IterateHardwareStage) 传入时在多次 sweep 之间共享
+        self.footprint_cache = footprint_cache if footprint_cache is not None else FootprintCache(max_size=footprint_cache_size)
+        # 可行性在 sweep 之前就能确定, 不可行的点不再评估
+        self.oracle = FeasibilityOracle(
+            dla=dla,
+            stacks=stacks,
+            is_feature_merging=kwargs['is_feature_merging'],
+            is_rda=kwargs['is_rda'],
+            footprint_cache=self.footprint_cache,
+        )
         if is_fixed_tsize and not is_fixed_memsize:
             self.a_buf_size_list = dla.a_buf.get_size_list()
 
     def run(self):
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs['dla'] = self.dla
+        shared_kwargs['stacks'] = self.stacks
+        shared_kwargs['footprint_cache'] = self.footprint_cache
 
         if self.is_fixed_tsize and not self.is_fixed_memsize:
         # 固定tile size迭代不同mem size
             logger.info(f'Running a buf size at: {self.a_buf_size_list}')
-            for a_buf_size in self.a_buf_size_list:
-                self.cme_of_stacks = [] # all stack cmes in a list
-                self.sum_cme = None     # sum of all stack cmes     
-                kwargs = self.kwargs.copy()
-                kwargs['a_buf_size'] = a_buf_size
-                kwargs['dla'] = self.dla
-                kwargs['tile_size'] = self.fixed_tile_size
-                kwargs['stacks'] = self.stacks
-                sub_stage = self.list_of_callables[0](self.list_of_callables[1:], **kwargs)
-                logger.info(f'Start running a_buf size at {a_buf_size} '+'---'*30)
-                for cme, extra_info in sub_stage.run():
-                    self.cme_of_stacks.append(cme)
-                    if a_buf_size == 51:
-                        print(cme.ema)
-                        print(cme.la)
-                        print(cme.edp)
+            threshold = self.oracle.get_threshold(self.fixed_tile_size)
+            logger.info(f'layer fusion needs a buf size >= {threshold/1024} KB at tile size {self.fixed_tile_size}, '
+                        f'per stack (KB): {[t/1024 for t in self.oracle.get_stack_thresholds(self.fixed_tile_size)]}')
+            points = [(a_buf_size, self.fixed_tile_size) for a_buf_size in self.a_buf_size_list]
+            yield from self.run_points(shared_kwargs, points)
 
+        elif not self.is_fixed_tsize and self.is_fixed_memsize:
+            # 放不下 fixed mem size 的 tile size 在生成时就被剪掉
+            self.gen = TileSizeGenerator(
+                fixed_tile_size=self.fixed_tile_size,
+                stacks=self.stacks,
+                strategy=self.tile_gen,
+                dla=self.dla,
+                tile_points=self.tile_points,
+                tile_grid=self.tile_grid,
+                oracle=self.oracle,
+                a_buf_size=self.fixed_mem_size,
+            )
+            points = [(self.fixed_mem_size, tile_size) for tile_size in self.gen.run()]
+            t_h_lst, t_w_lst = self.gen.get_candidate_lists()
+            logger.info(f'{len(points)} of {len(t_h_lst) * len(t_w_lst)} {self.gen.strategy} tile sizes fit mem size {self.fixed_mem_size} KB')
+            if not points:
+                logger.warning(f'mem size {self.fixed_mem_size} KB is too small for layer fusion at every tile size, '
+                               f'the smallest tile size needs {self.oracle.get_threshold((min(t_h_lst), min(t_w_lst)))/1024} KB')
+            yield from self.run_points(shared_kwargs, points)
 
+    def run_points(self, shared_kwargs, points: List[Tuple]):
+        """
+        evaluate every (a_buf_size, tile_size) design point in order.
+        points the FeasibilityOracle rejects are yielded as None right away, without running the substages.
+        points beyond the saturation of their tile size are copied from the first saturated point of that tile size.
+        """
+        feasible = [self.oracle.is_feasible(a_buf_size, tile_size) for a_buf_size, tile_size in points]
+        evaluated = []
+        first_saturated = set()
+        for (a_buf_size, tile_size), ok in zip(points, feasible):
+            if ok and self.oracle.is_saturated(a_buf_size, tile_size):
+                ok = tuple(tile_size) not in first_saturated
+                first_saturated.add(tuple(tile_size))
+            evaluated.append(ok)
+        tasks = [{'a_buf_size': a_buf_size, 'tile_size': tile_size} for (a_buf_size, tile_size), ok in zip(points, evaluated) if ok]
+        logger.info(f'{feasible.count(False)} infeasible and {len(points) - feasible.count(False) - len(tasks)} saturated points are not evaluated')
+
+        results = run_substages(self.list_of_callables, shared_kwargs, tasks, self.jobs)
+        saturated = {}  # tile_size -> yield of its first saturated point
+        for (a_buf_size, tile_size), ok, eval_ok in zip(points, feasible, evaluated):
+            stack_thresholds = self.oracle.get_stack_thresholds(tile_size)
+            if not ok:
                 # any stack is not-able to Layer Fusion --> sum_cme = None
-                self.sum_cme = sum_cme(self.cme_of_stacks)   
-                if self.sum_cme is None:
-                    logger.info(f"skip a buf size at {a_buf_size}")
-                yield self.sum_cme, (self.cme_of_stacks, a_buf_size, self.fixed_tile_size, extra_info)
+                logger.info(f"skip a buf size at {a_buf_size}, tile size {tile_size}: needs {max(stack_thresholds)/1024} KB")
+                yield None, ([None] * len(self.stacks), a_buf_size, tile_size, None, [[] for _ in self.stacks], stack_thresholds)
+                continue
+            if not eval_ok:
+                # EMA 饱和, 结果与第一个饱和点相同, 只有 a_buf_size 不同
+                sum_cme, (cme_of_stacks, _, _, extra_info, types_of_stacks, _) = saturated[tuple(tile_size)]
+                yield rebase_a_buf_size(sum_cme, a_buf_size), (
+                    [rebase_a_buf_size(cme, a_buf_size) for cme in cme_of_stacks],
+                    a_buf_size,
+                    tile_size,
+                    rebase_a_buf_size(extra_info, a_buf_size),
+                    [rebase_a_buf_size(cme_of_types, a_buf_size) for cme_of_types in types_of_stacks],
+                    stack_thresholds,
+                )
+                continue
 
-        elif not self.is_fixed_tsize and self.is_fixed_memsize:
-            self.gen = TileSizeGenerator(fixed_tile_size=self.fixed_tile_size, stacks=self.stacks)
-            for tile_size in self.gen.run():
-                self.cme_of_stacks = [] # all stack cmes in a list
-                self.sum_cme = None     # sum of all stack cmes            
-                kwargs = self.kwargs.copy()
-                kwargs['a_buf_size'] = self.fixed_mem_size
-                kwargs['dla'] = self.dla
-                kwargs['tile_size'] = tile_size
-                kwargs['stacks'] = self.stacks
-                sub_stage = self.list_of_callables[0](self.list_of_callables[1:], **kwargs)
-                for cme, extra_info in sub_stage.run():
-                    self.cme_of_stacks.append(cme)
+            logger.info(f'Start running a_buf size at {a_buf_size}, tile size {tile_size} '+'---'*30)
+            self.cme_of_stacks = [] # all stack cmes in a list
+            self.sum_cme = None     # sum of all stack cmes
+            self.types_of_stacks = []   # cme_of_types of every stack
+            acc = CostModelAccumulator()
+            for cme, extra_info in next(results):
+                self.cme_of_stacks.append(cme)
+                self.types_of_stacks.append(extra_info)
+                acc.add(cme)
+            self.sum_cme = acc.summary()
+            point = self.sum_cme, (self.cme_of_stacks, a_buf_size, tile_size, extra_info, self.types_of_stacks, stack_thresholds)
+            if self.oracle.is_saturated(a_buf_size, tile_size):
+                logger.info(f'EMA saturates from a buf size {self.oracle.get_saturation(tile_size)/1024} KB at tile size {tile_size}')
+                saturated[tuple(tile_size)] = point
+            yield point
+        results.close()
+        self.log_cache_stats()
 
-                # any stack is not-able to Layer Fusion --> sum_cme = None
-                self.sum_cme = sum_cme(self.cme_of_stacks)
-                if self.sum_cme is None:
-                    sys.exit("error: self.sum_cme is None -- 固定mem size迭代tile size实验中, mem size设置太低不够layer fusion存储io tile")
-                yield self.sum_cme, (self.cme_of_stacks, self.fixed_mem_size, tile_size, extra_info)
\ No newline at end of file
+    def log_cache_stats(self):
+        result_cache = self.kwargs.get('result_cache')
+        if self.jobs <= 1:
+            logger.info(f'footprint cache: {self.footprint_cache.stats()}')
+            if result_cache is not None:
+                logger.info(f'result cache: {result_cache.stats()}')
+        else:
+            logger.info(f'footprint / result cache stats are kept per worker process with jobs={self.jobs}')
@@ -1,6 +1,7 @@
 from typing import Generator, Callable, List, Tuple, Any
 from residse.classes.stages.Stage import Stage
 from residse.classes.workload.stack import Stack
+from residse.classes.stages.parallel import run_substages, compile_stage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,29 +11,28 @@ class IterateStackStage(Stage):
     def __init__(self, list_of_callables, stacks: List[Stack], **kwargs):
         super().__init__(list_of_callables, **kwargs)
         self.stacks = stacks
-    
-    
+
+
     def run(self):
-        for stack in self.stacks:
-            kwargs = self.kwargs.copy()
-            kwargs['stack'] = stack
-            sub_stage = self.list_of_callables[0](self.list_of_callables[1:], **kwargs)
+        tasks = [{'stack': stack} for stack in self.stacks]
+        results = run_substages(self.list_of_callables, self.kwargs, tasks)
+        for stack, result in zip(self.stacks, results):
             logger.debug(f'Running stack of {stack} ...')
-            for cme, extra_info in sub_stage.run():
+            for cme, extra_info in result:
                 yield cme, extra_info
 
-    
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    @classmethod
+    def compile(cls, list_of_callables):
+        """a loop over the stacks calling the compiled substage, no stage object per design point"""
+        run_stack = compile_stage(list_of_callables)
+
+        def run(kwargs):
+            kwargs = kwargs.copy()
+            stacks = kwargs.pop('stacks')
+            results = []
+            for stack in stacks:
+                logger.debug(f'Running stack of {stack} ...')
+                kwargs['stack'] = stack
+                results.extend(run_stack(kwargs))
+            return results
+        return run
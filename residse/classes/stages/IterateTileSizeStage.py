@@ -20,7 +20,7 @@ class IterateTileSizeStage(Stage):
 
     def run(self):
         # self.gen = TileSizeGenerator(fixed_tile_size=self.fixed_tile_size, stack=self.stack, nb_of_points=self.nb_of_points)
-        self.gen = TileSizeGenerator(fixed_tile_size=self.fixed_tile_size, stack=self.stack)
+        self.gen = TileSizeGenerator(fixed_tile_size=self.fixed_tile_size, stacks=[self.stack])
         for tile_size in self.gen.run():
             self.cme_of_stacks = [] # all stack cmes in a list
             self.sum_cme = None     # sum of all stack cmes            
@@ -0,0 +1,114 @@
+from itertools import product
+from typing import Generator, Callable, List, Tuple, Any
+import numpy as np
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.tile_gen import TileSizeGenerator
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.pareto import merge_fronts
+from residse.classes.cost_model.tensor_cost_model import evaluate_stack_batch
+from residse.classes.stages.parallel import run_substages
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PerStackTileSizeStage(Stage):
+    """
+    iterate mem size like IterateMemOrTileStage, but every stack gets its own tile size.
+
+    network en / la are sums over stacks, so each stack is evaluated on its own candidates only
+    (stacks x candidates, with the batch cost engine, for all mem sizes at once, kept in self.stack_tables),
+    and the (en, la) Pareto fronts of the stacks are merged to find the minimal network EDP at every mem size.
+    the chosen tile sizes are then evaluated by the substages (SumAllTileTypeStage -> ResidseCostModelStage),
+    so results are the same objects as in the other sweeps. the tile size of stack i is cme_of_stacks[i].tile_size.
+    """
+    def __init__(self, list_of_callables, *, dla: Dla, stacks: List[Stack], is_feature_merging, is_rda, tile_points=(10, 10), footprint_cache_size=4096, footprint_cache: FootprintCache = None, jobs=1, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        self.dla = dla
+        self.stacks = stacks
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.tile_points = tile_points
+        self.jobs = jobs
+        self.footprint_cache = footprint_cache if footprint_cache is not None else FootprintCache(max_size=footprint_cache_size)
+        self.a_buf_size_list = dla.a_buf.get_size_list()
+        self.stack_tables = {}
+
+    def get_candidates(self, stack: Stack) -> List[Tuple[int]]:
+        """tile size candidates of a stack, ofm h / w halved tile_points times"""
+        t_h_lst = sorted({t for t in TileSizeGenerator.generate_halves(stack.ofm_h, self.tile_points[0]) if t > 0})
+        t_w_lst = sorted({t for t in TileSizeGenerator.generate_halves(stack.ofm_w, self.tile_points[1]) if t > 0})
+        return list(product(t_h_lst, t_w_lst))
+
+    def get_stack_table(self, stack: Stack) -> dict:
+        """en / la of every (mem size, tile size candidate) of a stack, NaN if infeasible, evaluated once per stack"""
+        if stack not in self.stack_tables:
+            candidates = self.get_candidates(stack)
+            tile_h, tile_w = np.array(candidates).T
+            table = evaluate_stack_batch(
+                dla=self.dla,
+                stack=stack,
+                a_buf_size=np.array(self.a_buf_size_list, dtype=float)[:, None],
+                tile_h=tile_h[None, :],
+                tile_w=tile_w[None, :],
+                is_feature_merging=self.is_feature_merging,
+                is_rda=self.is_rda,
+            )
+            table["candidates"] = candidates
+            self.stack_tables[stack] = table
+        return self.stack_tables[stack]
+
+    def choose_tile_sizes(self, i: int):
+        """:return: tile size of every stack with the minimal network EDP at self.a_buf_size_list[i], None if infeasible"""
+        en_of_stacks, la_of_stacks, options_of_stacks = [], [], []
+        for stack in self.stacks:
+            table = self.get_stack_table(stack)
+            options = np.flatnonzero(table["feasible"][i])
+            if len(options) == 0:
+                return None
+            en_of_stacks.append(table["en"][i, options])
+            la_of_stacks.append(table["la"][i, options])
+            options_of_stacks.append(options)
+        choices, _, _ = merge_fronts(en_of_stacks, la_of_stacks)
+        return [
+            list(self.get_stack_table(stack)["candidates"][options[choice]])
+            for stack, options, choice in zip(self.stacks, options_of_stacks, choices)
+        ]
+
+    def run(self):
+        logger.info(f'Running a buf size at: {self.a_buf_size_list}')
+        # smallest a_buf_size (Byte) of every stack with its best candidate for feasibility
+        stack_thresholds = [float(self.get_stack_table(stack)["minimal_abuf_for_stack_under_tsize"].min()) for stack in self.stacks]
+        logger.info(f'Evaluated {sum(len(t["candidates"]) for t in self.stack_tables.values())} (stack, tile size) candidates, '
+                    f'layer fusion needs a buf size >= {max(stack_thresholds)/1024} KB')
+
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs['dla'] = self.dla
+        shared_kwargs['stacks'] = self.stacks
+        shared_kwargs['is_feature_merging'] = self.is_feature_merging
+        shared_kwargs['is_rda'] = self.is_rda
+        shared_kwargs['footprint_cache'] = self.footprint_cache
+
+        for i, a_buf_size in enumerate(self.a_buf_size_list):
+            tile_sizes = self.choose_tile_sizes(i)
+            if tile_sizes is None:
+                logger.info(f"skip a buf size at {a_buf_size}")
+                yield None, ([None] * len(self.stacks), a_buf_size, (-1, -1), None, [[] for _ in self.stacks], stack_thresholds)
+                continue
+
+            logger.info(f'Start running a_buf size at {a_buf_size}, tile sizes {tile_sizes} '+'---'*30)
+            tasks = [{'a_buf_size': a_buf_size, 'stack': stack, 'tile_size': tile_size} for stack, tile_size in zip(self.stacks, tile_sizes)]
+            cme_of_stacks = []  # all stack cmes in a list
+            types_of_stacks = []    # cme_of_types of every stack
+            acc = CostModelAccumulator()
+            for result in run_substages(self.list_of_callables, shared_kwargs, tasks, self.jobs):
+                for cme, extra_info in result:
+                    cme_of_stacks.append(cme)
+                    types_of_stacks.append(extra_info)
+                    acc.add(cme)
+            sum_cme = acc.summary()
+            tile_size = sum_cme.tile_size if sum_cme is not None else (-1, -1)
+            yield sum_cme, (cme_of_stacks, a_buf_size, tile_size, extra_info, types_of_stacks, stack_thresholds)
@@ -1,11 +1,15 @@
 import os
 import logging
+from collections import namedtuple
 from typing import Generator, Any, List, Tuple
 from residse.classes.cost_model.cost_model import CostModelEvaluation
 from residse.classes.stages.Stage import Stage
 from residse.visualization.plot_cme import plot_cme_edp, plot_cme_ema, plot_cme_tileiter
 logger = logging.getLogger(__name__)
 
+# 绘图只用到这几个字段, 不保留整个 cme
+PlotPoint = namedtuple('PlotPoint', ['a_buf_size', 'tile_size', 'edp', 'ema'])
+
 class PlotStage(Stage):
     def __init__(self, list_of_callables, *, dump_filename_pattern, is_fixed_tsize, is_fixed_memsize, **kwargs):
         super().__init__(list_of_callables, **kwargs)
@@ -22,7 +26,7 @@ class PlotStage(Stage):
         substage = self.list_of_callables[0](self.list_of_callables[1:], **self.kwargs)
         self.cmes = []
         for cme, extra_info in substage.run():
-            self.cmes.append(cme)
+            self.cmes.append(None if cme is None else PlotPoint(cme.a_buf_size, cme.tile_size, cme.edp, cme.ema))
             yield cme, extra_info
 
         logger.info(f'Charting all result information in directory, Please Wait......')
@@ -46,6 +50,9 @@ class PlotStage(Stage):
         
         elif not self.is_fixed_tsize and self.is_fixed_memsize:
         # 固定mem size迭代tile size，绘制merge+rda策略下，edp随着tile size变化热力图
+            if all(cme is None for cme in self.cmes):
+                logger.warning(f'no feasible tile size, skip plotting the tile size heatmap')
+                return
             file_bd_tileiter = self.dump_filename_pattern.replace("?.json", "tileiter.png")
             os.makedirs(os.path.dirname(file_bd_tileiter), exist_ok=True)
             plot_cme_tileiter(self.cmes, file_bd_tileiter)
@@ -2,6 +2,7 @@ from typing import Generator, Callable, List, Tuple, Any
 from residse.classes.stages.Stage import Stage
 from residse.classes.cost_model.cost_model import CostModelEvaluation
 from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.pareto import ParetoFront
 import logging
 
 logger = logging.getLogger(__name__)
@@ -112,3 +113,29 @@ class MinimalLatencyStage(Stage):
                 other_cmes.append((cme, extra_info))
         yield self.best_cme, other_cmes
 
+
+
+class ParetoStage(Stage):
+    """
+    Class that keeps only the cost model evaluations that are not dominated in all objectives (all minimized) of all
+    cost model evaluations generated by it's substages, and yields them sorted by the first objective.
+    only the front is kept while the results stream past, not the whole sweep.
+    """
+    def __init__(self, list_of_callables, *, pareto_objectives=('edp', 'en', 'la', 'a_buf_size'), **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        self.objectives = pareto_objectives
+
+    def run(self):
+        """
+        Run the pareto stage by inserting every new cost model output into the front found so far.
+        """
+        substage = self.list_of_callables[0](self.list_of_callables[1:], **self.kwargs)
+        self.front = ParetoFront(len(self.objectives))
+        for cme, extra_info in substage.run():
+            cme: CostModelEvaluation
+            if cme is not None:
+                self.front.insert([getattr(cme, name) for name in self.objectives], (cme, extra_info))
+
+        logger.info(f'{len(self.front)} of {self.front.nb_of_seen} design points are on the pareto front of {self.objectives}')
+        for _, (cme, extra_info) in self.front:
+            yield cme, extra_info
@@ -1,6 +1,7 @@
 from typing import Generator, Callable, List, Tuple, Any
 from residse.classes.stages.Stage import Stage
 from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.record import CostModelRecord
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ class ResidseCostModelStage(Stage):
         tile_type,
         is_feature_merging,
         is_rda,
+        footprint_cache=None,
         **kwargs
     ):
         super().__init__(list_of_callables, **kwargs)
@@ -29,10 +31,11 @@ class ResidseCostModelStage(Stage):
             self.tile_type,
             self.is_feature_merging,
             self.is_rda,
-        ) = (dla, a_buf_size, stack, tile_size, tile_type, is_feature_merging, is_rda)
+            self.footprint_cache,
+        ) = (dla, a_buf_size, stack, tile_size, tile_type, is_feature_merging, is_rda, footprint_cache)
 
     def run(self):
-        self.cme = CostModelEvaluation(
+        self.cme = self.evaluate(
             dla=self.dla,
             a_buf_size=self.a_buf_size,
             stack=self.stack,
@@ -40,8 +43,31 @@ class ResidseCostModelStage(Stage):
             tile_type=self.tile_type,
             is_feature_merging=self.is_feature_merging,
             is_rda=self.is_rda,
+            footprint_cache=self.footprint_cache,
         )
-        yield self.cme
+        # 只把结果往上传, 完整的 cme 需要时用 CostModelRecord.rebuild() 重新计算
+        yield CostModelRecord.from_cme(self.cme)
+
+    @staticmethod
+    def evaluate(*, dla, a_buf_size, stack, tile_size, tile_type, is_feature_merging, is_rda, footprint_cache=None, **kwargs) -> CostModelEvaluation:
+        cme = CostModelEvaluation(
+            dla=dla,
+            a_buf_size=a_buf_size,
+            stack=stack,
+            tile_size=tile_size,
+            tile_type=tile_type,
+            is_feature_merging=is_feature_merging,
+            is_rda=is_rda,
+            footprint_cache=footprint_cache,
+            lazy=True,
+        )
+        cme.calc_results()  # 不可行的点 (a_buf 放不下 io tile) 不计算各类数据量和切点
+        return cme
+
+    @classmethod
+    def compile(cls, list_of_callables):
+        """no stage object per tile type, kwargs go to the cost model directly"""
+        return lambda kwargs: [CostModelRecord.from_cme(cls.evaluate(**kwargs))]
 
     def is_leaf(self) -> bool:
         return True
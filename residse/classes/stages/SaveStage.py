@@ -7,6 +7,7 @@ from typing import Any, Callable, Generator, List, Tuple
 import numpy as np
 
 from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.columnar_store import ColumnarResultWriter
 from residse.classes.stages.Stage import Stage
 
 logger = logging.getLogger(__name__)
@@ -156,3 +157,37 @@ class PickleSaveStage(Stage):
             logger.info(
                 f"Saved pickled list of {len(all_cmes)} CMEs to {self.pickle_file_name}."
             )
+
+
+class ColumnarSaveStage(Stage):
+    """
+    Class that saves every received design point as one row of the columnar result store
+    (see residse.classes.cost_model.columnar_store), per-stack and per-tile-type breakdowns included.
+    Rows are written as they arrive, so it can be used with stream=True.
+    Read it back with load_columns(), without unpickling any CME.
+    """
+
+    def __init__(self, list_of_callables, *, dump_filename_pattern, stacks, **kwargs):
+        """
+        :param list_of_callables: see Stage
+        :param dump_filename_pattern: output filename pattern, the store is saved at the "columns" directory of it
+        :param stacks: all stacks of the network, gives the stack order of the breakdown columns
+        :param kwargs: any kwargs, passed on to substages
+        """
+        super().__init__(list_of_callables, **kwargs)
+        self.dump_filename_pattern = dump_filename_pattern
+        self.columns_dir = self.dump_filename_pattern.replace("?.json", "columns")
+        self.stacks = stacks
+
+    def run(self):
+        self.kwargs["dump_filename_pattern"] = self.dump_filename_pattern
+        self.kwargs["stacks"] = self.stacks
+
+        substage = self.list_of_callables[0](self.list_of_callables[1:], **self.kwargs)
+        writer = ColumnarResultWriter(self.stacks, self.columns_dir, dla=self.kwargs.get('dla'))
+        for cme, extra_info in substage.run():
+            writer.append(cme, extra_info)
+            yield cme, extra_info
+
+        writer.close()
+        logger.info(f"Saved {len(writer)} design points to columnar store {self.columns_dir}.")
@@ -1,4 +1,4 @@
-from typing import Generator, Callable, List
+from typing import Generator, Callable, Iterable, List
 
 
 class Stage:
@@ -36,6 +36,15 @@ class Stage:
     def __iter__(self):
         return self.run()
 
+    @classmethod
+    def compile(cls, list_of_callables: List[Callable]) -> Callable[[dict], Iterable]:
+        """
+        :return: a function kwargs -> results, the same as cls(list_of_callables, **kwargs).run().
+        used by run_substages for the stages run once per design point, a stage can override it to bind its substages
+        once and run them as a plain loop, without building a stage object and copying kwargs for every point.
+        """
+        return lambda kwargs: cls(list_of_callables, **kwargs).run()
+
     def is_leaf(self) -> bool:
         """
         :return: Returns true if the runnable is a leaf runnable, meaning that it does not use (or thus need) any substages
@@ -50,9 +59,13 @@ class MainStage:
     """
     Not actually a Stage, as running it does return (not yields!) a list of results instead of a generator
     Can be used as the main entry point
+    stream=True: results are only consumed by the sink stages (save / plot), run() returns an empty list,
+    and stream is passed down so stages yield compact records instead of per-tile-type CMEs
     """
-    def __init__(self, list_of_callables, **kwargs):
+    def __init__(self, list_of_callables, stream=False, **kwargs):
         self.kwargs = kwargs
+        self.kwargs["stream"] = stream
+        self.stream = stream
         self.list_of_callables = list_of_callables
 
 
@@ -65,5 +78,6 @@ class MainStage:
         answers = []
         substage = self.list_of_callables[0](self.list_of_callables[1:], **self.kwargs)
         for cme, extra_info in substage.run():
-            answers.append((cme, extra_info))
+            if not self.stream:
+                answers.append((cme, extra_info))
         return answers
\ No newline at end of file
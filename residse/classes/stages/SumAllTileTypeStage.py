@@ -3,33 +3,85 @@ from residse.classes.stages.Stage import Stage
 from residse.classes.cost_model.cost_model import CostModelEvaluation
 from residse.classes.workload.stack import Stack
 from residse.classes.workload.tile_gen import TileSizeGenerator, TileTypeGenerator
-from utils import sum_cme
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.result_cache import ResultCache
+from residse.classes.cost_model.columnar_store import type_breakdown
+from residse.classes.stages.parallel import run_substages, compile_stage
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class SumAllTileTypeStage(Stage):
-    def __init__(self, list_of_callables, tile_size, stack: Stack, **kwargs):
+    def __init__(self, list_of_callables, tile_size, stack: Stack, result_cache: ResultCache = None, stream=False, **kwargs):
         super().__init__(list_of_callables, **kwargs)
         self.tile_size = tile_size
         self.stack = stack
+        self.result_cache = result_cache
+        self.stream = stream
         self.type_lst = TileTypeGenerator(self.tile_size, self.stack).run()
 
     def run(self):
-        self.cme_of_types = []
-        self.sum_cme = None
-        for ttype in self.type_lst:
-            kwargs = self.kwargs.copy()
-            kwargs["tile_type"] = ttype
-            kwargs["tile_size"] = self.tile_size
-            kwargs["stack"] = self.stack
-            substage = self.list_of_callables[0](self.list_of_callables[1:], **kwargs)
-            for cme in substage.run():
-                if cme.ema is None:
-                    self.cme_of_types.append(None)
-                else:
-                    self.cme_of_types.append(cme)
-
-        self.sum_cme = sum_cme(self.cme_of_types)       
-        yield self.sum_cme, self.cme_of_types
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs["tile_size"] = self.tile_size
+        shared_kwargs["stack"] = self.stack
+        tasks = [{"tile_type": ttype} for ttype in self.type_lst]
+
+        def evaluate_types():
+            for result in run_substages(self.list_of_callables, shared_kwargs, tasks):
+                yield from result
+
+        self.sum_cme, self.cme_of_types = self.sum_types(evaluate_types, self.stack, self.tile_size, self.result_cache, self.kwargs)
+        yield self.compact(self.sum_cme, self.cme_of_types, self.stream)
+
+    @staticmethod
+    def sum_types(evaluate_types, stack, tile_size, result_cache, kwargs):
+        """
+        (sum_cme, cme_of_types) of a stack, from result_cache or evaluate_types()
+        :param evaluate_types: function, generator of the cme of every tile type, in the order of TileTypeGenerator
+        """
+        if result_cache is not None:
+            key = ResultCache.make_key(kwargs['dla'], stack, tile_size, kwargs['a_buf_size'], kwargs['is_feature_merging'], kwargs['is_rda'])
+            cached = result_cache.load(key, kwargs['dla'], stack)
+            if cached is not None:
+                return cached
+
+        cme_of_types = []
+        acc = CostModelAccumulator()
+        for cme in evaluate_types():
+            if cme.ema is None:
+                cme_of_types.append(None)
+                acc.add(None)
+            else:
+                cme_of_types.append(cme)
+                acc.add(cme)
+
+        sum_cme = acc.summary()
+        if result_cache is not None:
+            result_cache.store(key, sum_cme, cme_of_types)
+        return sum_cme, cme_of_types
+
+    @staticmethod
+    def compact(sum_cme, cme_of_types, stream):
+        """stream mode: only pass the type_breakdown() of cme_of_types up, not the CMEs"""
+        if stream:
+            return sum_cme, type_breakdown(cme_of_types)
+        return sum_cme, cme_of_types
+
+    @classmethod
+    def compile(cls, list_of_callables):
+        """a loop over the tile types calling the compiled substage, only one kwargs copy per stack"""
+        evaluate_type = compile_stage(list_of_callables)
+
+        def run(kwargs):
+            kwargs = kwargs.copy()
+            stack, tile_size = kwargs['stack'], kwargs['tile_size']
+            result_cache, stream = kwargs.pop('result_cache', None), kwargs.pop('stream', False)
+
+            def evaluate_types():
+                for ttype in TileTypeGenerator(tile_size, stack).run():
+                    kwargs['tile_type'] = ttype
+                    yield from evaluate_type(kwargs)
+
+            return [cls.compact(*cls.sum_types(evaluate_types, stack, tile_size, result_cache, kwargs), stream)]
+        return run
@@ -0,0 +1,156 @@
+import json
+import os
+from typing import Generator, Callable, List, Tuple, Any
+import numpy as np
+from residse.classes.stages.Stage import Stage
+from residse.classes.hardware.dla import Dla
+from residse.classes.workload.stack import Stack
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.feasibility import FeasibilityOracle
+from residse.classes.cost_model.tensor_cost_model import evaluate_network_batch
+from residse.classes.stages.parallel import run_substages
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TileSearchStage(Stage):
+    """
+    simulated annealing over every (tile_h, tile_w) in [1, ofm_h] x [1, ofm_w] at a fixed mem size, within
+    search_budget evaluated tile sizes instead of the whole grid.
+
+    search_restarts (at most search_budget) chains start at log-uniform random tile sizes and run in lockstep, every step draws
+    search_proposals neighbours per chain, all of them are evaluated in one call of the batch cost engine and the best
+    neighbour of a chain goes through the Metropolis acceptance. a neighbour scales h and / or w by
+    exp(sigma * N(0, 1)), sigma and the temperature (on log EDP) shrink over the budget / (restarts x proposals) steps. infeasible tile sizes
+    are rejected, a chain stuck on an infeasible start walks freely until it finds a feasible one. the search stops
+    once search_budget tile sizes are evaluated, proposals past the budget are dropped.
+    every improvement of the best network EDP is evaluated by the substages (SumAllTileTypeStage -> ResidseCostModelStage)
+    and yielded in order, the last one is the best tile size. the improvement history is saved to search_history.json.
+    """
+    def __init__(self, list_of_callables, *, dla: Dla, stacks: List[Stack], fixed_mem_size, is_feature_merging, is_rda, dump_filename_pattern,
+                 search_budget=2000, search_restarts=8, search_proposals=4, seed=0, t_start=1.0, t_end=1e-3, footprint_cache_size=4096, footprint_cache: FootprintCache = None, jobs=1, **kwargs):
+        super().__init__(list_of_callables, **kwargs)
+        if search_budget < 1:
+            raise ValueError(f"search budget must be at least 1 evaluation, got {search_budget}")
+        self.dla = dla
+        self.stacks = stacks
+        self.a_buf_size = fixed_mem_size
+        self.is_feature_merging = is_feature_merging
+        self.is_rda = is_rda
+        self.dump_filename_pattern = dump_filename_pattern
+        self.history_path = dump_filename_pattern.replace("?.json", "search_history.json")
+        self.budget = search_budget
+        self.restarts = min(search_restarts, search_budget)
+        self.proposals = search_proposals
+        self.seed = seed
+        self.t_start = t_start
+        self.t_end = t_end
+        self.jobs = jobs
+        self.max_h = max(stack.ofm_h for stack in stacks)
+        self.max_w = max(stack.ofm_w for stack in stacks)
+        self.footprint_cache = footprint_cache if footprint_cache is not None else FootprintCache(max_size=footprint_cache_size)
+        self.edps = {}  # (tile_h, tile_w) -> network EDP, inf if infeasible
+        self.best = None    # tile size with the minimal EDP so far
+
+    def evaluate(self, tile_sizes: List[Tuple[int, int]]) -> np.ndarray:
+        """
+        network EDP of every tile size, each tile size is evaluated once. new tile sizes past the budget are not
+        evaluated and get inf, i.e. they are never better than an evaluated one
+        """
+        new = [t for t in dict.fromkeys(tile_sizes) if t not in self.edps]
+        new = sorted(new[:self.budget - len(self.edps)])
+        if new:
+            tile_h, tile_w = np.array(new).T
+            edp = evaluate_network_batch(
+                dla=self.dla,
+                stacks=self.stacks,
+                a_buf_size=self.a_buf_size,
+                tile_h=tile_h,
+                tile_w=tile_w,
+                is_feature_merging=self.is_feature_merging,
+                is_rda=self.is_rda,
+            )["edp"]
+            edp = np.where(np.isnan(edp), np.inf, edp)
+            self.edps.update(zip(new, edp))
+            if self.best is None or edp.min() < self.edps[self.best]:
+                self.best = new[int(np.argmin(edp))]
+        return np.array([self.edps.get(t, np.inf) for t in tile_sizes])
+
+    def propose(self, rng: np.random.Generator, h: np.ndarray, w: np.ndarray, sigma: float):
+        """random neighbours of the current tile sizes in log space, always different from the current ones"""
+        move = rng.integers(0, 3, size=len(h))     # 0: h, 1: w, 2: both
+        new_h = np.where(move != 1, np.rint(h * np.exp(sigma * rng.standard_normal(len(h)))), h)
+        new_w = np.where(move != 0, np.rint(w * np.exp(sigma * rng.standard_normal(len(w)))), w)
+        step = rng.choice([-1, 1], size=len(h))
+        new_h = np.where((new_h == h) & (new_w == w) & (move != 1), h + step, new_h)
+        new_w = np.where((new_h == h) & (new_w == w), w + step, new_w)
+        return np.clip(new_h, 1, self.max_h).astype(int), np.clip(new_w, 1, self.max_w).astype(int)
+
+    def search(self):
+        """:return: improvement history [(evaluations, edp, (tile_h, tile_w)), ...] of the best network EDP"""
+        rng = np.random.default_rng(self.seed)
+        h = np.rint(np.exp(rng.uniform(0, np.log(self.max_h), self.restarts))).astype(int)
+        w = np.rint(np.exp(rng.uniform(0, np.log(self.max_w), self.restarts))).astype(int)
+        cost = np.log(self.evaluate(list(zip(h.tolist(), w.tolist()))))
+        history = []
+        # 每步最多评估 restarts x proposals 个新点, 评估过的点不占预算, 最后一步只评估预算剩下的点
+        steps = max(1, self.budget // (self.restarts * self.proposals))
+        for step in range(steps + 1):
+            best = self.best
+            if np.isfinite(self.edps[best]) and (not history or self.edps[best] < history[-1][1]):
+                history.append((len(self.edps), float(self.edps[best]), best))
+                logger.info(f'{len(self.edps)} evaluations: best tile size {best}, EDP {self.edps[best]}')
+            if step == steps or len(self.edps) >= self.budget:
+                break
+            progress = step / steps
+            temperature = self.t_start * (self.t_end / self.t_start) ** progress
+            sigma = 1.5 * (1 - progress) + 0.05
+            new_h, new_w = self.propose(rng, np.tile(h, self.proposals), np.tile(w, self.proposals), sigma)
+            new_cost = np.log(self.evaluate(list(zip(new_h.tolist(), new_w.tolist())))).reshape(self.proposals, self.restarts)
+            chosen = np.argmin(new_cost, axis=0), np.arange(self.restarts)
+            new_h, new_w = new_h.reshape(self.proposals, self.restarts)[chosen], new_w.reshape(self.proposals, self.restarts)[chosen]
+            new_cost = new_cost[chosen]
+            with np.errstate(invalid='ignore'):
+                accept = (new_cost <= cost) | ~np.isfinite(cost) | (rng.random(self.restarts) < np.exp((cost - new_cost) / temperature))
+            h, w, cost = np.where(accept, new_h, h), np.where(accept, new_w, w), np.where(accept, new_cost, cost)
+        return history
+
+    def save_history(self, history):
+        os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+        with open(self.history_path, "w") as fp:
+            json.dump([{"evaluations": n, "edp": edp, "tile_size": list(tile_size)} for n, edp, tile_size in history], fp, indent=4)
+        logger.info(f'Saved search history to {self.history_path}')
+
+    def run(self):
+        logger.info(f'Searching tile size in [1, {self.max_h}] x [1, {self.max_w}] at a buf size {self.a_buf_size} KB, '
+                    f'budget {self.budget} evaluations, {self.restarts} restarts x {self.proposals} proposals, seed {self.seed}')
+        history = self.search()
+        self.save_history(history)
+        if not history:
+            logger.warning(f'no feasible tile size found at mem size {self.a_buf_size} KB within {len(self.edps)} evaluations')
+            return
+
+        shared_kwargs = self.kwargs.copy()
+        shared_kwargs['dla'] = self.dla
+        shared_kwargs['stacks'] = self.stacks
+        shared_kwargs['is_feature_merging'] = self.is_feature_merging
+        shared_kwargs['is_rda'] = self.is_rda
+        shared_kwargs['dump_filename_pattern'] = self.dump_filename_pattern
+        shared_kwargs['footprint_cache'] = self.footprint_cache
+        oracle = FeasibilityOracle(dla=self.dla, stacks=self.stacks, is_feature_merging=self.is_feature_merging,
+                                   is_rda=self.is_rda, footprint_cache=self.footprint_cache)
+        for _, _, tile_size in history:
+            tile_size = list(tile_size)
+            tasks = [{'a_buf_size': self.a_buf_size, 'stack': stack, 'tile_size': tile_size} for stack in self.stacks]
+            cme_of_stacks = []  # all stack cmes in a list
+            types_of_stacks = []    # cme_of_types of every stack
+            acc = CostModelAccumulator()
+            for result in run_substages(self.list_of_callables, shared_kwargs, tasks, self.jobs):
+                for cme, extra_info in result:
+                    cme_of_stacks.append(cme)
+                    types_of_stacks.append(extra_info)
+                    acc.add(cme)
+            sum_cme = acc.summary()
+            yield sum_cme, (cme_of_stacks, self.a_buf_size, tile_size, extra_info, types_of_stacks, oracle.get_stack_thresholds(tile_size))
@@ -2,12 +2,18 @@ from .Stage import MainStage, Stage
 
 from .InputParserStage import HardwareParserStage, WorkloadParserStage
 from .ResidseCostModelStage import ResidseCostModelStage
-from .SaveStage import CompleteSaveStage, SimpleSaveStage, PickleSaveStage
+from .SaveStage import CompleteSaveStage, SimpleSaveStage, PickleSaveStage, ColumnarSaveStage
 from .IterateMemSIzeStage import IterateMemSizeStage
 from .IterateStackStage import IterateStackStage
-from .ReduceStage import MinimalEDPStage, MinimalEnergyStage, MinimalLatencyStage, MinimalEMAStage
+from .ReduceStage import MinimalEDPStage, MinimalEnergyStage, MinimalLatencyStage, MinimalEMAStage, ParetoStage
 from .IterateTileSizeStage import IterateTileSizeStage
 from .SumAllTileTypeStage import SumAllTileTypeStage
 from .IterateMemOrTileStage import IterateMemOrTileStage
 from .PlotStage import PlotStage
+from .AnalyticMemSweepStage import AnalyticMemSweepStage
+from .PerStackTileSizeStage import PerStackTileSizeStage
 
+from .FusionSearchStage import FusionSearchStage
+from .TileSearchStage import TileSearchStage
+from .InverseQueryStage import InverseQueryStage
+from .IterateHardwareStage import IterateHardwareStage
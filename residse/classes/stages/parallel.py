@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Generator, Iterable, List
+logger = logging.getLogger(__name__)
+
+# per worker process: the substage pipeline and the kwargs shared by every task (dla, stacks ...),
+# set once by the pool initializer so they are not pickled again for every task
+_worker_state = {}
+
+
+def _init_worker(list_of_callables: List[Callable], shared_kwargs: dict):
+    _worker_state["list_of_callables"] = list_of_callables
+    _worker_state["shared_kwargs"] = shared_kwargs
+
+
+def _run_task(task_kwargs: dict) -> list:
+    return _run_substage(_worker_state["list_of_callables"], _worker_state["shared_kwargs"], task_kwargs)
+
+
+@lru_cache(maxsize=None)
+def _compile(list_of_callables: tuple) -> Callable[[dict], Iterable]:
+    stage = list_of_callables[0]
+    if hasattr(stage, 'compile'):
+        return stage.compile(list(list_of_callables[1:]))
+    return lambda kwargs: stage(list(list_of_callables[1:]), **kwargs).run()
+
+
+def compile_stage(list_of_callables: List[Callable]) -> Callable[[dict], Iterable]:
+    """
+    the substage pipeline as one function kwargs -> results, see Stage.compile. compiled once per pipeline,
+    e.g. IterateStackStage -> SumAllTileTypeStage -> ResidseCostModelStage becomes a loop over stacks and tile types.
+    """
+    return _compile(tuple(list_of_callables))
+
+
+def _run_substage(list_of_callables: List[Callable], shared_kwargs: dict, task_kwargs: dict) -> list:
+    kwargs = shared_kwargs.copy()
+    kwargs.update(task_kwargs)
+    return list(compile_stage(list_of_callables)(kwargs))
+
+
+def run_substages(list_of_callables: List[Callable], shared_kwargs: dict, task_kwargs_list: List[dict], jobs: int = 1) -> Generator:
+    """
+    run one substage per task and yield the list of its results, in task order.
+    :param shared_kwargs: kwargs of every task, sent to each worker only once
+    :param task_kwargs_list: kwargs that differ per task, e.g. [{'a_buf_size': 32}, {'a_buf_size': 34.5}, ...]
+    :param jobs: number of worker processes, jobs <= 1 runs serially in this process.
+    only the outermost iterate stage (mem size / tile size / stack search) runs its tasks in parallel,
+    the per-point substages (IterateStackStage, SumAllTileTypeStage ...) run serially inside each worker,
+    jobs=1 is passed down so pools are never nested.
+    """
+    shared_kwargs = dict(shared_kwargs, jobs=1)
+    if jobs <= 1 or len(task_kwargs_list) <= 1:
+        for task_kwargs in task_kwargs_list:
+            yield _run_substage(list_of_callables, shared_kwargs, task_kwargs)
+        return
+
+    workers = min(jobs, len(task_kwargs_list))
+    logger.info(f'Running {len(task_kwargs_list)} tasks on {workers} processes')
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(list_of_callables, shared_kwargs)) as pool:
+        yield from pool.map(_run_task, task_kwargs_list)
@@ -1,5 +1,8 @@
+import hashlib
+import json
 from typing import Generator, Callable, List, Tuple, Any
 from math import prod
+import numpy as np
 
 
 class Stack:
@@ -19,46 +22,62 @@ class Stack:
             'dim': [270, 480, 64, 64, 3, 3]
             }
     }
+
+    the layer dims and strides are kept in read-only NumPy arrays (dims: stack_len x 6, strides), all per-layer and
+    derived quantities (ifm / ofm size, area, data amount, outer_add, weight) are computed from them once here.
+    the *_per_layer attributes are plain python lists of them for the scalar cost model, the batch cost code uses
+    the arrays. content_hash only depends on the layer dicts (not on id or layer names), equal stacks share cache entries.
     """
     def __init__(self, id: int, stack_di: dict):
         self.id = id
         self.stack_di = stack_di
         self.stack_len = len(stack_di)
-        self.stride_per_layer = [layer.get('stride', 1) for layer in self.stack_di.values()]
-        self.ich_per_layer = [layer['dim'][3] for layer in self.stack_di.values()]
-        self.och_per_layer = [layer['dim'][2] for layer in self.stack_di.values()]
-        self.in_resb = [layer['in_resb'] for layer in self.stack_di.values()]
-        self.kernel_size = [layer['dim'][-1] for layer in self.stack_di.values()]
-        self.ofm_h = [layer['dim'][0] for layer in self.stack_di.values()][-1]
-        self.ofm_w = [layer['dim'][1] for layer in self.stack_di.values()][-1]
-        self.ofm_h_per_layer = [layer['dim'][0] for layer in self.stack_di.values()]
-        self.ofm_w_per_layer = [layer['dim'][1] for layer in self.stack_di.values()]
-        self.ifm_h_per_layer = [ofm_h * stride for ofm_h, stride in zip(self.ofm_h_per_layer, self.stride_per_layer)]
-        self.ifm_w_per_layer = [ofm_w * stride for ofm_w, stride in zip(self.ofm_w_per_layer, self.stride_per_layer)]
+        layers = list(stack_di.values())
+        self.content_hash = hashlib.sha256(json.dumps(layers, sort_keys=True).encode()).hexdigest()
+        self.dims = np.array([layer['dim'] for layer in layers], dtype=np.int64).reshape(self.stack_len, 6)    # ofm_h, ofm_w, och, ich, fx, fy
+        self.strides = np.array([layer.get('stride', 1) for layer in layers], dtype=np.int64)
+        # 第 i 层之后的 stride 乘积, 最后一层输出 tile 乘上它就是第 i 层的输出 tile
+        self.out_mult = np.append(np.cumprod(self.strides[::-1])[::-1][1:], 1)
+        self.dims.flags.writeable = False
+        self.strides.flags.writeable = False
+        self.out_mult.flags.writeable = False
 
-    def get_stack_weight_data_amount(self):
-        # element or byte
-        weight_data_amount_per_layer = [(layer['dim'][-1] * layer['dim'][-2] * layer['dim'][-3] * layer['dim'][-4]) for layer in self.stack_di.values() if layer['op'] != 'pool']
-        weight_data_amount = sum(weight_data_amount_per_layer)
-        return weight_data_amount
-            
-    
-    def parse_ifm_and_ofm(self):
-        # fm area
-        self.ofm_area_per_layer = [(layer['dim'][0] * layer['dim'][1]) for layer in self.stack_di.values()]
-        self.ifm_area_per_layer = [ofm * stride**2 for ofm, stride in zip(self.ofm_area_per_layer, self.stride_per_layer)]
+        self.ops = [layer['op'] for layer in layers]
+        self.in_resb = [layer['in_resb'] for layer in layers]
+        self.stride_per_layer = self.strides.tolist()
+        self.ofm_h_per_layer = self.dims[:, 0].tolist()
+        self.ofm_w_per_layer = self.dims[:, 1].tolist()
+        self.och_per_layer = self.dims[:, 2].tolist()
+        self.ich_per_layer = self.dims[:, 3].tolist()
+        self.kernel_size = self.dims[:, 5].tolist()
+        self.ofm_h = self.ofm_h_per_layer[-1]
+        self.ofm_w = self.ofm_w_per_layer[-1]
+        self.ifm_h_per_layer = (self.dims[:, 0] * self.strides).tolist()
+        self.ifm_w_per_layer = (self.dims[:, 1] * self.strides).tolist()
 
+        # fm area
+        ofm_area = self.dims[:, 0] * self.dims[:, 1]
+        ifm_area = ofm_area * self.strides**2
+        self.ofm_area_per_layer = ofm_area.tolist()
+        self.ifm_area_per_layer = ifm_area.tolist()
         # fm data amount
-        self.ofm_data_amount_per_layer = [(layer['dim'][0] * layer['dim'][1] * layer['dim'][2]) for layer in self.stack_di.values()]
-        self.ifm_data_amount_per_layer = [area * ch for area, ch in zip(self.ifm_area_per_layer, self.ich_per_layer)]
+        self.ofm_data_amount_per_layer = (ofm_area * self.dims[:, 2]).tolist()
+        self.ifm_data_amount_per_layer = (ifm_area * self.dims[:, 3]).tolist()
+
+        self.outer_add = 'outer_add' in self.ops
+        # element or byte
+        not_pool = np.array([op != 'pool' for op in self.ops], dtype=bool)
+        self.weight_data_amount = int(self.dims[not_pool, 2:].prod(axis=1).sum())
+
+    def get_stack_weight_data_amount(self):
+        # element or byte
+        return self.weight_data_amount
 
     def get_ema_of_all_fused(self):
-        self.parse_ifm_and_ofm()
         return self.ofm_data_amount_per_layer[-1] + self.ifm_data_amount_per_layer[0]
 
     def has_outer_add(self):
-        self.ops = [layer['op'] for layer in self.stack_di.values()]
-        return ('outer_add' in self.ops)
+        return self.outer_add
 
     def __repr__(self) -> str:
         return f"Stack(id={self.id},len={self.stack_len})"
@@ -1,55 +1,111 @@
-import sys
 from typing import Generator, Callable, List, Tuple, Any
 from residse.classes.workload.stack import Stack
-from itertools import product
 import logging
 logger = logging.getLogger(__name__)
 
+# every tile type TileTypeGenerator can return, in generation order
+TILE_TYPES = ['F', 'HL', 'HM', 'HR', 'WU', 'WM', 'WD', 'LU', 'U', 'RU', 'L', 'M', 'R', 'LD', 'D', 'RD']
+
 class TileSizeGenerator:
+    """
+    stream tile size candidates (h, w) lazily, h and w candidates come from one of the STRATEGIES:
+        legacy   : [540, 270, 72, 16, 4, 1] x [960, 240, 60, 16, 4, 1], only for 540*960 networks
+        divisors : divisors of the ofm h / w of every stack (tiles cover the ofm exactly)
+        pow2     : powers of 2 below the ofm h / w, plus the ofm h / w (full tile)
+        unroll   : multiples of the MAC unroll dla.u_h / dla.u_w, plus the ofm h / w
+        halves   : ofm h / w halved tile_points times
+        grid     : user lists tile_grid = (h list, w list)
+        auto     : legacy for 540*960 networks, otherwise divisors
+    with an oracle (FeasibilityOracle) and a_buf_size (KB), tile sizes whose minimal footprint does not fit a_buf_size
+    are dropped before evaluation. the footprint grows with tile h and w, so the largest feasible w of every h is found
+    by bisection and the remaining candidates are never checked.
+    """
+    STRATEGIES = ['auto', 'legacy', 'divisors', 'pow2', 'unroll', 'halves', 'grid']
 
-    # def __init__(self, fixed_tile_size: Tuple[int] | None, stack: Stack, nb_of_points: Tuple[int]):
-    def __init__(self, fixed_tile_size: Tuple[int] | None, stacks: List[Stack]):
+    def __init__(self, fixed_tile_size: Tuple[int] | None, stacks: List[Stack], strategy='auto', dla=None, tile_points=(10, 10), tile_grid=None, oracle=None, a_buf_size=None):
+        if fixed_tile_size is not None:
+            raise ValueError("Tile_size迭代实验不可指定fixed tile size")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"unknown tile size strategy {strategy}, choose from {self.STRATEGIES}")
         self.fixed_tile_size = fixed_tile_size
         self.ofm_h_list = []
         self.ofm_w_list = []
         for stack in stacks:
             self.ofm_h_list.append(stack.ofm_h)
             self.ofm_w_list.append(stack.ofm_w)
+        if strategy == 'auto':
+            strategy = 'legacy' if all(h == 540 and w == 960 for h, w in zip(self.ofm_h_list, self.ofm_w_list)) else 'divisors'
+        self.strategy = strategy
+        self.dla = dla
+        self.tile_points = tile_points
+        self.tile_grid = tile_grid
+        self.oracle = oracle
+        self.a_buf_size = a_buf_size
 
-        # self.h_points = nb_of_points[0] if nb_of_points is not None else 10  #* default tile size profiling points
-        # self.w_points = nb_of_points[1] if nb_of_points is not None else 10  #* default tile size profiling points
+    def get_candidate_lists(self) -> Tuple[List[int], List[int]]:
+        """h and w candidates of the strategy, in generation order"""
+        if self.strategy == 'legacy':
+            for ofm_h, ofm_w in zip(self.ofm_h_list, self.ofm_w_list):
+                if not (ofm_h == 540 and ofm_w == 960):
+                    raise ValueError("legacy tile size list is only for 960*540 networks, use another tile size strategy")
+            return [540, 270, 72, 16, 4, 1], [960, 240, 60, 16, 4, 1]
+        if self.strategy == 'grid':
+            if self.tile_grid is None:
+                raise ValueError("grid tile size strategy needs tile_grid = (h list, w list)")
+            return list(self.tile_grid[0]), list(self.tile_grid[1])
+        if self.strategy == 'unroll' and self.dla is None:
+            raise ValueError("unroll tile size strategy needs the dla")
+        lists = []
+        for ofm_list, u, points in zip((self.ofm_h_list, self.ofm_w_list),
+                                       (getattr(self.dla, 'u_h', 1), getattr(self.dla, 'u_w', 1)),
+                                       self.tile_points):
+            if self.strategy == 'divisors':
+                candidates = {d for ofm in ofm_list for d in self.generate_divisors(ofm)}
+            elif self.strategy == 'pow2':
+                candidates = {2 ** i for i in range(max(ofm_list).bit_length()) if 2 ** i < max(ofm_list)} | set(ofm_list)
+            elif self.strategy == 'unroll':
+                candidates = set(range(u, max(ofm_list), u)) | set(ofm_list)
+            else:
+                candidates = {t for ofm in ofm_list for t in self.generate_halves(ofm, points) if t > 0}
+            lists.append(sorted(candidates))
+        return lists[0], lists[1]
 
+    def is_feasible(self, tile_size: Tuple[int]) -> bool:
+        return self.oracle is None or self.oracle.is_feasible(self.a_buf_size, tile_size)
 
     def run(self):
-        for ofm_h,ofm_w in zip(self.ofm_h_list,self.ofm_w_list):
-            if not (ofm_h == 540 and ofm_w == 960):
-                sys.exit("error: Tile_size迭代实验必须在960*540分辨率下的图像增强网络上进行")
-        if self.fixed_tile_size is not None:
-                sys.exit("error: Tile_size迭代实验不可指定fixed tile size")
-
-        # if self.fixed_tile_size is not None:
-        #     size_gen_lst = [self.fixed_tile_size]
-        # else:
-        # t_h_lst = self.generate_even_sequence(self.ofm_h)       # 偶数序列，产生的点会很多
-        # t_w_lst = self.generate_even_sequence(self.ofm_w)       # 偶数序列，产生的点会很多
-        # # t_h_lst = self.generate_halves(self.ofm_h, self.h_points)   #todo 采用了比较简单的除以2算法
-        # # t_w_lst = self.generate_halves(self.ofm_w, self.w_points)   #todo 采用了比较简单的除以2算法
-        # t_h_lst = list(filter(lambda x: x != 0, t_h_lst))   # remove 0
-        # t_w_lst = list(filter(lambda x: x != 0, t_w_lst))   # remove 0
-        t_h_lst = [540, 270, 72, 16, 4, 1]
-        t_w_lst = [960, 240, 60, 16, 4, 1]
-        logger.debug(f'tile size profiling list: h in {t_h_lst}, w in {t_w_lst}')
-        size_gen_lst = list(product(t_h_lst, t_w_lst))
-        self.size_gen_lst = size_gen_lst
-        
-        for tile_size in self.size_gen_lst:
-            yield tile_size
-
+        t_h_lst, t_w_lst = self.get_candidate_lists()
+        logger.debug(f'tile size profiling list ({self.strategy}): h in {t_h_lst}, w in {t_w_lst}')
+        w_sorted = sorted(t_w_lst)
+        min_infeasible_h = None     # 比它大的 h 都不可行
+        for t_h in t_h_lst:
+            if min_infeasible_h is not None and t_h >= min_infeasible_h:
+                continue
+            # number of feasible w, i.e. index of the first infeasible w in w_sorted
+            lo, hi = 0, len(w_sorted)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.is_feasible((t_h, w_sorted[mid])):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0:
+                min_infeasible_h = t_h
+                continue
+            max_w = w_sorted[lo - 1]
+            for t_w in t_w_lst:
+                if t_w <= max_w:
+                    yield t_h, t_w
 
     @staticmethod
     def generate_halves(number, n):
         return [int(number / (2 ** i)) for i in range(n)]
     
+    @staticmethod
+    def generate_divisors(number):
+        small = [i for i in range(1, int(number ** 0.5) + 1) if number % i == 0]
+        return sorted(set(small + [number // i for i in small]))
+
     @staticmethod
     def generate_even_sequence(max_num):
         # 确保给定数字是正数且至少为2，因为小于2没有偶数
@@ -84,7 +140,7 @@ class TileTypeGenerator:
 if __name__ == '__main__':
     st3_di =  { 7: {'op': 'conv', 'stride': 2, 'in_resb': True, 'dim': [540, 960, 128, 64, 3, 3]}, 
                 8: {'op': 'conv', 'stride': 1, 'in_resb': True, 'dim': [540, 960, 128, 128, 3, 3]}}
-    eg = TileSizeGenerator(fixed_tile_size=None, stack=Stack(1, st3_di))
+    eg = TileSizeGenerator(fixed_tile_size=None, stacks=[Stack(1, st3_di)], strategy='pow2')
     poss = eg.run()
     print(list(poss))
     
@@ -0,0 +1,185 @@
+import argparse
+import logging
+from residse.classes.stages import *
+from residse.classes.cost_model.result_cache import ResultCache
+from residse.classes.workload.tile_gen import TileSizeGenerator
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from utils import get_experiment_id
+logger = logging.getLogger(__name__)
+
+
+def get_parser(parser_class=argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """command line options of a single experiment, used by main_dse.py and for every run of main_batch.py"""
+    parser = parser_class(description="Setup residse inputs")
+    parser.add_argument( "--nn", metavar="Network name", required=True, help="module name to networks, e.g. resnet18")
+    parser.add_argument( "--hw", metavar="Hardware name", required=True, help="file name to the user-defined json accelerator, e.g. example_1")
+    parser.add_argument( "--merge", action='store_true', help="bool, using feature merging stategy?")
+    parser.add_argument( "--rda", action='store_true', help="bool, using reuse-distance-aware caching strategy?")
+    parser.add_argument( "--tile_size", metavar="Fixed Tile Size", type=int, nargs='+', required=False, help="use fixed tile size [h, w], e.g. 4 6. If provided, --mem_size cannot be used." )
+    parser.add_argument( "--mem_size", metavar="Fixed Memory Size", type=int, required=False, help="specify memory size (KB) for iteration with tile size. If provided, --tile_size cannot be used.")
+    parser.add_argument( "--analytic", action='store_true', help="bool, build closed-form EMA curves once and look up every mem size (only with --tile_size)")
+    parser.add_argument( "--cache_dir", metavar="Result Cache Dir", required=False, help="persistent per-stack result cache, e.g. outputs/.cache, re-runs only evaluate stacks / mem sizes that changed")
+    parser.add_argument( "--stream", action='store_true', help="bool, summary-only streaming mode, per-tile-type CMEs are dropped right after use and results are only written by the save / plot stages")
+    parser.add_argument( "--jobs", metavar="Number of Processes", type=int, default=1, help="spread mem size / tile size iterations across N worker processes, default 1 (serial)")
+    parser.add_argument( "--per_stack_tile", action='store_true', help="bool, iterate mem size and choose the tile size of every stack on its own for the minimal network EDP")
+    parser.add_argument( "--tile_points", metavar="Tile Size Points", type=int, nargs=2, default=[10, 10], help="with --per_stack_tile (or --tile_gen halves), tile size points to explore per stack, e.g. 10 10 will run 100 points" )
+    parser.add_argument( "--tile_gen", metavar="Tile Size Strategy", default='auto', choices=TileSizeGenerator.STRATEGIES, help=f"with --mem_size, tile size candidates: {TileSizeGenerator.STRATEGIES}, default auto (legacy list for 960*540 networks, otherwise divisors of the ofm size)")
+    parser.add_argument( "--tile_search", action='store_true', help="bool, with --mem_size, simulated annealing over every tile size within --search_budget evaluations instead of the --tile_gen candidates")
+    parser.add_argument( "--search_budget", metavar="Search Budget", type=int, default=2000, help="with --tile_search, max number of evaluated tile sizes, default 2000" )
+    parser.add_argument( "--search_restarts", metavar="Search Restarts", type=int, default=8, help="with --tile_search, number of annealing chains run in lockstep, default 8" )
+    parser.add_argument( "--seed", metavar="Random Seed", type=int, default=0, help="with --tile_search, random seed, default 0" )
+    parser.add_argument( "--pareto", action='store_true', help="bool, only keep (save and plot) the design points on the pareto front of --pareto_objectives")
+    parser.add_argument( "--pareto_objectives", metavar="Pareto Objectives", nargs='+', default=['edp', 'en', 'la', 'a_buf_size'], choices=['edp', 'en', 'la', 'ema', 'a_buf_size'], help="with --pareto, objectives to minimize, default edp en la a_buf_size" )
+    parser.add_argument( "--tile_grid", metavar="Tile Size Grid", type=int, nargs='+', action='append', required=False, help="with --tile_gen grid, h list then w list, e.g. --tile_grid 540 135 --tile_grid 960 240 60" )
+    parser.add_argument( "--fusion_search", action='store_true', help="bool, search the best stack boundaries of a layer-by-layer workload (e.g. resnet18lbl) at the fixed --tile_size and --mem_size")
+    parser.add_argument( "--max_stack_len", metavar="Max Stack Length", type=int, default=8, help="with --fusion_search, max number of layers fused into one stack, default 8" )
+    parser.add_argument( "--target_metric", metavar="Target Metric", choices=InverseQueryStage.METRICS, default='edp', help="with --target, metric of the target, one of edp, en, la, ema, default edp" )
+    parser.add_argument( "--target", metavar="Target Value", type=float, required=False, help="find the smallest mem size with --target_metric <= target, at the fixed --tile_size or over the --tile_gen candidates, e.g. --target 3e19" )
+    return parser
+
+
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """parser.error() on option combinations that are not supported"""
+    # 要么固定tile_size，迭代mem_size，绘制曲线图（所有模型通用）
+    # 要么固定mem_size，迭代tile_size，绘制热力图（只针对没有下采样的图像增强网络有意义）
+    if args.target is not None:
+        if args.mem_size:
+            parser.error("--target searches the mem size, --mem_size cannot be used.")
+        if args.analytic or args.per_stack_tile or args.fusion_search or args.tile_search or args.pareto:
+            parser.error("--target cannot be used with --analytic, --per_stack_tile, --fusion_search, --tile_search or --pareto.")
+    elif args.fusion_search:
+        if not (args.tile_size and args.mem_size):
+            parser.error("--fusion_search needs both --tile_size and --mem_size.")
+        if args.analytic or args.per_stack_tile:
+            parser.error("--analytic and --per_stack_tile cannot be used with --fusion_search.")
+    elif args.per_stack_tile:
+        if args.tile_size or args.mem_size:
+            parser.error("--per_stack_tile chooses the tile size of every stack and iterates mem size, --tile_size and --mem_size cannot be used.")
+        if args.analytic:
+            parser.error("--analytic cannot be used with --per_stack_tile.")
+    elif args.tile_size and args.mem_size:
+        parser.error("Cannot provide both --tile_size and --mem_size arguments at the same time.")
+    elif not args.tile_size and not args.mem_size:
+        parser.error("Either --tile_size or --mem_size must be provided, but not both.")
+
+    if args.merge and not args.rda:
+        parser.error("Feature merging must be used along with reuse-distance-aware caching strategy.")
+
+    # 当 nn 是 'resnet18' 不做tile_size迭代实验
+    if args.nn == 'resnet18' and args.mem_size and not args.tile_size:
+        parser.error("When nn is 'resnet18', iterating tile_size is not supported.")
+
+    if args.tile_search and not (args.mem_size and not args.tile_size):
+        parser.error("--tile_search iterates tile size, it needs --mem_size without --tile_size.")
+
+    if args.pareto and args.fusion_search:
+        parser.error("--fusion_search yields a single design point, --pareto cannot be used.")
+
+    if args.tile_gen == 'grid' and (args.tile_grid is None or len(args.tile_grid) != 2):
+        parser.error("--tile_gen grid needs two --tile_grid lists, h then w.")
+
+    if args.analytic and not args.tile_size:
+        parser.error("--analytic only supports iterating mem_size with a fixed --tile_size.")
+
+    # 当固定 mem_size 迭代 tile_size 时，必须同时使用 --merge 和 --rda
+    if args.mem_size and not args.tile_size:
+        if not (args.merge and args.rda):
+            parser.error("When iterating tile_size with a fixed mem_size, both feature merging and reuse-distance-aware caching strategy must be used.")
+
+
+def get_experiment_id_of(args: argparse.Namespace) -> str:
+    """outputs/<experiment_id>/ of args"""
+    experiment_id = get_experiment_id(args.hw, args.nn, args.merge, args.rda, args.tile_size, args.mem_size, args.per_stack_tile, args.fusion_search, args.tile_search, args.target_metric if args.target is not None else None, args.target)
+    if args.pareto:
+        experiment_id += "--pareto"
+    return experiment_id
+
+
+def build_pipeline(args: argparse.Namespace, *, hw_variants: bool = False, parsed: bool = False) -> list:
+    """
+    stage pipeline of args
+    :param hw_variants: the hardware json has mac_unroll / bandwidth lists, run every variant (IterateHardwareStage)
+    :param parsed: Dla and Stacks are given to MainStage already, no parser stages
+    """
+    StagesPipeline = [
+        HardwareParserStage,    # 解析硬件
+        WorkloadParserStage,    # 解析网络模型
+        ColumnarSaveStage,      # 按列保存评估结果 (outputs/<experiment_id>/columns)
+        PlotStage,              # 绘图
+        # IterateMemSizeStage,    # 迭代 mem size
+        # IterateStackStage,      # 迭代各个 stack
+        # MinimalEDPStage,        # 针对不同tile size, 筛选最小 EDP 设计点
+        # IterateTileSizeStage,   # 迭代tile size设计点
+        IterateMemOrTileStage,
+        IterateStackStage,      # 迭代各个 stack
+        SumAllTileTypeStage,    # 累加一个stack中所有layer所有tile type的评估结果
+        ResidseCostModelStage,  # 固定mem size, stack, tile size, tile type，评估其EDP
+    ]
+    if args.analytic:
+        # 每个 (stack, tile type) 只构建一次 EMA 曲线，替代后面四个 stage
+        StagesPipeline = StagesPipeline[:4] + [AnalyticMemSweepStage]
+    elif args.per_stack_tile:
+        # 每个 stack 独立选择 tile size，替代 IterateMemOrTileStage 和 IterateStackStage
+        StagesPipeline = StagesPipeline[:4] + [PerStackTileSizeStage, SumAllTileTypeStage, ResidseCostModelStage]
+    elif args.target is not None:
+        # 二分查找满足 target 的最小 mem size
+        StagesPipeline = StagesPipeline[:2] + [CompleteSaveStage, InverseQueryStage, SumAllTileTypeStage, ResidseCostModelStage]
+    elif args.tile_search:
+        # 模拟退火搜索 tile size, 替代 IterateMemOrTileStage 和 IterateStackStage
+        StagesPipeline = StagesPipeline[:4] + [TileSearchStage, SumAllTileTypeStage, ResidseCostModelStage]
+    elif args.fusion_search:
+        # 在固定 tile size 和 mem size 下搜索逐层网络的最优 stack 划分 (保存为 fused_stacks.yml)
+        StagesPipeline = StagesPipeline[:2] + [CompleteSaveStage, FusionSearchStage, SumAllTileTypeStage, ResidseCostModelStage]
+    if args.pareto:
+        # 只保留 pareto 前沿上的设计点, 插在迭代 stage 之前
+        StagesPipeline.insert(StagesPipeline.index(PlotStage) + 1, ParetoStage)
+    if parsed:
+        StagesPipeline = [stage for stage in StagesPipeline if stage not in (HardwareParserStage, WorkloadParserStage)]
+    elif hw_variants:
+        # 硬件 json 中给了 mac_unroll / bandwidth 列表, 每个硬件变体跑一遍, 结果在各自的子目录
+        StagesPipeline[StagesPipeline.index(HardwareParserStage)] = IterateHardwareStage
+    return StagesPipeline
+
+
+def run_experiment(args: argparse.Namespace, dla=None, stacks=None) -> str:
+    """
+    run one experiment of args, results go to outputs/<experiment_id>/
+    :param dla, stacks: already parsed hardware / workload (main_batch.py), otherwise args.hw / args.nn are parsed here
+    :return: experiment_id
+    """
+    experiment_id = get_experiment_id_of(args)
+    if dla is None:
+        hw_variants = len(HardwareGenerator(json_hw=f"residse/inputs/HW/{args.hw}.json").get_dla_variants()) > 1
+        parsed = {}
+    else:
+        hw_variants = False
+        parsed = {"dla": dla, "stacks": stacks}
+    mainstage = MainStage(
+        list_of_callables=build_pipeline(args, hw_variants=hw_variants, parsed=bool(parsed)),
+        hw_path=f"residse/inputs/HW/{args.hw}.json",
+        workload_path=f"residse/inputs/WL/{args.nn}.yml",
+        dump_filename_pattern=f"outputs/{experiment_id}/?.json",
+        is_feature_merging=args.merge,
+        is_rda=args.rda,
+        is_fixed_tsize=True if args.tile_size or args.per_stack_tile else False,  # per_stack_tile 也是迭代 mem size
+        is_fixed_memsize=True if args.mem_size else False,
+        fixed_tile_size=args.tile_size,  # [h, w]
+        fixed_mem_size=args.mem_size,  # [h, w]
+        jobs=args.jobs,
+        stream=args.stream,
+        result_cache=ResultCache(args.cache_dir) if args.cache_dir else None,
+        tile_points=args.tile_points,  # [nb_h, nb_w]
+        max_stack_len=args.max_stack_len,
+        tile_gen=args.tile_gen,
+        tile_grid=args.tile_grid,  # [[h, ...], [w, ...]]
+        search_budget=args.search_budget,
+        search_restarts=args.search_restarts,
+        seed=args.seed,
+        pareto_objectives=args.pareto_objectives,
+        target_metric=args.target_metric,
+        target=args.target,
+        **parsed,
+    )
+    logger.info(f"Runing ResiDSE Experiment: {experiment_id}")
+    mainstage.run()
+    return experiment_id
@@ -1,11 +1,28 @@
+import os
 import pickle
 import matplotlib.pyplot as plt
 from matplotlib.colors import hsv_to_rgb
 from utils import clear_none_in_lst
 import numpy as np
 from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.columnar_store import load_columns
 import seaborn as sns
 
+
+def load_points(path: str, name: str):
+    """
+    (a_buf_size in KB, <name>) of all feasible design points of an experiment
+    :param path: outputs/<experiment_id> (columnar store), or an old all_cmes.pickle
+    """
+    if path.endswith('.pickle'):
+        with open(path, "rb") as handle:
+            cmes = clear_none_in_lst(pickle.load(handle))
+        return [cme.a_buf_size/1024 for cme in cmes], [getattr(cme, name) for cme in cmes]
+    columns = load_columns(os.path.join(path, 'columns'))
+    feasible = columns['feasible']
+    return columns['a_buf_size'][feasible]/1024, columns[name][feasible]
+
+
 def plot_cme_edp(cmes: list[CostModelEvaluation], save_path = 'default_edp.png'):
     plt.figure(dpi=1000)
 
@@ -65,8 +82,7 @@ def plot_cme_tileiter(cmes: list[CostModelEvaluation], save_path = 'default_tile
     sns.heatmap(edp_matrix, annot=True, fmt=".1f", xticklabels=tile_widths, yticklabels=tile_heights, cmap="viridis")
     plt.xlabel('Tile Width')
     plt.ylabel('Tile Height')
-    plt.title('EDP Heatmap for Different Tile Sizes')
-    plt.colorbar()
+    plt.title('EDP Heatmap for Different Tile Sizes')   # sns.heatmap 已经画了 colorbar
     
     # Save the figure
     plt.savefig(save_path)
@@ -93,10 +109,6 @@ def plot_two_lines_ema(pkl_paths: list[str], save_path: str):
     feature merging VS. non-feature merging
     """
     plt.figure(dpi=1000)
-    with open(pkl_paths[0], "rb") as handle:
-        list_of_cme_0 = pickle.load(handle)
-    with open(pkl_paths[1], "rb") as handle:
-        list_of_cme_1 = pickle.load(handle)
     
     # set label
     label0 = 'merge' if 'True' in pkl_paths[0] else 'not-merge'
@@ -105,13 +117,11 @@ def plot_two_lines_ema(pkl_paths: list[str], save_path: str):
 
 
     # line 0
-    x0 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_0)]
-    y0 = [cme.ema for cme in clear_none_in_lst(list_of_cme_0)]
+    x0, y0 = load_points(pkl_paths[0], 'ema')
     plt.scatter(x0, y0, color='blue', marker='o', label=label0)   # 'o'代表圆圈，color设置点的颜色
     
     # line 1
-    x1 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_1)]
-    y1 = [cme.ema for cme in clear_none_in_lst(list_of_cme_1)]
+    x1, y1 = load_points(pkl_paths[1], 'ema')
     plt.scatter(x1, y1, color='red', marker='o', label=label1)   # 'o'代表圆圈，color设置点的颜色
 
 
@@ -128,10 +138,6 @@ def plot_two_lines_edp(pkl_paths: list[str], save_path: str):
     feature merging VS. non-feature merging
     """
     plt.figure(dpi=1000)
-    with open(pkl_paths[0], "rb") as handle:
-        list_of_cme_0 = pickle.load(handle)
-    with open(pkl_paths[1], "rb") as handle:
-        list_of_cme_1 = pickle.load(handle)
     
     # set label
     label0 = 'With Feature Merging' if 'True' in pkl_paths[0] else 'Without Feature Merging'
@@ -139,13 +145,11 @@ def plot_two_lines_edp(pkl_paths: list[str], save_path: str):
     assert label1 != label0, 'pkl path error !!!'
 
     # line 0
-    x0 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_0)]
-    y0 = [cme.edp for cme in clear_none_in_lst(list_of_cme_0)]
+    x0, y0 = load_points(pkl_paths[0], 'edp')
     plt.scatter(x0, y0, c='darkorange', marker='o', s=5, label=label0)   # 'o'代表圆圈，color设置点的颜色
     
     # line 1
-    x1 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_1)]
-    y1 = [cme.edp for cme in clear_none_in_lst(list_of_cme_1)]
+    x1, y1 = load_points(pkl_paths[1], 'edp')
     plt.scatter(x1, y1, c='royalblue', marker='o', s=5, label=label1)   # 'o'代表圆圈，color设置点的颜色
 
 
@@ -162,12 +166,6 @@ def plot_compare_lines_edp(pkl_paths: list[str], save_path: str):
     feature merging VS. non-feature merging
     """
     plt.figure(dpi=1000)
-    with open(pkl_paths[0], "rb") as handle:
-        list_of_cme_0 = pickle.load(handle)
-    with open(pkl_paths[1], "rb") as handle:
-        list_of_cme_1 = pickle.load(handle)
-    with open(pkl_paths[2], "rb") as handle:
-        list_of_cme_2 = pickle.load(handle)
     
     # set label
     label0 = 'Merging / RDA' if '--merge_True--rda_True' in pkl_paths[0] else 'Wrong'
@@ -178,18 +176,15 @@ def plot_compare_lines_edp(pkl_paths: list[str], save_path: str):
     assert label2 != label0, 'pkl path error !!!'
 
     # line 0
-    x0 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_0)]
-    y0 = [cme.edp for cme in clear_none_in_lst(list_of_cme_0)]
+    x0, y0 = load_points(pkl_paths[0], 'edp')
     plt.scatter(x0, y0, c='darkorange', marker='o', s=5, label=label0)   # 'o'代表圆圈，color设置点的颜色
     
     # line 1
-    x1 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_1)]
-    y1 = [cme.edp for cme in clear_none_in_lst(list_of_cme_1)]
+    x1, y1 = load_points(pkl_paths[1], 'edp')
     plt.scatter(x1, y1, c='royalblue', marker='o', s=5, label=label1)
 
     # line 2
-    x2 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_2)]
-    y2 = [cme.edp for cme in clear_none_in_lst(list_of_cme_2)]
+    x2, y2 = load_points(pkl_paths[2], 'edp')
     plt.scatter(x2, y2, c='green', marker='o', s=5, label=label2)
     for item1, item2 in zip(x0, y0):
         print('Merging / RDA', item1, item2)
@@ -213,10 +208,6 @@ def plot_two_lines_tsize_edp(pkl_paths: list[str], save_path: str):
     fixed tile size VS. free tile size
     """
     plt.figure(dpi=1000)
-    with open(pkl_paths[0], "rb") as handle:
-        list_of_cme_0 = pickle.load(handle)
-    with open(pkl_paths[1], "rb") as handle:
-        list_of_cme_1 = pickle.load(handle)
     
     # set label
     label0 = 'fixed-size' if 'fix_tsize' in pkl_paths[0] else 'free-size'
@@ -224,13 +215,11 @@ def plot_two_lines_tsize_edp(pkl_paths: list[str], save_path: str):
     assert label1 != label0, 'pkl path error !!!'
 
     # line 0
-    x0 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_0)]
-    y0 = [cme.edp for cme in clear_none_in_lst(list_of_cme_0)]
+    x0, y0 = load_points(pkl_paths[0], 'edp')
     plt.scatter(x0, y0, color='blue', marker='o', label=label0)   # 'o'代表圆圈，color设置点的颜色
     
     # line 1
-    x1 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_1)]
-    y1 = [cme.edp for cme in clear_none_in_lst(list_of_cme_1)]
+    x1, y1 = load_points(pkl_paths[1], 'edp')
     plt.scatter(x1, y1, color='red', marker='o', label=label1)   # 'o'代表圆圈，color设置点的颜色
 
 
@@ -247,10 +236,6 @@ def plot_two_lines_tsize_ema(pkl_paths: list[str], save_path: str):
     fixed tile size VS. free tile size
     """
     plt.figure(dpi=1000)
-    with open(pkl_paths[0], "rb") as handle:
-        list_of_cme_0 = pickle.load(handle)
-    with open(pkl_paths[1], "rb") as handle:
-        list_of_cme_1 = pickle.load(handle)
     
     # set label
     label0 = 'fixed-size' if 'fix_tsize' in pkl_paths[0] else 'free-size'
@@ -258,13 +243,11 @@ def plot_two_lines_tsize_ema(pkl_paths: list[str], save_path: str):
     assert label1 != label0, 'pkl path error !!!'
 
     # line 0
-    x0 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_0)]
-    y0 = [cme.ema for cme in clear_none_in_lst(list_of_cme_0)]
+    x0, y0 = load_points(pkl_paths[0], 'ema')
     plt.scatter(x0, y0, color='blue', marker='o', label=label0)   # 'o'代表圆圈，color设置点的颜色
     
     # line 1
-    x1 = [cme.a_buf_size/1024 for cme in clear_none_in_lst(list_of_cme_1)]
-    y1 = [cme.ema for cme in clear_none_in_lst(list_of_cme_1)]
+    x1, y1 = load_points(pkl_paths[1], 'ema')
     plt.scatter(x1, y1, color='red', marker='o', label=label1)   # 'o'代表圆圈，color设置点的颜色
 
 
@@ -0,0 +1,22 @@
+import pytest
+from residse.classes.hardware.dla import Dla
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.workload.WorkloadParser import WorkloadParser
+
+
+@pytest.fixture(scope="session")
+def dla():
+    return HardwareGenerator(json_hw="residse/inputs/HW/res18_1.json").get_dla()
+
+
+@pytest.fixture(scope="session")
+def wide_dla():
+    """res18_1 with a_buf sizes 2 ~ 90.5 KB: infeasible, feasible and saturated points at tile size 4x4"""
+    hw = HardwareGenerator(json_hw="residse/inputs/HW/res18_1.json").json_di
+    return Dla(hw['mac_unroll'], {'lower_limit': 2, 'size_step': 1.5, 'size_points': 60}, hw['w_buf'], hw['dram'])
+
+
+@pytest.fixture(scope="session")
+def stacks():
+    """resnet18: strided, residual, pool and fc stacks"""
+    return WorkloadParser(yaml_path="residse/inputs/WL/resnet18.yml").get_stacks()
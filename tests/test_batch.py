@@ -0,0 +1,44 @@
+import yaml
+from main_batch import build_runs, get_argv, VARIANT_SEPARATOR
+from residse.experiment import get_parser, build_pipeline, get_experiment_id_of
+from residse.classes.stages import ColumnarSaveStage, PlotStage, ParetoStage, PerStackTileSizeStage, HardwareParserStage, WorkloadParserStage
+
+
+def test_example_spec():
+    with open("residse/inputs/batch/srgan_compare.yml") as f:
+        spec = yaml.safe_load(f)
+    runs = build_runs(spec)
+    # 3 strategies x 5 tile sizes, no mem size
+    assert len(runs) == 15
+    assert runs[0]["argv"] == ["--hw", "srgan_1", "--nn", "srgan", "--merge", "--rda", "--tile_size", "32", "32"]
+    assert "options" not in spec
+
+
+def test_rejected_combinations_are_skipped():
+    spec = {"hw": ["srgan_1"], "nn": ["srgan"], "strategy": [[True, True], [True, False], [False, False]], "mem_size": [64]}
+    # merge without rda is rejected, a mem size sweep needs merge and rda
+    assert [run["argv"] for run in build_runs(spec)] == [["--hw", "srgan_1", "--nn", "srgan", "--merge", "--rda", "--mem_size", "64"]]
+
+
+def test_options_reach_the_pipeline():
+    """every main_dse.py mode is available in a batch, through the same parser and pipeline builder"""
+    spec = {"hw": ["srgan_1"], "nn": ["srgan"], "options": {"per_stack_tile": True, "tile_points": [4, 4], "pareto": True, "stream": False}}
+    runs = build_runs(spec)
+    assert len(runs) == 1
+    args = get_parser().parse_args(runs[0]["argv"])
+    assert args.per_stack_tile and args.pareto and args.tile_points == [4, 4] and not args.stream
+    pipeline = build_pipeline(args, parsed=True)
+    assert HardwareParserStage not in pipeline and WorkloadParserStage not in pipeline
+    assert pipeline[:4] == [ColumnarSaveStage, PlotStage, ParetoStage, PerStackTileSizeStage]
+    assert get_experiment_id_of(args).endswith("--pareto")
+
+
+def test_append_options():
+    argv = get_argv("srgan_1", "srgan", True, True, ("mem_size", 64), {"tile_gen": "grid", "tile_grid": [[135, 270], [240, 480]]})
+    args = get_parser().parse_args(argv)
+    assert args.tile_grid == [[135, 270], [240, 480]]
+
+
+def test_variant_id_is_one_directory():
+    args = get_parser().parse_args(["--hw", f"srgan_sweep{VARIANT_SEPARATOR}oc16_w4_h2--bw3.2", "--nn", "srgan", "--merge", "--rda", "--tile_size", "8", "8"])
+    assert "/" not in get_experiment_id_of(args)
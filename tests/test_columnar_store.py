@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from residse.classes.stages import *
+from residse.classes.cost_model.columnar_store import load_columns, RESULT_NAMES, BREAKDOWN_NAMES
+
+PIPELINE = [ColumnarSaveStage, IterateMemOrTileStage, IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage]
+
+
+def run(dla, stacks, path, stream):
+    return MainStage(
+        list_of_callables=PIPELINE, dla=dla, stacks=stacks, dump_filename_pattern=f"{path}/?.json",
+        is_feature_merging=True, is_rda=True, is_fixed_tsize=True, is_fixed_memsize=False, fixed_tile_size=[4, 4], fixed_mem_size=None,
+        stream=stream,
+    ).run()
+
+
+@pytest.fixture(scope="module")
+def sweep(dla, stacks, tmp_path_factory):
+    path = tmp_path_factory.mktemp("sweep")
+    return run(dla, stacks, path, stream=False), load_columns(str(path / "columns"))
+
+
+def test_columns_match_the_yielded_results(stacks, sweep):
+    answers, res = sweep
+    assert len(res) == len(answers) and res.stacks == [stack.id for stack in stacks]
+    for row, (cme, (cme_of_stacks, a_buf_size, tile_size, _, _, stack_thresholds)) in enumerate(answers):
+        assert (res['a_buf_size'][row], res['tile_h'][row], res['tile_w'][row]) == (a_buf_size * 1024, *tile_size)
+        assert res['feasible'][row] == (cme is not None)
+        assert res['min_a_buf_size'][row] == max(stack_thresholds)
+        for name in RESULT_NAMES:
+            assert np.isnan(res[name][row]) if cme is None else res[name][row] == getattr(cme, name)
+        for name in BREAKDOWN_NAMES:
+            expected = [np.nan if stack_cme is None or getattr(stack_cme, name) is None else getattr(stack_cme, name) for stack_cme in cme_of_stacks]
+            np.testing.assert_array_equal(res[f'stack_{name}'][row], expected)
+    assert res['feasible'].any() and not res['feasible'].all()
+
+
+def test_stream_writes_the_same_columns(dla, stacks, sweep, tmp_path):
+    _, res = sweep
+    assert run(dla, stacks, tmp_path, stream=True) == []
+    streamed = load_columns(str(tmp_path / "columns"))
+    assert streamed.columns == res.columns
+    for name in res.columns:
+        np.testing.assert_array_equal(streamed[name], res[name])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from residse.classes.stages.parallel import compile_stage
+from residse.classes.stages.IterateStackStage import IterateStackStage
+from residse.classes.stages.SumAllTileTypeStage import SumAllTileTypeStage
+from residse.classes.stages.ResidseCostModelStage import ResidseCostModelStage
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.cost_model.result_cache import ResultCache
+
+RESULTS = ['edp', 'en', 'la', 'ema']
+
+
+def summarize(results, stream):
+    summary = []
+    for sum_cme, types in results:
+        if stream:
+            types = np.nan_to_num(types, nan=-1).tolist()
+        else:
+            types = [None if cme is None else [getattr(cme, name) for name in RESULTS + ['tile_type']] for cme in types]
+        summary.append((None if sum_cme is None else [getattr(sum_cme, name) for name in RESULTS], types))
+    return summary
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("a_buf_size", [16, 64])
+def test_compiled_matches_run(dla, stacks, stream, a_buf_size):
+    kwargs = {'dla': dla, 'stacks': stacks, 'a_buf_size': a_buf_size, 'tile_size': [8, 8], 'is_feature_merging': True, 'is_rda': True,
+              'footprint_cache': FootprintCache(), 'stream': stream}
+    expected = summarize(IterateStackStage([SumAllTileTypeStage, ResidseCostModelStage], **kwargs).run(), stream)
+    compiled = compile_stage([IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage])
+    assert summarize(compiled(kwargs), stream) == expected
+    assert len(expected) == len(stacks) and 'stack' not in kwargs and 'tile_type' not in kwargs
+
+
+def test_compiled_with_result_cache(dla, stacks, tmp_path):
+    kwargs = {'dla': dla, 'stacks': stacks, 'a_buf_size': 64, 'tile_size': [8, 8], 'is_feature_merging': True, 'is_rda': True}
+    expected = summarize(IterateStackStage([SumAllTileTypeStage, ResidseCostModelStage], **kwargs).run(), False)
+    result_cache = ResultCache(str(tmp_path))
+    compiled = compile_stage([IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage])
+    assert summarize(compiled(dict(kwargs, result_cache=result_cache)), False) == expected
+    assert summarize(compiled(dict(kwargs, result_cache=result_cache)), False) == expected
+    # stacks with equal content share their entry already in the first run
+    unique = len({stack.content_hash for stack in stacks})
+    assert (result_cache.hits, result_cache.misses) == (2 * len(stacks) - unique, unique)
+
+
+def test_compiled_once_per_pipeline():
+    pipeline = [IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage]
+    assert compile_stage(pipeline) is compile_stage(list(pipeline))
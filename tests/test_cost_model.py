@@ -0,0 +1,48 @@
+import copy
+import pickle
+import pytest
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+RESULTS = ['ema', 'ema_per_tile', 'en', 'en_of_macs', 'en_of_datas', 'la', 'la_of_macs', 'la_of_datas', 'edp',
+           'tmp_unroll_of_stack', 'tile_number_of_current_type', 'minimal_abuf_for_stack_under_tsize']
+
+
+@pytest.mark.parametrize("footprint_cache", [None, FootprintCache()])
+@pytest.mark.parametrize("a_buf_size", [1, 64, 8192])
+def test_lazy_matches_eager(dla, stacks, footprint_cache, a_buf_size):
+    for stack in stacks:
+        for ttype in TileTypeGenerator([8, 8], stack).run():
+            kwargs = dict(dla=dla, a_buf_size=a_buf_size, stack=stack, tile_size=[8, 8], tile_type=ttype, is_feature_merging=True, is_rda=True)
+            eager = CostModelEvaluation(**kwargs)
+            lazy = CostModelEvaluation(**kwargs, footprint_cache=footprint_cache, lazy=True)
+            assert lazy.is_feasible() == (eager.ema is not None)
+            lazy.calc_results()
+            assert [getattr(lazy, attr) for attr in RESULTS] == [getattr(eager, attr) for attr in RESULTS]
+            assert CostModelEvaluation(**dict(kwargs, a_buf_size=0), footprint_cache=footprint_cache, lazy=True).data_increase_line \
+                == eager.data_increase_line
+
+
+def test_lazy_only_computes_on_access(dla, stacks):
+    lazy = CostModelEvaluation(dla=dla, a_buf_size=64, stack=stacks[1], tile_size=[8, 8], tile_type='M', is_feature_merging=True, is_rda=True, lazy=True)
+    # copy / pickle probes do not run any step
+    copy.deepcopy(lazy)
+    pickle.loads(pickle.dumps(lazy))
+    assert 'minimal_abuf_for_stack_under_tsize' not in lazy.__dict__ and 'out_tile_h_lst' not in lazy.__dict__
+    assert lazy.is_feasible()
+    assert 'minimal_abuf_for_stack_under_tsize' in lazy.__dict__ and 'out_tile_h_lst' in lazy.__dict__
+    assert 'data_increase_line' not in lazy.__dict__ and 'next_tile_data_amount' not in lazy.__dict__
+    assert lazy.data_increase_line[0] == lazy.minimal_abuf_for_stack_under_tsize
+    assert 'next_tile_data_amount' in lazy.__dict__
+
+
+def test_cached_tile_geometry(dla, stacks):
+    footprint_cache = FootprintCache()
+    kwargs = dict(dla=dla, a_buf_size=64, stack=stacks[1], tile_size=[8, 8], is_feature_merging=True, is_rda=True)
+    fresh = CostModelEvaluation(**kwargs, tile_type='M')
+    first = CostModelEvaluation(**kwargs, tile_type='M', footprint_cache=footprint_cache)
+    second = CostModelEvaluation(**kwargs, tile_type='U', footprint_cache=footprint_cache)  # same true tile as M
+    for attr in CostModelEvaluation.TILE_GEOMETRY_ATTRS:
+        assert getattr(first, attr) == tuple(getattr(fresh, attr))
+        assert getattr(second, attr) is getattr(first, attr)
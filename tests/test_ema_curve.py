@@ -0,0 +1,62 @@
+import pytest
+from residse.classes.stages import *
+from residse.classes.stages.AnalyticMemSweepStage import AnalyticMemSweepStage
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.ema_curve import EmaCurve
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+STRATEGIES = [(True, True), (False, True), (False, False)]
+RESULTS = ['ema', 'en', 'la', 'edp']
+
+
+def results(cme):
+    return None if cme is None else [getattr(cme, name) for name in RESULTS]
+
+
+@pytest.mark.parametrize("is_feature_merging, is_rda", STRATEGIES)
+@pytest.mark.parametrize("tile_size", [[4, 4], [8, 8]])
+def test_curve_matches_cost_model(dla, stacks, tile_size, is_feature_merging, is_rda):
+    for stack in stacks:
+        for ttype in TileTypeGenerator(tile_size, stack).run():
+            kwargs = dict(dla=dla, stack=stack, tile_size=tile_size, tile_type=ttype, is_feature_merging=is_feature_merging, is_rda=is_rda)
+            curve = EmaCurve(**kwargs)
+            # every breakpoint and its neighbours, below the threshold and saturated
+            sizes = {0, curve.min_a_buf_size - 1, 2 * curve.bounds[-1], 2 ** 30}
+            sizes.update(size + d for size in curve.bounds for d in (-1, 0, 1, 0.5))
+            for size in sorted(size for size in sizes if size >= 0):
+                cme = CostModelEvaluation(**kwargs, a_buf_size=size / 1024)
+                looked_up = curve.cme_at(size / 1024)
+                assert results(looked_up) == results(cme), (stack, ttype, size)
+                assert looked_up.ratio == cme.ratio
+            assert curve.ema(curve.min_a_buf_size / 1024) is not None
+            assert curve.ema((curve.min_a_buf_size - 1) / 1024) is None
+            # saturated: everything fits, only the tile io EMA is left
+            assert curve.ema(curve.bounds[-1] / 1024) == curve.ema(2 ** 30)
+            assert curve.cme_at(curve.bounds[-1] / 1024).ratio == [0] * len(curve.breakpoints)
+
+
+def test_curve_segments(dla, stacks):
+    for stack in stacks:
+        curve = EmaCurve(dla=dla, stack=stack, tile_size=[8, 8], tile_type=TileTypeGenerator([8, 8], stack).run()[0], is_feature_merging=True, is_rda=True)
+        for segment in curve.segments():
+            for size in (segment['lower'], min(segment['upper'] - 1, segment['lower'] + 100)):
+                assert curve.tile_ema(size) == pytest.approx(segment['intercept'] + segment['slope'] * size)
+
+
+def sweep(pipeline, dla, stacks, is_feature_merging, is_rda):
+    return MainStage(
+        list_of_callables=pipeline, dla=dla, stacks=stacks, is_feature_merging=is_feature_merging, is_rda=is_rda,
+        is_fixed_tsize=True, is_fixed_memsize=False, fixed_tile_size=[4, 4], fixed_mem_size=None,
+    ).run()
+
+
+@pytest.mark.parametrize("is_feature_merging, is_rda", STRATEGIES)
+def test_analytic_sweep_matches_the_stages(dla, stacks, is_feature_merging, is_rda):
+    analytic = sweep([AnalyticMemSweepStage], dla, stacks, is_feature_merging, is_rda)
+    expected = sweep([IterateMemOrTileStage, IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage], dla, stacks, is_feature_merging, is_rda)
+    assert len(analytic) == len(expected) == len(dla.a_buf.get_size_list())
+    for (cme, extra_info), (expected_cme, expected_info) in zip(analytic, expected):
+        assert extra_info[1] == expected_info[1] and extra_info[5] == expected_info[5]     # a_buf_size, stack thresholds
+        assert results(cme) == results(expected_cme)
+        assert [results(stack_cme) for stack_cme in extra_info[0]] == [results(stack_cme) for stack_cme in expected_info[0]]
+    assert any(cme is None for cme, _ in analytic) and any(cme is not None for cme, _ in analytic)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from residse.classes.stages import *
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.feasibility import FeasibilityOracle
+from residse.classes.cost_model.columnar_store import load_columns
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+
+def sweep(dla, stacks, path, stream):
+    answers = MainStage(
+        list_of_callables=[ColumnarSaveStage, IterateMemOrTileStage, IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage],
+        dla=dla, stacks=stacks, dump_filename_pattern=f"{path}/?.json", is_feature_merging=True, is_rda=True,
+        is_fixed_tsize=True, is_fixed_memsize=False, fixed_tile_size=[4, 4], fixed_mem_size=None, stream=stream,
+    ).run()
+    return answers, load_columns(str(path / "columns"))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_saturated_points_equal_a_full_evaluation(wide_dla, stacks, tmp_path, monkeypatch, stream):
+    answers, res = sweep(wide_dla, stacks, tmp_path / "shortcut", stream)
+    with monkeypatch.context() as m:
+        m.setattr(FeasibilityOracle, 'is_saturated', lambda self, a_buf_size, tile_size: False)
+        full_answers, full = sweep(wide_dla, stacks, tmp_path / "full", stream)
+
+    oracle = FeasibilityOracle(dla=wide_dla, stacks=stacks, is_feature_merging=True, is_rda=True)
+    a_buf_size = res['a_buf_size']
+    assert (a_buf_size < oracle.get_threshold([4, 4])).any() and (a_buf_size >= oracle.get_saturation([4, 4])).sum() > 1
+    assert res.columns == full.columns
+    for name in res.columns:
+        np.testing.assert_array_equal(res[name], full[name], err_msg=name)
+    # the copied points carry their own a_buf_size
+    for (cme, extra_info), (full_cme, _) in zip(answers, full_answers):
+        if cme is not None:
+            assert cme.a_buf_size == full_cme.a_buf_size == extra_info[1] * 1024
+            assert all(stack_cme.a_buf_size == cme.a_buf_size for stack_cme in extra_info[0])
+
+
+@pytest.mark.parametrize("tile_size", [[2, 2], [4, 4], [8, 8], [16, 16]])
+def test_threshold_is_the_first_feasible_a_buf_size(dla, stacks, tile_size):
+    oracle = FeasibilityOracle(dla=dla, stacks=stacks, is_feature_merging=True, is_rda=True)
+
+    def network_feasible(a_buf_byte):
+        return all(
+            CostModelEvaluation(dla=dla, a_buf_size=a_buf_byte / 1024, stack=stack, tile_size=tile_size, tile_type=ttype,
+                                is_feature_merging=True, is_rda=True).ema is not None
+            for stack in stacks for ttype in TileTypeGenerator(tile_size, stack).run()
+        )
+
+    threshold = oracle.get_threshold(tile_size)
+    assert network_feasible(threshold) and not network_feasible(threshold - 1)
+    assert oracle.is_feasible(threshold / 1024, tile_size) and not oracle.is_feasible((threshold - 1) / 1024, tile_size)
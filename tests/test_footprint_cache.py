@@ -0,0 +1,56 @@
+import pytest
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+RESULTS = ['ema', 'ratio', 'en', 'la', 'edp', 'tmp_unroll_of_stack']
+
+
+def evaluate(dla, stack, tile_size, a_buf_size, is_feature_merging=True, is_rda=True, footprint_cache=None):
+    return [
+        CostModelEvaluation(dla=dla, a_buf_size=a_buf_size, stack=stack, tile_size=tile_size, tile_type=ttype,
+                            is_feature_merging=is_feature_merging, is_rda=is_rda, footprint_cache=footprint_cache)
+        for ttype in TileTypeGenerator(tile_size, stack).run()
+    ]
+
+
+def results(cmes):
+    return [[getattr(cme, attr) for attr in RESULTS] for cme in cmes]
+
+
+@pytest.mark.parametrize("a_buf_size", [16, 64, 8192])
+def test_hit_matches_fresh(dla, stacks, a_buf_size):
+    footprint_cache = FootprintCache(ema_max_size=1024)
+    for stack in stacks:
+        fresh = results(evaluate(dla, stack, [8, 8], a_buf_size))
+        assert results(evaluate(dla, stack, [8, 8], a_buf_size, footprint_cache=footprint_cache)) == fresh
+        hits, ema_hits = footprint_cache.hits, footprint_cache.ema_hits
+        assert results(evaluate(dla, stack, [8, 8], a_buf_size, footprint_cache=footprint_cache)) == fresh
+        assert footprint_cache.hits - hits == footprint_cache.ema_hits - ema_hits == len(fresh)
+
+
+def test_other_mac_unroll_reuses_the_footprint(stacks):
+    """mac_unroll is not part of the key, the cached data amounts and EMA do not depend on it, tmp_unroll is never cached"""
+    variants = [dla for _, dla in HardwareGenerator(json_hw="residse/inputs/HW/srgan_sweep.json").get_dla_variants()]
+    dla = variants[0]
+    other = next(variant for variant in variants if variant.mac_unroll != dla.mac_unroll)
+    footprint_cache = FootprintCache(ema_max_size=1024)
+    stack = stacks[1]
+    evaluate(dla, stack, [8, 8], 64, footprint_cache=footprint_cache)
+    fresh = results(evaluate(other, stack, [8, 8], 64))
+    assert results(evaluate(other, stack, [8, 8], 64, footprint_cache=footprint_cache)) == fresh
+    assert fresh != results(evaluate(dla, stack, [8, 8], 64))
+
+
+@pytest.mark.parametrize("strategy", [(False, True), (False, False)])
+def test_other_strategy_misses(dla, stacks, strategy):
+    footprint_cache = FootprintCache(ema_max_size=1024)
+    stack = stacks[1]
+    cmes = evaluate(dla, stack, [8, 8], 64, footprint_cache=footprint_cache)
+    keys = {cme.footprint_key for cme in cmes}
+    misses = footprint_cache.misses
+    other = evaluate(dla, stack, [8, 8], 64, *strategy, footprint_cache=footprint_cache)
+    assert footprint_cache.misses - misses == len(other)
+    assert keys.isdisjoint(cme.footprint_key for cme in other)
+    assert results(other) == results(evaluate(dla, stack, [8, 8], 64, *strategy))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from residse.classes.stages import *
+from residse.classes.stages.FusionSearchStage import FusionSearchStage
+from residse.classes.workload.WorkloadParser import WorkloadParser
+
+
+@pytest.fixture(scope="module")
+def units():
+    """first 6 layers of resnet18, one unit per layer"""
+    return WorkloadParser(yaml_path="residse/inputs/WL/resnet18lbl.yml").get_stacks()[:6]
+
+
+def make_stage(dla, units, tmp_path, fixed_mem_size, max_stack_len):
+    return FusionSearchStage([SumAllTileTypeStage, ResidseCostModelStage], dla=dla, stacks=units, fixed_tile_size=[8, 8], fixed_mem_size=fixed_mem_size,
+                             is_feature_merging=True, is_rda=True, dump_filename_pattern=f"{tmp_path}/?.json", max_stack_len=max_stack_len)
+
+
+def partitions(n, max_stack_len):
+    """every partition of range(n) into contiguous ranges of at most max_stack_len units, 2^(n-1) before the length limit"""
+    for cuts in range(2 ** (n - 1)):
+        bounds = [0] + [k + 1 for k in range(n - 1) if cuts >> k & 1] + [n]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+        if all(j - i <= max_stack_len for i, j in ranges):
+            yield ranges
+
+
+# 24 KB: 5 of the 21 fused stacks do not fit, 256 KB: all 6 units fuse into one stack without the length limit
+@pytest.mark.parametrize("fixed_mem_size, max_stack_len", [(24, 2), (24, 6), (32, 3), (32, 6), (256, 4), (256, 6)])
+def test_search_matches_every_partition(dla, units, tmp_path, fixed_mem_size, max_stack_len):
+    stage = make_stage(dla, units, tmp_path, fixed_mem_size, max_stack_len)
+    edps = {}
+    for ranges in partitions(len(units), max_stack_len):
+        costs = [stage.get_cost(i, j) for i, j in ranges]
+        if not any(np.isnan(en) for en, _ in costs):
+            edps[tuple(ranges)] = sum(en for en, _ in costs) * sum(la for _, la in costs)
+    best = min(edps.values())
+    ranges = stage.search()
+    assert all(j - i <= max_stack_len for i, j in ranges)
+    assert edps[tuple(ranges)] == best
+    assert len(edps) > 1
+
+
+def test_infeasible(dla, units, tmp_path):
+    stage = make_stage(dla, units, tmp_path, 1, 6)
+    assert stage.search() is None
+    assert list(stage.run()) == [(None, ([], 1, [8, 8], None, [], []))]
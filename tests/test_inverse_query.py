@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from residse.classes.stages import *
+from residse.classes.stages.InverseQueryStage import InverseQueryStage
+from residse.classes.cost_model.tensor_cost_model import evaluate_network_batch
+
+KB = np.arange(1, 200)  # past the saturation of every tile size below
+GRID = {'tile_gen': 'grid', 'tile_grid': ([2, 4, 8], [2, 4, 8])}
+
+
+def make_stage(dla, stacks, target_metric, target, **kwargs):
+    return InverseQueryStage([SumAllTileTypeStage, ResidseCostModelStage], dla=dla, stacks=stacks, target_metric=target_metric, target=target,
+                             is_feature_merging=True, is_rda=True, **kwargs)
+
+
+def metric_table(dla, stacks, target_metric, tile_sizes):
+    """target_metric of every (integer KB in KB, tile size), NaN if infeasible"""
+    tile_h, tile_w = np.array(tile_sizes).T
+    return evaluate_network_batch(dla=dla, stacks=stacks, a_buf_size=KB[:, None], tile_h=tile_h[None, :], tile_w=tile_w[None, :],
+                                  is_feature_merging=True, is_rda=True)[target_metric]
+
+
+def targets(table):
+    """reachable targets between the best and the worst feasible value"""
+    return np.nanquantile(table, [0, 0.5, 1])
+
+
+@pytest.mark.parametrize("target_metric", ['edp', 'ema'])
+def test_fixed_tile_size(dla, stacks, target_metric):
+    table = metric_table(dla, stacks, target_metric, [(4, 4)])[:, 0]
+    for target in targets(table):
+        a_buf_size, tile_size = make_stage(dla, stacks, target_metric, target, fixed_tile_size=[4, 4]).search()
+        assert tile_size == [4, 4]
+        assert table[a_buf_size - 1] <= target
+        # one KB less misses the target or is below the threshold (NaN)
+        assert not table[a_buf_size - 2] <= target
+        assert a_buf_size == KB[np.flatnonzero(table <= target)[0]]
+
+
+@pytest.mark.parametrize("target_metric", ['edp', 'ema'])
+def test_tile_size_candidates(dla, stacks, target_metric):
+    candidates = make_stage(dla, stacks, target_metric, 0, **GRID).tile_sizes
+    table = metric_table(dla, stacks, target_metric, candidates)
+    for target in targets(table):
+        stage = make_stage(dla, stacks, target_metric, target, **GRID)
+        a_buf_size, tile_size = stage.search()
+        reached = table <= target
+        assert a_buf_size == KB[reached.any(axis=1)][0]
+        row = table[a_buf_size - 1]
+        assert row[candidates.index(tuple(tile_size))] == np.nanmin(np.where(reached[a_buf_size - 1], row, np.nan))
+        assert stage.nb_of_evaluations < table.size
+
+
+def test_answer_is_evaluated(dla, stacks):
+    table = metric_table(dla, stacks, 'edp', [(4, 4)])[:, 0]
+    target = np.nanquantile(table, 0.5)
+    [(sum_cme, extra_info)] = list(make_stage(dla, stacks, 'edp', target, fixed_tile_size=[4, 4]).run())
+    assert sum_cme.edp == pytest.approx(table[extra_info[1] - 1], rel=1e-12) and sum_cme.edp <= target * (1 + 1e-12)
+
+
+def test_unreachable_target(dla, stacks):
+    table = metric_table(dla, stacks, 'edp', [(4, 4)])[:, 0]
+    stage = make_stage(dla, stacks, 'edp', np.nanmin(table) * 0.99, fixed_tile_size=[4, 4])
+    assert stage.search() is None
+    assert list(stage.run()) == []
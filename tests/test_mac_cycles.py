@@ -0,0 +1,32 @@
+import numpy as np
+from math import ceil
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.mac_cycles import get_mac_cycle_table
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+
+def cycles_per_layer(dla, stack, cme):
+    """the unrolled loop counts of every layer, summed"""
+    return sum(
+        ceil(cme.out_tile_h_lst[i] / dla.u_h) * ceil(cme.out_tile_w_lst[i] / dla.u_w)
+        * ceil(stack.och_per_layer[i] / dla.u_oc) * ceil(stack.ich_per_layer[i] / dla.u_ic)
+        * ceil(stack.kernel_size[i] / dla.u_fx) * ceil(stack.kernel_size[i] / dla.u_fy)
+        for i in range(len(stack.och_per_layer))
+    )
+
+
+def test_table_is_the_per_layer_sum(dla, stacks):
+    for stack in stacks:
+        table = get_mac_cycle_table(dla, stack)
+        for tile_size in ([1, 1], [3, 5], [8, 8], [stack.ofm_h, stack.ofm_w]):
+            for ttype in TileTypeGenerator(tile_size, stack).run():
+                cme = CostModelEvaluation(dla=dla, a_buf_size=0, stack=stack, tile_size=tile_size, tile_type=ttype,
+                                          is_feature_merging=True, is_rda=True, lazy=True)
+                assert cme.minimal_abuf_for_stack_under_tsize > 0    # only the tile geometry is computed
+                assert table[cme.out_tile_h_lst[-1], cme.out_tile_w_lst[-1]] == cycles_per_layer(dla, stack, cme)
+
+
+def test_array_look_up(dla, stacks):
+    table = get_mac_cycle_table(dla, stacks[1])
+    h, w = np.meshgrid(np.arange(1, stacks[1].ofm_h + 1), np.arange(1, stacks[1].ofm_w + 1), indexing='ij')
+    assert table[h, w].tolist() == [[table[int(a), int(b)] for a, b in zip(row_h, row_w)] for row_h, row_w in zip(h, w)]
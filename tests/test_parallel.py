@@ -0,0 +1,21 @@
+from residse.classes.stages.parallel import run_substages
+from residse.classes.stages.IterateStackStage import IterateStackStage
+from residse.classes.stages.SumAllTileTypeStage import SumAllTileTypeStage
+from residse.classes.stages.ResidseCostModelStage import ResidseCostModelStage
+
+PIPELINE = [IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage]
+
+
+def summarize(results):
+    """infeasible stacks have sum_cme None"""
+    return [[None if sum_cme is None else (sum_cme.edp, sum_cme.en, sum_cme.la, sum_cme.ema) for sum_cme, _ in result] for result in results]
+
+
+def test_pool_matches_serial(dla, stacks):
+    shared_kwargs = {'dla': dla, 'stacks': stacks[:3], 'is_feature_merging': True, 'is_rda': True}
+    tasks = [{'a_buf_size': a_buf_size, 'tile_size': tile_size} for a_buf_size in (64, 256) for tile_size in ([8, 8], [16, 32])]
+    serial = summarize(run_substages(PIPELINE, shared_kwargs, tasks))
+    pooled = summarize(run_substages(PIPELINE, shared_kwargs, tasks, jobs=2))
+    assert pooled == serial
+    assert len(serial) == len(tasks) and all(len(result) == 3 for result in serial)
+    assert serial[1][0] is None and serial[0][0] is not None
@@ -0,0 +1,82 @@
+import random
+from itertools import product
+import numpy as np
+import pytest
+from residse.classes.stages import *
+from residse.classes.cost_model.pareto import ParetoFront, merge_fronts
+
+
+def reference_front(points):
+    """O(n^2): distinct values not dominated by another distinct value, with the item of their first occurrence"""
+    front = {}
+    for values, item in points:
+        if values not in front and not any(other != values and all(o <= v for o, v in zip(other, values)) for other, _ in points):
+            front[values] = item
+    return sorted(front.items())
+
+
+@pytest.mark.parametrize("nb_of_objectives", [2, 3, 4])
+def test_front_matches_brute_force(nb_of_objectives):
+    rng = random.Random(nb_of_objectives)
+    for _ in range(200):
+        # small value range: many ties in single objectives and duplicate points
+        points = [(tuple(rng.randint(0, 6) for _ in range(nb_of_objectives)), k) for k in range(rng.randint(1, 40))]
+        front = ParetoFront(nb_of_objectives)
+        on_front = [front.insert(values, item) for values, item in points]
+        assert sorted(front) == reference_front(points)
+        assert [values[0] for values, _ in front] == sorted(values[0] for values, _ in front)
+        assert front.nb_of_seen == len(points)
+        # a point rejected on insertion never comes back
+        assert all(ok or item not in [kept for _, kept in front] for ok, (_, item) in zip(on_front, points))
+
+
+def sweep(pipeline, dla, stacks, **kwargs):
+    return MainStage(
+        list_of_callables=pipeline, dla=dla, stacks=stacks, is_feature_merging=True, is_rda=True,
+        is_fixed_tsize=True, is_fixed_memsize=False, fixed_tile_size=[4, 4], fixed_mem_size=None, **kwargs,
+    ).run()
+
+
+@pytest.mark.parametrize("objectives", [('edp', 'en', 'la', 'a_buf_size'), ('edp', 'a_buf_size')])
+def test_pareto_stage(wide_dla, stacks, objectives):
+    pipeline = [IterateMemOrTileStage, IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage]
+    points = [(tuple(getattr(cme, name) for name in objectives), extra_info[1]) for cme, extra_info in sweep(pipeline, wide_dla, stacks) if cme is not None]
+    front = sweep([ParetoStage] + pipeline, wide_dla, stacks, pareto_objectives=objectives)
+    assert [(tuple(getattr(cme, name) for name in objectives), extra_info[1]) for cme, extra_info in front] == reference_front(points)
+    assert 1 < len(front) < len(points)
+
+
+def test_merge_fronts_matches_every_combination():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        en_of_stacks = [rng.integers(1, 20, size=rng.integers(1, 6)).astype(float) for _ in range(rng.integers(1, 5))]
+        la_of_stacks = [rng.integers(1, 20, size=len(en)).astype(float) for en in en_of_stacks]
+        best = min(
+            sum(en[c] for en, c in zip(en_of_stacks, combination)) * sum(la[c] for la, c in zip(la_of_stacks, combination))
+            for combination in product(*[range(len(en)) for en in en_of_stacks])
+        )
+        choices, sum_en, sum_la = merge_fronts(en_of_stacks, la_of_stacks)
+        assert sum_en * sum_la == best
+        assert (sum_en, sum_la) == (sum(en[c] for en, c in zip(en_of_stacks, choices)), sum(la[c] for la, c in zip(la_of_stacks, choices)))
+
+
+def test_choose_tile_sizes(wide_dla, stacks):
+    stage = PerStackTileSizeStage([SumAllTileTypeStage, ResidseCostModelStage], dla=wide_dla, stacks=stacks[:3], is_feature_merging=True, is_rda=True,
+                                  tile_points=(3, 3))
+    tables = [stage.get_stack_table(stack) for stack in stage.stacks]
+    nb_of_feasible = 0
+    for i in range(len(stage.a_buf_size_list)):
+        options = [np.flatnonzero(table["feasible"][i]) for table in tables]
+        tile_sizes = stage.choose_tile_sizes(i)
+        if any(len(option) == 0 for option in options):
+            assert tile_sizes is None
+            continue
+        nb_of_feasible += 1
+        best = min(
+            sum(table["en"][i, c] for table, c in zip(tables, combination)) * sum(table["la"][i, c] for table, c in zip(tables, combination))
+            for combination in product(*options)
+        )
+        chosen = [table["candidates"].index(tuple(tile_size)) for table, tile_size in zip(tables, tile_sizes)]
+        assert sum(table["en"][i, c] for table, c in zip(tables, chosen)) * sum(table["la"][i, c] for table, c in zip(tables, chosen)) \
+            == pytest.approx(best, rel=1e-12)
+    assert 0 < nb_of_feasible < len(stage.a_buf_size_list)
@@ -0,0 +1,30 @@
+import pickle
+import pytest
+from residse.classes.cost_model.record import CostModelRecord
+from residse.classes.cost_model.footprint_cache import FootprintCache
+from residse.classes.stages.ResidseCostModelStage import ResidseCostModelStage
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+
+def records(dla, stacks, a_buf_size, tile_size):
+    return [
+        CostModelRecord.from_cme(ResidseCostModelStage.evaluate(dla=dla, a_buf_size=a_buf_size, stack=stack, tile_size=tile_size, tile_type=ttype,
+                                                                is_feature_merging=True, is_rda=True))
+        for stack in stacks for ttype in TileTypeGenerator(tile_size, stack).run()
+    ]
+
+
+@pytest.mark.parametrize("footprint_cache", [None, FootprintCache()])
+@pytest.mark.parametrize("a_buf_size", [4, 64])
+def test_rebuild_matches_the_record(dla, stacks, footprint_cache, a_buf_size):
+    for record in records(dla, stacks, a_buf_size, [8, 8]):
+        cme = record.rebuild(footprint_cache)
+        assert [getattr(cme, name) for name in CostModelRecord.__slots__] == [getattr(record, name) for name in CostModelRecord.__slots__]
+        assert cme.data_increase_line[0] == record.minimal_abuf_for_stack_under_tsize
+
+
+def test_pickle(dla, stacks):
+    record = records(dla, stacks[1:2], 64, [8, 8])[0]
+    loaded = pickle.loads(pickle.dumps(record))
+    assert [getattr(loaded, name) for name in CostModelRecord.__slots__ if name not in ('dla', 'stack')] \
+        == [getattr(record, name) for name in CostModelRecord.__slots__ if name not in ('dla', 'stack')]
@@ -0,0 +1,55 @@
+import pickle
+from residse.classes.cost_model.result_cache import ResultCache
+from residse.classes.cost_model.accumulator import CostModelAccumulator
+from residse.classes.cost_model.record import CostModelRecord
+from residse.classes.stages.ResidseCostModelStage import ResidseCostModelStage
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+
+def evaluate_stack(dla, stack, tile_size, a_buf_size):
+    cmes = [
+        CostModelRecord.from_cme(ResidseCostModelStage.evaluate(dla=dla, a_buf_size=a_buf_size, stack=stack, tile_size=tile_size,
+                                                                tile_type=ttype, is_feature_merging=True, is_rda=True))
+        for ttype in TileTypeGenerator(tile_size, stack).run()
+    ]
+    acc = CostModelAccumulator()
+    for cme in cmes:
+        acc.add(cme)
+    return acc.summary(), cmes
+
+
+def test_store_then_load(tmp_path, dla, stacks):
+    cache = ResultCache(str(tmp_path))
+    stack = stacks[1]
+    key = ResultCache.make_key(dla, stack, [8, 8], 64, True, True)
+    sum_cme, cmes = evaluate_stack(dla, stack, [8, 8], 64)
+    assert cache.load(key, dla, stack) is None
+    cache.store(key, sum_cme, cmes)
+    loaded_sum, loaded_cmes = cache.load(key, dla, stack)
+    assert (loaded_sum.edp, loaded_sum.en, loaded_sum.la, loaded_sum.ema) == (sum_cme.edp, sum_cme.en, sum_cme.la, sum_cme.ema)
+    assert [cme.edp for cme in loaded_cmes] == [cme.edp for cme in cmes]
+    assert all(cme.dla is dla and cme.stack is stack for cme in loaded_cmes)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_covers_payload_types(dla, stacks):
+    key = ResultCache.make_key(dla, stacks[1], [8, 8], 64, True, True)
+    payload_types = ResultCache.PAYLOAD_TYPES
+    try:
+        ResultCache.PAYLOAD_TYPES = (payload_types[0], object)
+        assert ResultCache.make_key(dla, stacks[1], [8, 8], 64, True, True) != key
+    finally:
+        ResultCache.PAYLOAD_TYPES = payload_types
+
+
+def test_other_payload_type_is_a_miss(tmp_path, dla, stacks):
+    """an entry written with other classes (e.g. an older cost model) is evaluated again, not re-bound"""
+    cache = ResultCache(str(tmp_path))
+    stack = stacks[1]
+    key = ResultCache.make_key(dla, stack, [8, 8], 64, True, True)
+    path = cache.get_path(key)
+    tmp_path.joinpath(key[:2]).mkdir()
+    with open(path, "wb") as handle:
+        pickle.dump((None, [{"edp": 1.0}]), handle)
+    assert cache.load(key, dla, stack) is None
+    assert cache.misses == 1
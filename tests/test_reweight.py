@@ -0,0 +1,37 @@
+import numpy as np
+from residse.classes.stages import *
+from residse.classes.hardware.dla import Dla
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.cost_model.columnar_store import load_columns
+from residse.classes.cost_model.reweight import reweight
+
+
+def sweep(dla, stacks, path):
+    """columnar store of a mem size sweep at tile size 4x4"""
+    MainStage(
+        list_of_callables=[ColumnarSaveStage, IterateMemOrTileStage, IterateStackStage, SumAllTileTypeStage, ResidseCostModelStage],
+        dla=dla, stacks=stacks, dump_filename_pattern=f"{path}/?.json", is_feature_merging=True, is_rda=True,
+        is_fixed_tsize=True, is_fixed_memsize=False, fixed_tile_size=[4, 4], fixed_mem_size=None, stream=True,
+    ).run()
+    return load_columns(str(path / "columns"))
+
+
+def test_default_constants_give_the_stored_results(dla, stacks, tmp_path):
+    res = sweep(dla, stacks, tmp_path)
+    reweighted = reweight(res)
+    for name in ['en', 'la', 'edp']:
+        np.testing.assert_allclose(reweighted[name], res[name], rtol=1e-12)
+    for name in ['en', 'la']:
+        np.testing.assert_allclose(reweighted[f'stack_{name}'], res[f'stack_{name}'], rtol=1e-12)
+
+
+def test_other_bandwidth_matches_a_rerun(stacks, tmp_path):
+    hw = HardwareGenerator(json_hw="residse/inputs/HW/res18_1.json").json_di
+    dlas = {bw: Dla(hw['mac_unroll'], hw['a_buf'], hw['w_buf'], dict(hw['dram'], bandwidth=bw)) for bw in (3.2, 0.8, 16)}
+    res = sweep(dlas[3.2], stacks, tmp_path / "3.2")
+    reweighted = reweight(res, bw=np.array([0.8, 16]))
+    for k, bw in enumerate((0.8, 16)):
+        rerun = sweep(dlas[bw], stacks, tmp_path / str(bw))
+        np.testing.assert_allclose(reweighted['la'][k], rerun['la'], rtol=1e-12)
+        np.testing.assert_allclose(reweighted['edp'][k], rerun['edp'], rtol=1e-12)
+    assert not np.allclose(reweighted['la'][0], reweighted['la'][1], equal_nan=True)
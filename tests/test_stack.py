@@ -0,0 +1,34 @@
+import copy
+import numpy as np
+import pytest
+from residse.classes.workload.stack import Stack
+from residse.classes.workload.WorkloadParser import WorkloadParser
+
+LAYERS = {
+    8: {'op': 'conv', 'in_resb': True, 'dim': [270, 480, 64, 64, 3, 3]},
+    9: {'op': 'conv', 'in_resb': True, 'dim': [270, 480, 64, 64, 3, 3]},
+}
+
+
+def test_equal_stacks_share_the_content_hash(stacks):
+    reparsed = WorkloadParser(yaml_path="residse/inputs/WL/resnet18.yml").get_stacks()
+    assert [stack.content_hash for stack in reparsed] == [stack.content_hash for stack in stacks]
+    # id and layer names are not part of the content
+    renamed = Stack(7, {name + 100: layer for name, layer in LAYERS.items()})
+    assert renamed.content_hash == Stack(1, copy.deepcopy(LAYERS)).content_hash
+
+
+@pytest.mark.parametrize("layer, key, value", [(9, 'dim', [270, 480, 64, 32, 3, 3]), (8, 'in_resb', False), (9, 'stride', 2), (9, 'op', 'pool')])
+def test_other_content_changes_the_hash(layer, key, value):
+    changed = copy.deepcopy(LAYERS)
+    changed[layer][key] = value
+    assert Stack(1, changed).content_hash != Stack(1, LAYERS).content_hash
+
+
+def test_arrays_are_read_only():
+    stack = Stack(1, copy.deepcopy(LAYERS))
+    for array in (stack.dims, stack.strides, stack.out_mult):
+        with pytest.raises(ValueError):
+            array[0] = 0
+    assert all(type(value) is int for value in stack.och_per_layer + stack.ifm_data_amount_per_layer)
+    np.testing.assert_array_equal(stack.out_mult, [1, 1])
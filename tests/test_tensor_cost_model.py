@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from residse.classes.cost_model.cost_model import CostModelEvaluation
+from residse.classes.cost_model.tensor_cost_model import evaluate_batch
+from residse.classes.workload.tile_gen import TileTypeGenerator
+
+RESULTS = ['ema', 'en', 'la', 'edp', 'en_of_macs', 'en_of_datas', 'minimal_abuf_for_stack_under_tsize', 'tmp_unroll_of_stack', 'tile_number_of_current_type']
+
+
+@pytest.mark.parametrize("is_feature_merging, is_rda", [(True, True), (False, True), (False, False)])
+def test_batch_matches_scalar(dla, stacks, is_feature_merging, is_rda):
+    rng = np.random.default_rng(0)
+    for stack in stacks:
+        points = []
+        for _ in range(40):
+            tile_size = [int(rng.integers(1, stack.ofm_h + 3)), int(rng.integers(1, stack.ofm_w + 3))]
+            tile_types = TileTypeGenerator(tile_size, stack).run()
+            points.append((float(rng.choice([0.5, 8, 32, 64, 256, 4096])), *tile_size, tile_types[rng.integers(len(tile_types))]))
+        a_buf_size, tile_h, tile_w, tile_type = (list(column) for column in zip(*points))
+        res = evaluate_batch(dla=dla, stack=stack, a_buf_size=a_buf_size, tile_h=tile_h, tile_w=tile_w, tile_type=tile_type,
+                             is_feature_merging=is_feature_merging, is_rda=is_rda)
+        for i, (buf, h, w, ttype) in enumerate(points):
+            cme = CostModelEvaluation(dla=dla, a_buf_size=buf, stack=stack, tile_size=(h, w), tile_type=ttype,
+                                      is_feature_merging=is_feature_merging, is_rda=is_rda)
+            assert res["feasible"][i] == (cme.ema is not None)
+            for attr in RESULTS:
+                expected = getattr(cme, attr)
+                if expected is None:
+                    assert np.isnan(res[attr][i]), attr
+                else:
+                    assert res[attr][i] == expected, (attr, buf, h, w, ttype)
+            assert list(res["data_increase_line"][i]) == cme.data_increase_line
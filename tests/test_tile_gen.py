@@ -0,0 +1,41 @@
+import math
+from itertools import product
+import numpy as np
+import pytest
+from residse.classes.hardware.dla import Dla
+from residse.classes.hardware.HardwareGenerator import HardwareGenerator
+from residse.classes.workload.WorkloadParser import WorkloadParser
+from residse.classes.workload.tile_gen import TileSizeGenerator
+from residse.classes.cost_model.feasibility import FeasibilityOracle
+
+NETWORKS = {'sesr': 'sesr_1', 'srgan': 'srgan_1', 'resnet18': 'res18_1'}
+
+
+def get_dla(network, strategy):
+    hw = HardwareGenerator(json_hw=f"residse/inputs/HW/{NETWORKS[network]}.json").json_di
+    if strategy == 'unroll' and network != 'resnet18':
+        # 4x4 unroll gives 135 x 240 candidates on 540*960, too many to brute force
+        hw['mac_unroll'] = {**hw['mac_unroll'], 'h': 36, 'w': 64}
+    return Dla(hw['mac_unroll'], hw['a_buf'], hw['w_buf'], hw['dram'])
+
+
+@pytest.mark.parametrize("strategy", ['divisors', 'pow2', 'legacy', 'unroll'])
+@pytest.mark.parametrize("network", list(NETWORKS))
+def test_pruned_run_equals_the_brute_force(network, strategy):
+    dla = get_dla(network, strategy)
+    stacks = WorkloadParser(yaml_path=f"residse/inputs/WL/{network}.yml").get_stacks()
+    oracle = FeasibilityOracle(dla=dla, stacks=stacks, is_feature_merging=True, is_rda=True)
+    gen = TileSizeGenerator(fixed_tile_size=None, stacks=stacks, strategy=strategy, dla=dla)
+    if strategy == 'legacy' and network != 'sesr':
+        with pytest.raises(ValueError):
+            gen.get_candidate_lists()
+        return
+    t_h_lst, t_w_lst = gen.get_candidate_lists()
+    assert list(gen.run()) == list(product(t_h_lst, t_w_lst))
+
+    # nothing, every threshold exactly (the feasibility boundary), one KB below it, and everything
+    thresholds = sorted({math.ceil(oracle.get_threshold(t) / 1024) for t in product(t_h_lst, t_w_lst)})
+    kbs = [0] + [kb + d for kb in np.array(thresholds)[np.linspace(0, len(thresholds) - 1, 6).astype(int)] for d in (-1, 0)] + [thresholds[-1] + 1]
+    for kb in kbs:
+        gen = TileSizeGenerator(fixed_tile_size=None, stacks=stacks, strategy=strategy, dla=dla, oracle=oracle, a_buf_size=kb)
+        assert list(gen.run()) == [t for t in product(t_h_lst, t_w_lst) if oracle.is_feasible(kb, t)], kb
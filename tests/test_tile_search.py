@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from residse.classes.stages import *
+
+
+def make_stage(dla, stacks, tmp_path, **kwargs):
+    return TileSearchStage([SumAllTileTypeStage, ResidseCostModelStage], dla=dla, stacks=stacks, fixed_mem_size=64, is_feature_merging=True,
+                           is_rda=True, dump_filename_pattern=f"{tmp_path}/?.json", **kwargs)
+
+
+@pytest.mark.parametrize("search_budget", [1, 5, 20, 45, 100])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_budget_bounds_the_evaluations(dla, stacks, tmp_path, search_budget, seed):
+    stage = make_stage(dla, stacks, tmp_path, search_budget=search_budget, seed=seed)
+    history = stage.search()
+    assert len(stage.edps) <= search_budget
+    if search_budget <= stage.restarts * (stage.proposals + 1):
+        # the first step already has more proposals than the budget left
+        assert len(stage.edps) == search_budget
+    # the history ends at the best evaluated tile size and only improves
+    finite = {t: edp for t, edp in stage.edps.items() if np.isfinite(edp)}
+    if history:
+        assert history[-1][1] == min(finite.values()) and history[-1][2] == min(finite, key=finite.get)
+        assert all(n <= search_budget for n, _, _ in history)
+        assert all(a[1] > b[1] for a, b in zip(history, history[1:]))
+    else:
+        assert not finite
+
+
+def test_budget_must_allow_an_evaluation(dla, stacks, tmp_path):
+    with pytest.raises(ValueError):
+        make_stage(dla, stacks, tmp_path, search_budget=0)
@@ -4,7 +4,7 @@ from pprint import pprint
 from copy import deepcopy
 from typing import TYPE_CHECKING
 import itertools
-
+from residse.classes.cost_model.accumulator import CostModelAccumulator, CostModelSummary
 
 
 if TYPE_CHECKING:
@@ -34,6 +34,24 @@ def export(export_path, file_to_export):
     print(f'export at path {export_path} DONE!')
     
     
+def get_experiment_id(hw: str, nn: str, merge: bool, rda: bool, tile_size: list = None, mem_size: int = None, per_stack_tile: bool = False, fusion_search: bool = False, tile_search: bool = False, target_metric: str = None, target: float = None) -> str:
+    """outputs/<experiment_id>/ of a single run"""
+    if target_metric:
+        tile = f"_tile_size{tile_size[0]}x{tile_size[1]}" if tile_size else ""
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--query_{target_metric}_{target:g}{tile}"
+    elif fusion_search:
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--fusion_search_tile_size{tile_size[0]}x{tile_size[1]}_mem_size_{mem_size}KB"
+    elif per_stack_tile:
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--per_stack_tile_size"
+    elif tile_size:
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--fix_tile_size{tile_size[0]}x{tile_size[1]}"
+    elif mem_size and tile_search:
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--fix_mem_size_{mem_size}KB--tile_search"
+    elif mem_size:
+        return f"{hw}--{nn}--merge_{merge}--rda_{rda}--fix_mem_size_{mem_size}KB"
+    raise ValueError("Either tile_size or mem_size must be provided.")
+
+
 def generate_tile_sequence(out_len: int, stride: list, power: int) -> list:
     sequence = [out_len]
     reverse_and_pop = stride[::-1][:-1]
@@ -60,16 +78,13 @@ def find_lzc(lst):
     except StopIteration:
         return None
 
-def sum_cme(lst_of_cme: list['CostModelEvaluation']):
-    summation = None
+def sum_cme(lst_of_cme: list['CostModelEvaluation']) -> CostModelSummary:
+    acc = CostModelAccumulator()
     for cme in lst_of_cme:
         if cme is None:
             return None
-        if summation is None:
-            summation = cme
-        else:
-            summation += cme
-    return summation
+        acc.add(cme)
+    return acc.summary()
 
 
 def clear_none_in_lst(lst: list):